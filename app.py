@@ -1,19 +1,46 @@
 
 from dotenv import load_dotenv
 load_dotenv()
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, session
+from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, session, stream_with_context, g, has_request_context
 import datetime
+from decimal import Decimal
 from collections import defaultdict
 import os
 import json
+import base64
+import io
+import re
+import csv
+import zlib
+import time
+import hashlib
+import functools
+import tempfile
+import heapq
+import itertools
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.pagination import SelectPagination
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_migrate import Migrate
 from forms import RegistrationForm, LoginForm, ExpenseForm # <--- IMPORT YOUR FORMS
+from response_cache import create_response_cache, EvictionSignal, TTLCache
+from statement_import import ImportRowError, dedup_key, detect_format, iter_statement_records, parse_column_map
+from keyword_matcher import KeywordMatcher, longest_first
+from metrics import MetricsRegistry, MultiprocessStore, parameters_shape
+from money import Money, MoneyJSONProvider, dumps_json, format_rupees, to_paise, to_rupees
+from row_encoder import RowEncoder
+from sqlite_tuning import SQLiteTuning, is_sqlite_file, sqlite_pragmas
+from password_hashing import HashingOverloaded, PasswordHasher, calibrate_iterations
+from forecasting import GOAL_HISTORY_DAYS, HISTORY_DAYS, daily_matrix, project_goals, project_spending
+from jobs import JobQueue, JobRegistry, QUEUED, RUNNING, dump_payload
+from expense_search import expense_search_for, search_terms
+from event_stream import EventBroker
 
 # Initialize Flask App
 app = Flask(__name__)
+app.json = MoneyJSONProvider(app)  # rupee amounts are Decimals, written as exact JSON numbers
 
 # --- Configuration ---
 # Define basedir first, before it's used in app.config
@@ -22,17 +49,129 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'fallback-key')  # Use secure key in production
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///expenses.db') # Use environment variable or fallback to SQLite
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 'memory' for a per-worker LRU, or 'sqlite:///path' to share cached API responses across workers
+app.config['RESPONSE_CACHE_URL'] = os.environ.get('RESPONSE_CACHE_URL', 'memory')
+app.config['RESPONSE_CACHE_MAX_BYTES'] = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 1000)) # Rows per INSERT when importing statements
+# Instrumentation: statements slower than SLOW_QUERY_MS (or requests issuing more than
+# SQL_QUERY_WARN_COUNT statements) are logged; METRICS_DIR shares /metrics across gunicorn workers
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 200))
+app.config['SQL_QUERY_WARN_COUNT'] = int(os.environ.get('SQL_QUERY_WARN_COUNT', 20))
+app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR')
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN') # Optional bearer token for /metrics
+# Logged-in users are served from an in-process snapshot cache instead of a query per request. Revoking
+# sessions reaches every worker on the host through USER_CACHE_SIGNAL_FILE; other hosts within USER_CACHE_TTL
+app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 30))
+app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1024))
+app.config['USER_CACHE_SIGNAL_FILE'] = os.environ.get('USER_CACHE_SIGNAL_FILE', os.path.join(tempfile.gettempdir(), 'expense-tracker-user-evictions'))
+# Password hashing cost: a fixed PASSWORD_HASH_ITERATIONS (`flask --app manage calibrate-password-hash`
+# prints one for this machine), or calibrated by each worker on its first hash so one hash takes
+# ~PASSWORD_HASH_TARGET_MS (never below PASSWORD_HASH_MIN_ITERATIONS). Hashes run on a bounded pool;
+# logins beyond PASSWORD_HASH_MAX_PENDING get a fast 503 instead of queueing. A login's request thread
+# waits on its hash, so the Procfile runs gthread workers with --threads above PASSWORD_HASH_MAX_PENDING
+# (default 4 per CPU) plus EVENTS_MAX_STREAMS: then a login storm cannot take every thread from other routes.
+app.config['PASSWORD_HASH_ITERATIONS'] = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0)) or None
+app.config['PASSWORD_HASH_TARGET_MS'] = float(os.environ.get('PASSWORD_HASH_TARGET_MS', 250))
+app.config['PASSWORD_HASH_MIN_ITERATIONS'] = int(os.environ.get('PASSWORD_HASH_MIN_ITERATIONS', 600000))
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 0)) or None
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+# File-backed SQLite gets WAL + tuned pragmas on every connection (SQLITE_PRODUCTION_PROFILE=0 to disable)
+app.config['SQLITE_PRODUCTION_PROFILE'] = os.environ.get('SQLITE_PRODUCTION_PROFILE', '1') != '0'
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+app.config['SQLITE_CACHE_SIZE_KB'] = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536))
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+app.config['SQLITE_POOL_SIZE'] = int(os.environ.get('SQLITE_POOL_SIZE', 5))
+app.config['SQLITE_MAX_OVERFLOW'] = int(os.environ.get('SQLITE_MAX_OVERFLOW', 5))
+app.config['SQLITE_OPTIMIZE_INTERVAL'] = float(os.environ.get('SQLITE_OPTIMIZE_INTERVAL', 3600))
+# Background jobs (`flask --app manage jobs worker`): CPU-bound kinds run on JOB_WORKER_PROCESSES
+# processes (default: one per CPU); a job held longer than JOB_LEASE_SECONDS is assumed lost and retried
+app.config['JOB_WORKER_PROCESSES'] = int(os.environ['JOB_WORKER_PROCESSES']) if os.environ.get('JOB_WORKER_PROCESSES') else None
+app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+app.config['JOB_LEASE_SECONDS'] = float(os.environ.get('JOB_LEASE_SECONDS', 3600))
+app.config['JOB_RETENTION_DAYS'] = int(os.environ.get('JOB_RETENTION_DAYS', 14))
+# Expense writes sent with an Idempotency-Key header keep their response this long for retries
+app.config['IDEMPOTENCY_KEY_TTL_HOURS'] = float(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+app.config['EXPENSE_BATCH_MAX_ITEMS'] = int(os.environ.get('EXPENSE_BATCH_MAX_ITEMS', 500)) # Per /api/expenses/batch request
+# Live updates (/api/events): an open stream holds a server thread for up to EVENTS_STREAM_SECONDS (the browser
+# then reconnects; over the cap it gets a 503 and retries later). With the Procfile's 12 threads on one CPU, 4 streams plus 4 waiting
+# logins (PASSWORD_HASH_MAX_PENDING) leave 4 threads for everything else; raise it only alongside --threads.
+# With EVENTS_SOCKET_DIR (a local directory) a commit also reaches streams held by the other workers on this host
+app.config['EVENTS_SOCKET_DIR'] = os.environ.get('EVENTS_SOCKET_DIR')
+app.config['EVENTS_MAX_STREAMS'] = int(os.environ.get('EVENTS_MAX_STREAMS', 4))
+app.config['EVENTS_QUEUE_SIZE'] = int(os.environ.get('EVENTS_QUEUE_SIZE', 100)) # Undelivered changes per stream before it resyncs
+app.config['EVENTS_HEARTBEAT_SECONDS'] = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', 15))
+app.config['EVENTS_STREAM_SECONDS'] = float(os.environ.get('EVENTS_STREAM_SECONDS', 300))
 
 # Add these engine options
-engine_options = {
-    "pool_pre_ping": True,
-    "pool_recycle": 299,
-}
+use_sqlite_profile = app.config['SQLITE_PRODUCTION_PROFILE'] and is_sqlite_file(app.config['SQLALCHEMY_DATABASE_URI'])
+if use_sqlite_profile:
+    # Local file: no server to drop idle connections, so no pre-ping/recycle round trips;
+    # the sqlite3 timeout matches busy_timeout so lock waits behave the same before and after connect
+    engine_options = {
+        "pool_size": app.config['SQLITE_POOL_SIZE'],
+        "max_overflow": app.config['SQLITE_MAX_OVERFLOW'],
+        "connect_args": {"timeout": app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000},
+    }
+else:
+    engine_options = {
+        "pool_pre_ping": True,
+        "pool_recycle": 299,
+    }
 
 # Pass the options to SQLAlchemy
 db = SQLAlchemy(app, engine_options=engine_options)
 migrate = Migrate(app, db)
 
+password_hasher = PasswordHasher(
+    app.config['PASSWORD_HASH_ITERATIONS']
+    or functools.partial(calibrate_iterations, app.config['PASSWORD_HASH_TARGET_MS'], app.config['PASSWORD_HASH_MIN_ITERATIONS']),
+    workers=app.config['PASSWORD_HASH_WORKERS'], max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+    timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+
+# --- Performance Instrumentation ---
+metrics_registry = MetricsRegistry()
+metrics_store = MultiprocessStore(app.config['METRICS_DIR']) if app.config['METRICS_DIR'] else None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own execution context, so one that raises leaves nothing behind to mis-pair later timings
+    if context is not None: context.query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'query_started', None)
+    if started is None: return
+    elapsed = time.perf_counter() - started
+    endpoint = 'cli'
+    if has_request_context():
+        g.sql_count = g.get('sql_count', 0) + 1; g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+        endpoint = request.endpoint or 'unmatched'
+    if elapsed * 1000 >= app.config['SLOW_QUERY_MS']:
+        metrics_registry.inc('sql_slow_queries_total', (('endpoint', endpoint),))
+        app.logger.warning("Slow SQL %.1fms in %s [%s]: %s", elapsed * 1000, endpoint,
+                           parameters_shape(parameters), ' '.join(statement.split())[:500])
+
+with app.app_context():
+    if use_sqlite_profile:
+        SQLiteTuning(sqlite_pragmas(app.config['SQLITE_BUSY_TIMEOUT_MS'], app.config['SQLITE_CACHE_SIZE_KB'], app.config['SQLITE_MMAP_SIZE']),
+                     app.config['SQLITE_OPTIMIZE_INTERVAL']).install(db.engine)
+    event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter(); g.sql_count = 0; g.sql_seconds = 0.0
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' not in g: return response
+    elapsed = time.perf_counter() - g.request_started; endpoint = request.endpoint or 'unmatched'
+    size = 0 if response.is_streamed else (response.calculate_content_length() or 0)
+    metrics_registry.observe_request(endpoint, request.method, response.status_code, elapsed, g.sql_count, g.sql_seconds, size)
+    if g.sql_count > app.config['SQL_QUERY_WARN_COUNT']:
+        app.logger.warning("%s issued %d SQL statements (%.1fms) in one request", endpoint, g.sql_count, g.sql_seconds * 1000)
+    if metrics_store: metrics_store.flush(metrics_registry)
+    return response
+
 # --- Flask-Login Configuration ---
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -45,23 +184,35 @@ class User(UserMixin, db.Model): # UserMixin provides is_authenticated, is_activ
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=False) # Increased length for hash
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Bumped on every data change
+    session_version = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Bump to revoke all sessions
 
     expenses = db.relationship('Expense', backref='user', lazy=True, cascade="all, delete-orphan")
     budgets = db.relationship('Budget', backref='user', lazy=True, cascade="all, delete-orphan")
     goals = db.relationship('Goal', backref='user', lazy=True, cascade="all, delete-orphan")
+    monthly_spend = db.relationship('MonthlySpend', backref='user', lazy=True, cascade="all, delete-orphan")
+    forecast = db.relationship('UserForecast', backref='user', lazy=True, uselist=False, cascade="all, delete-orphan")
+    jobs = db.relationship('Job', backref='user', lazy=True, cascade="all, delete-orphan")
+    idempotency_keys = db.relationship('IdempotencyKey', backref='user', lazy=True, cascade="all, delete-orphan")
+    tombstones = db.relationship('Tombstone', backref='user', lazy=True, cascade="all, delete-orphan")
+    budget_alerts = db.relationship('BudgetAlert', backref='user', lazy=True, cascade="all, delete-orphan")
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def get_id(self):
+        # The session version rides along in the session/remember cookie so revocation works
+        return f"{self.id}:{self.session_version or 0}"
 
     def __repr__(self):
         return f'<User {self.username}>'
 
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Money, nullable=False) # paise
     category = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(200), nullable=True)
     date = db.Column(db.Date, nullable=False, default=datetime.date.today)
@@ -69,37 +220,156 @@ class Expense(db.Model):
     emotion_tag = db.Column(db.String(50), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False) # No default, set by current_user
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    import_hash = db.Column(db.String(40), nullable=True) # (date, amount, merchant) key of statement imports
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0') # User.data_version of the last change
+    # Composite indexes serving the per-user month views and category rollups
+    __table_args__ = (
+        db.Index('ix_expense_user_date_id', 'user_id', 'date', 'id'),
+        db.Index('ix_expense_user_category_date', 'user_id', 'category', 'date'),
+        db.Index('ix_expense_user_import_hash', 'user_id', 'import_hash', unique=True),
+        db.Index('ix_expense_user_change_seq', 'user_id', 'change_seq', 'id'),
+    )
 
     def as_dict(self):
-       data = {c.name: getattr(self, c.name) for c in self.__table__.columns}
+       data = {c.name: getattr(self, c.name) for c in self.__table__.columns if c.name not in ('import_hash', 'change_seq')}
+       data['amount'] = to_rupees(data['amount'])
        if isinstance(data.get('date'), datetime.date): data['date'] = data['date'].isoformat()
        if isinstance(data.get('created_at'), datetime.datetime): data['created_at'] = data['created_at'].isoformat()
+       if isinstance(data.get('updated_at'), datetime.datetime): data['updated_at'] = data['updated_at'].isoformat()
        return data
 
 class Budget(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     category = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Money, nullable=False) # paise
     month = db.Column(db.Integer, nullable=False)
     year = db.Column(db.Integer, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    __table_args__ = (db.UniqueConstraint('user_id', 'category', 'month', 'year', name='_user_category_month_year_uc'),)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0') # User.data_version of the last change
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'category', 'month', 'year', name='_user_category_month_year_uc'),
+        db.Index('ix_budget_user_change_seq', 'user_id', 'change_seq', 'id'),
+    )
 
     def as_dict(self):
-       return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+       data = {c.name: getattr(self, c.name) for c in self.__table__.columns if c.name != 'change_seq'}
+       data['amount'] = to_rupees(data['amount'])
+       if isinstance(data.get('updated_at'), datetime.datetime): data['updated_at'] = data['updated_at'].isoformat()
+       return data
 
 class Goal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
-    target_amount = db.Column(db.Float, nullable=False)
-    current_amount = db.Column(db.Float, default=0.0)
+    target_amount = db.Column(Money, nullable=False) # paise
+    current_amount = db.Column(Money, default=0) # paise
     due_date = db.Column(db.Date, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0') # User.data_version of the last change
+    __table_args__ = (db.Index('ix_goal_user_change_seq', 'user_id', 'change_seq', 'id'),)
 
     def as_dict(self):
-       data = {c.name: getattr(self, c.name) for c in self.__table__.columns}
+       data = {c.name: getattr(self, c.name) for c in self.__table__.columns if c.name != 'change_seq'}
+       data['target_amount'] = to_rupees(data['target_amount']); data['current_amount'] = to_rupees(data['current_amount'])
        if isinstance(data.get('due_date'), datetime.date): data['due_date'] = data['due_date'].isoformat()
+       for field in ('created_at', 'updated_at'):
+           if isinstance(data.get(field), datetime.datetime): data[field] = data[field].isoformat()
+       return data
+
+class MonthlySpend(db.Model):
+    """Per-user monthly spending rollup maintained by the expense write routes.
+
+    emotion_tag is stored as '' rather than NULL so the unique key also
+    covers untagged spending.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    emotion_tag = db.Column(db.String(50), nullable=False, default='')
+    total = db.Column(Money, nullable=False, default=0) # paise
+    count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.UniqueConstraint('user_id', 'year', 'month', 'category', 'emotion_tag', name='_user_month_category_emotion_uc'),)
+
+class UserForecast(db.Model):
+    """Stored output of build_forecasts() for one user, valid for one data_version on the as_of day."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    data_version = db.Column(db.Integer, nullable=False)
+    as_of = db.Column(db.Date, nullable=False)
+    payload = db.Column(db.Text, nullable=False) # JSON, amounts in paise
+
+class Job(db.Model):
+    """Background job row claimed and settled by the worker in jobs.py."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True) # NULL for maintenance jobs
+    payload = db.Column(db.Text, nullable=False, default='{}') # JSON
+    status = db.Column(db.String(20), nullable=False, default=QUEUED) # queued, running, succeeded or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow) # Not before; pushed back on retry
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    result = db.Column(db.Text, nullable=True) # JSON
+    error = db.Column(db.Text, nullable=True)
+    schedule_key = db.Column(db.String(100), nullable=True, unique=True) # kind:period of scheduled runs
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+        db.Index('ix_job_user_created', 'user_id', 'created_at'),
+    )
+
+    def as_dict(self):
+       data = {c.name: getattr(self, c.name) for c in self.__table__.columns if c.name not in ('payload', 'result', 'locked_by', 'locked_at', 'schedule_key')}
+       data['payload'] = json.loads(self.payload or '{}'); data['result'] = json.loads(self.result, parse_float=Decimal) if self.result else None
+       for field in ('run_at', 'created_at', 'finished_at'):
+           if isinstance(data.get(field), datetime.datetime): data[field] = data[field].isoformat()
+       return data
+
+class IdempotencyKey(db.Model):
+    """Response of a write sent with an Idempotency-Key header, replayed when the client retries it."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False) # sha256 of method, path and body
+    status_code = db.Column(db.Integer, nullable=False)
+    response = db.Column(db.Text, nullable=False) # JSON body
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    __table_args__ = (db.Index('ix_idempotency_key_created_at', 'created_at'),)
+
+class Tombstone(db.Model):
+    """A deleted expense, budget or goal, kept so /api/sync can tell clients to drop it."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False) # Table name of the deleted row
+    row_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.Integer, nullable=False) # User.data_version of the delete
+    deleted_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    __table_args__ = (db.Index('ix_tombstone_user_change_seq', 'user_id', 'change_seq', 'id'),)
+
+class BudgetAlert(db.Model):
+    """A budget threshold (or forecast overrun) crossed by an expense write; see evaluate_budget_alerts()."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    category = db.Column(db.String(100), nullable=False) # Budget category ("Overall" for the month total)
+    kind = db.Column(db.String(20), nullable=False) # 'threshold' or 'forecast'
+    threshold = db.Column(db.Integer, nullable=True) # Percent of the budget, for 'threshold' alerts
+    spent = db.Column(Money, nullable=False) # paise, after the write
+    budget_amount = db.Column(Money, nullable=False) # paise
+    forecast = db.Column(Money, nullable=True) # paise, projected month total for 'forecast' alerts
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    __table_args__ = (db.Index('ix_budget_alert_user_id', 'user_id', 'id'),)
+
+    def as_dict(self):
+       data = {c.name: getattr(self, c.name) for c in self.__table__.columns}
+       for field in ('spent', 'budget_amount', 'forecast'):
+           if data[field] is not None: data[field] = to_rupees(data[field])
        if isinstance(data.get('created_at'), datetime.datetime): data['created_at'] = data['created_at'].isoformat()
        return data
 
@@ -109,10 +379,63 @@ def init_db():
     db.create_all()
     return "Tables created!"
 
+# --- Authenticated User Cache ---
+class UserSnapshot(UserMixin):
+    """Read-only copy of the User columns request handlers need, safe to share between requests."""
+    FIELDS = ('id', 'username', 'email', 'session_version')  # data_version changes too often: see current_data_version()
+
+    def __init__(self, user):
+        for field in self.FIELDS: object.__setattr__(self, field, getattr(user, field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("UserSnapshot is read-only; load the User row to change it")
+
+    def get_id(self):
+        return f"{self.id}:{self.session_version}"
+
+user_cache = TTLCache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+user_cache_signal = EvictionSignal(app.config['USER_CACHE_SIGNAL_FILE'])
+
+def evict_cached_users(user_ids):
+    """Drop users from this worker's cache and tell the other processes on the host to do the same."""
+    user_ids = set(user_ids)
+    for user_id in user_ids: user_cache.evict(user_id)
+    user_cache_signal.send(user_ids)
+
+@event.listens_for(User, 'after_update')
+def _evict_updated_user(mapper, connection, target):
+    # Evicted once committed: earlier, another thread could re-cache the old row in between
+    db.session.info.setdefault('updated_users', set()).add(target.id)
+
+@event.listens_for(db.session, 'after_commit')
+def _evict_committed_users(db_session):
+    evict_cached_users(db_session.info.get('updated_users', ()))
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _forget_updated_users(db_session, transaction):
+    if transaction.parent is None: db_session.info.pop('updated_users', None)
+
+def revoke_sessions(user_id):
+    """Log a user out everywhere by bumping the session version carried in their cookies."""
+    db.session.execute(db.update(User).where(User.id == user_id).values(session_version=User.session_version + 1))
+    db.session.commit()
+    evict_cached_users([user_id])
+
 # Flask-Login user loader
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    raw_id, _, raw_version = user_id.partition(':')
+    evicted = user_cache_signal.poll()  # revocations made by other workers on this host
+    if evicted is None: user_cache.clear()
+    for evicted_id in evicted or (): user_cache.evict(int(evicted_id))
+    snapshot = user_cache.get(int(raw_id))
+    if snapshot is None:
+        user = db.session.get(User, int(raw_id))
+        if user is None: return None
+        snapshot = UserSnapshot(user)
+        user_cache.set(snapshot.id, snapshot)
+    if int(raw_version or 0) != snapshot.session_version: return None # Session was revoked
+    return snapshot
 
 # --- Load Translations ---
 def load_translations():
@@ -149,29 +472,899 @@ def inject_translations():
 categories_db_static_list = ["Groceries", "Transport", "Entertainment", "Utilities", "Dining", "Shopping", "Health", "Travel", "Education", "Savings Goal", "Other"]
 merchants_db_static_list = ["Big Bazaar", "Uber", "INOX", "BSES", "Swiggy", "Amazon", "Apollo Pharmacy", "Starbucks", "Udemy", "Self/Bank", "Local Market"]
 
-# --- Helper Functions (parse_expense_text remains largely the same) ---
-def parse_expense_text(text):
-    amount = None; category = None; merchant = None; description = text
+# --- Helper Functions ---
+# Matchers are compiled once; call rebuild_parse_dictionaries() after changing the lists above
+category_matcher = merchant_matcher = None
+
+def rebuild_parse_dictionaries():
+    global category_matcher, merchant_matcher
+    category_matcher = KeywordMatcher(categories_db_static_list)  # first listed category wins
+    merchant_matcher = KeywordMatcher(merchants_db_static_list, rank=longest_first)  # longest merchant wins
+
+rebuild_parse_dictionaries()
+
+_NON_AMOUNT_CHARS = re.compile(r'[^\d.]')
+
+def parse_expense_text(text, categories=None, merchants=None, today=None):
+    """Pull amount, category and merchant out of free text like "200 swiggy dinner".
+
+    categories/merchants take KeywordMatcher instances for custom dictionaries;
+    they default to the static lists.
+    """
+    amount = None; description = text
     words = text.lower().split()
     for i, word in enumerate(words):
-        cleaned_word = ''.join(filter(lambda x: x.isdigit() or x == '.', word))
+        cleaned_word = _NON_AMOUNT_CHARS.sub('', word)
         if cleaned_word and (cleaned_word.replace('.', '', 1).isdigit() and cleaned_word.count('.') < 2):
             try: amount = float(cleaned_word); words.pop(i); text = " ".join(words); break
             except ValueError: pass
-    remaining_text_lower = text.lower()
-    if not category:
-        for cat_option in categories_db_static_list:
-            if cat_option.lower() in remaining_text_lower: category = cat_option; break
-    if not merchant:
-        sorted_merchants = sorted(merchants_db_static_list, key=len, reverse=True)
-        for merch_option in sorted_merchants:
-            if merch_option.lower() in remaining_text_lower: merchant = merch_option; break
+    category = (categories or category_matcher).best_match(text)
+    merchant = (merchants or merchant_matcher).best_match(text)
     if amount:
         if category and merchant: description = f"{category} at {merchant}"
         elif category: description = f"{category} expense"
         elif merchant: description = f"Spent at {merchant}"
         else: description = f"Expense of {amount}"
-    return {"amount": amount, "category": category, "merchant": merchant, "description": description, "date": datetime.date.today()}
+    return {"amount": amount, "category": category, "merchant": merchant, "description": description, "date": today or datetime.date.today()}
+
+def parse_expense_texts(texts, categories=None, merchants=None):
+    """Batch form of parse_expense_text sharing one set of compiled matchers."""
+    today = datetime.date.today()
+    return [parse_expense_text(text, categories, merchants, today) for text in texts]
+
+# --- Date Range Helpers ---
+def month_bounds(year, month):
+    """Return (first_day, first_day_of_next_month) for a month."""
+    first = datetime.date(year, month, 1)
+    next_first = datetime.date(year + 1, 1, 1) if month == 12 else datetime.date(year, month + 1, 1)
+    return first, next_first
+
+def month_filter(date_column, year, month):
+    """Half-open range predicate for a month.
+
+    Unlike extract('month', ...) this keeps the date column bare, so the
+    (user_id, date, ...) indexes on Expense can serve the lookup.
+    """
+    first, next_first = month_bounds(year, month)
+    return db.and_(date_column >= first, date_column < next_first)
+
+TIME_GRANULARITIES = ('day', 'week', 'month')
+TIME_SERIES_MAX_PERIODS = 3660 # Ten years of days; longer zero-filled series are refused
+
+def period_start(date, granularity):
+    """Truncate a date to the start of its day/week (Monday)/month."""
+    if granularity == 'month': return date.replace(day=1)
+    if granularity == 'week': return date - datetime.timedelta(days=date.weekday())
+    return date
+
+def next_period_start(date, granularity):
+    if granularity == 'month': return month_bounds(date.year, date.month)[1]
+    if granularity == 'week': return date + datetime.timedelta(days=7)
+    return date + datetime.timedelta(days=1)
+
+def iter_periods(start, end, granularity):
+    """Yield every period start between two dates, so empty periods can be zero-filled."""
+    current = period_start(start, granularity)
+    while current <= end:
+        yield current
+        try: current = next_period_start(current, granularity)
+        except (OverflowError, ValueError): return # The period containing date.max was the last one
+
+def period_count(start, end, granularity):
+    """How many periods iter_periods(start, end, granularity) yields, without iterating."""
+    if start > end: return 0
+    if granularity == 'month': return (end.year - start.year) * 12 + end.month - start.month + 1
+    days = (period_start(end, granularity) - period_start(start, granularity)).days
+    return days // 7 + 1 if granularity == 'week' else days + 1
+
+def date_bucket(date_column, granularity):
+    """SQL expression truncating a date column to its period start, per dialect."""
+    if db.engine.dialect.name == 'postgresql':
+        return db.cast(db.func.date_trunc(granularity, date_column), db.Date)
+    if granularity == 'month': return db.func.strftime('%Y-%m-01', date_column)
+    if granularity == 'week': return db.func.date(date_column, 'weekday 0', '-6 days')
+    return db.func.date(date_column)
+
+def as_date(value):
+    """Bucket values come back as strings on SQLite and dates on Postgres."""
+    if isinstance(value, datetime.datetime): return value.date()
+    if isinstance(value, datetime.date): return value
+    return datetime.date.fromisoformat(value)
+
+PERIOD_LABEL_FORMATS = {'day': "%d %b %Y", 'week': "%d %b %Y", 'month': "%b %Y"}
+
+def date_range_args():
+    """Optional start/end YYYY-MM-DD query args; raises ValueError when malformed."""
+    try:
+        start = datetime.date.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.date.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError as e: raise ValueError("start and end must be YYYY-MM-DD dates.") from e
+    return start, end
+
+# --- Analytics Helpers ---
+ANALYTICS_DIMENSIONS = {'category': Expense.category, 'merchant': Expense.merchant, 'emotion_tag': Expense.emotion_tag}
+ANALYTICS_MAX_GROUP_BY = 2
+ANALYTICS_MAX_ROWS = 5000
+
+def supports_window_functions():
+    dialect = db.engine.dialect
+    return dialect.name != 'sqlite' or (dialect.server_version_info or (0,)) >= (3, 25)
+
+def spending_aggregates(user_id, granularity, group_by=(), start=None, end=None, previous=False, limit=None):
+    """(period, group values, total, count, previous) rows of a user's expenses from one grouped statement, in period order.
+
+    With previous, it is the (period, total) of the same group's last earlier
+    non-empty period: a LAG() window over the aggregates where the database
+    has window functions, tracked while reading the rows on SQLite before 3.25.
+    Otherwise previous is None.
+    """
+    bucket = date_bucket(Expense.date, granularity)
+    dimensions = [ANALYTICS_DIMENSIONS[name] for name in group_by]
+    total = db.func.sum(Expense.amount)
+    columns = [bucket, *dimensions, total, db.func.count(Expense.id)]
+    window = previous and supports_window_functions()
+    if window:
+        columns += [db.func.lag(bucket).over(partition_by=dimensions, order_by=bucket),
+                    db.func.lag(total, type_=Expense.amount.type).over(partition_by=dimensions, order_by=bucket)]
+    query = db.select(*columns).where(Expense.user_id == user_id)
+    if start: query = query.where(Expense.date >= start)
+    if end: query = query.where(Expense.date <= end)
+    query = query.group_by(bucket, *dimensions).order_by(bucket, *dimensions)
+    if limit: query = query.limit(limit)
+    rows = []; last = {}
+    for row in db.session.execute(query):
+        period = as_date(row[0]); groups = tuple(row[1:1 + len(dimensions)]); row_total, count = row[1 + len(dimensions):3 + len(dimensions)]
+        if window: before = (as_date(row[-2]), row[-1]) if row[-2] is not None else None
+        elif previous: before = last.get(groups); last[groups] = (period, row_total)
+        else: before = None
+        rows.append((period, groups, row_total, count, before))
+    return rows
+
+# --- Response Cache Helpers ---
+response_cache = create_response_cache(app.config['RESPONSE_CACHE_URL'], app.config['RESPONSE_CACHE_MAX_BYTES'])
+
+def bump_data_version(user_id, connection=None):
+    """Invalidate a user's cached API responses and return the new data version; committed with the caller's transaction.
+
+    The version is bumped once per transaction and doubles as the change_seq
+    of every expense, budget and goal the transaction writes (see /api/sync).
+    Bumping also locks the user's row, so versions commit in order.
+    """
+    if connection is None: db.session.flush()  # stamps pending ORM changes through _stamp_change first
+    versions = db.session.info.setdefault('data_versions', {})
+    if user_id not in versions:
+        versions[user_id] = (connection or db.session).execute(db.update(User).where(User.id == user_id)
+                                                                .values(data_version=User.data_version + 1).returning(User.data_version)).scalar()
+    return versions[user_id]
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _forget_data_versions(db_session, transaction):
+    if transaction.parent is None: db_session.info.pop('data_versions', None)
+
+# Rows written through the ORM are stamped as they flush; bulk Core inserts set change_seq themselves
+def _stamp_change(mapper, connection, target):
+    target.change_seq = bump_data_version(target.user_id, connection)
+
+def _record_tombstone(mapper, connection, target):
+    connection.execute(db.insert(Tombstone).values(user_id=target.user_id, kind=mapper.local_table.name, row_id=target.id,
+                                                   change_seq=bump_data_version(target.user_id, connection)))
+
+for _synced_model in (Expense, Budget, Goal):
+    event.listen(_synced_model, 'before_insert', _stamp_change)
+    event.listen(_synced_model, 'before_update', _stamp_change)
+    event.listen(_synced_model, 'after_delete', _record_tombstone)
+
+def current_data_version():
+    """The user's data version, read once per request: cached snapshots go stale when another worker writes."""
+    if 'data_version' not in g:
+        g.data_version = db.session.execute(db.select(User.data_version).where(User.id == current_user.id)).scalar()
+    return g.data_version
+
+def versioned_cache(view):
+    """Cache a JSON GET view per (user, endpoint, args, data version, day) and answer with ETag/304.
+
+    The day is part of the key because views default to the current month and
+    forecast from today's date.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        query = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        key = f"{current_user.id}:{request.endpoint}:{current_data_version()}:{datetime.date.today().isoformat()}:{query}"
+        cached = response_cache.get(key)
+        if cached is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200: return response
+            body = response.get_data()
+            cached = (body, hashlib.sha1(body).hexdigest())
+            response_cache.set(key, cached, len(body))
+        body, etag = cached
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+    return wrapper
+
+# --- Idempotency Helpers ---
+def idempotency_cutoff():
+    return datetime.datetime.utcnow() - datetime.timedelta(hours=app.config['IDEMPOTENCY_KEY_TTL_HOURS'])
+
+def _request_fingerprint():
+    return hashlib.sha256(f"{request.method} {request.path}\n".encode() + request.get_data()).hexdigest()
+
+def _replay(stored, fingerprint):
+    if stored.request_hash != fingerprint:
+        return jsonify({"error": "This Idempotency-Key was already used for a different request."}), 422
+    response = app.response_class(stored.response, status=stored.status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(view):
+    """Let clients retry a write by sending the same Idempotency-Key header (any unique string).
+
+    A retry of a write that went through gets the stored response back
+    instead of writing again; reusing a key for a different body is a 422.
+    The view must commit through commit_idempotent().
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.idempotency = None
+        key = request.headers.get('Idempotency-Key')
+        if key is None: return view(*args, **kwargs)
+        if not 0 < len(key) <= IdempotencyKey.key.type.length:
+            return jsonify({"error": "Idempotency-Key must be 1 to 255 characters."}), 400
+        fingerprint = _request_fingerprint()
+        stored = db.session.get(IdempotencyKey, (current_user.id, key))
+        if stored is not None and stored.created_at >= idempotency_cutoff(): return _replay(stored, fingerprint)
+        g.idempotency = (key, fingerprint)
+        return view(*args, **kwargs)
+    return wrapper
+
+def commit_idempotent(body, status):
+    """Commit the session, storing the JSON response under the request's Idempotency-Key in the same transaction.
+
+    Concurrent retries race on the key's primary key; the loser rolls its
+    writes back and answers with the winner's response.
+    """
+    response = jsonify(body); response.status_code = status
+    idempotency = g.get('idempotency')
+    if idempotency:
+        key, fingerprint = idempotency
+        db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.user_id == current_user.id, IdempotencyKey.key == key,
+                                                           IdempotencyKey.created_at < idempotency_cutoff()))
+        db.session.add(IdempotencyKey(user_id=current_user.id, key=key, request_hash=fingerprint, status_code=status,
+                                      response=response.get_data(as_text=True)))
+    try: db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        stored = db.session.get(IdempotencyKey, (current_user.id, idempotency[0])) if idempotency else None
+        if stored is None: raise
+        return _replay(stored, idempotency[1])
+    return response
+
+def purge_idempotency_keys():
+    """Delete stored responses older than IDEMPOTENCY_KEY_TTL_HOURS; returns rows deleted."""
+    deleted = db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.created_at < idempotency_cutoff())).rowcount
+    db.session.commit()
+    return deleted
+
+# --- JSON Row Encoding Helpers ---
+# List endpoints select plain column tuples and encode them without ORM objects;
+# the bytes match jsonify([expense.as_dict() ...])
+EXPENSE_ROWS = RowEncoder(Expense, exclude={'import_hash', 'change_seq'})
+
+def json_text_response(body):
+    """Response for pre-encoded compact JSON, formatted like jsonify() (pretty-printed in debug mode)."""
+    if app.json.compact is False or (app.json.compact is None and app.debug): return jsonify(json.loads(body, parse_float=Decimal))
+    return app.response_class(body + '\n', mimetype=app.json.mimetype)
+
+# --- Pagination Helpers ---
+MAX_PER_PAGE = 100
+
+class RowPagination(SelectPagination):
+    """db.paginate() for column selects: items are Row tuples instead of scalars."""
+    def _query_items(self):
+        select = self._query_args["select"].limit(self.per_page).offset(self._query_offset)
+        return list(self._query_args["session"].execute(select))
+
+def encode_cursor(expense):
+    """Opaque keyset cursor for a row in the (date desc, id desc) timeline order."""
+    raw = f"{expense.date.isoformat()}|{expense.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date_str, id_str = raw.split('|')
+        return datetime.date.fromisoformat(date_str), int(id_str)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def encode_search_cursor(row, sort):
+    """Keyset cursor for /api/search; relevance pages also carry the row's score."""
+    if sort == 'date': return encode_cursor(row)
+    raw = f"{row.score!r}|{row.date.isoformat()}|{row.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_search_cursor(cursor, sort):
+    """(score or None, date, id) from encode_search_cursor; raises ValueError on anything malformed."""
+    if sort == 'date': return (None, *decode_cursor(cursor))
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        score_str, date_str, id_str = raw.split('|')
+        return float(score_str), datetime.date.fromisoformat(date_str), int(id_str)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+# /api/sync streams changes in (change_seq, kind, id) order: the synced tables by position here, then tombstones
+SYNC_KINDS = (('expenses', Expense), ('budgets', Budget), ('goals', Goal))
+SYNC_TOMBSTONE_RANK = len(SYNC_KINDS)
+SYNC_MAX_PER_PAGE = 1000
+
+def encode_sync_token(change_seq, rank=None, row_id=None):
+    """"seq" once every change up to change_seq was sent, "seq.kind.id" part way through one."""
+    return str(change_seq) if rank is None else f"{change_seq}.{rank}.{row_id}"
+
+def decode_sync_token(token):
+    """(change_seq, rank, id) of the last change a client has; a plain seq sorts after every change it stamped."""
+    try: parts = tuple(int(part) for part in token.split('.'))
+    except ValueError as e: raise ValueError("Invalid sync token") from e
+    if len(parts) == 1: return parts[0], SYNC_TOMBSTONE_RANK + 1, 0
+    if len(parts) != 3: raise ValueError("Invalid sync token")
+    return parts
+
+def user_expense_count(user_id):
+    """Expense count from the monthly rollup counters instead of COUNT(*) over expenses."""
+    return int(db.session.query(db.func.coalesce(db.func.sum(MonthlySpend.count), 0)).filter_by(user_id=user_id).scalar())
+
+# --- Monthly Rollup Helpers ---
+def _apply_spend_delta(user_id, date, category, emotion_tag, amount, count):
+    key = dict(user_id=user_id, year=date.year, month=date.month, category=category, emotion_tag=emotion_tag or '')
+    pending_changes(user_id)['spend'][(date.year, date.month, category, emotion_tag or '')] += amount
+    if count > 0:
+        # One statement, so two first writes to the same row can't both try to insert it
+        upsert = insert_or_increment(MonthlySpend.__table__, list(key), ('total', 'count'))
+        if upsert is not None: db.session.execute(upsert.values(total=amount, count=count, **key)); return
+    key_filter = [getattr(MonthlySpend, k) == v for k, v in key.items()]
+    result = db.session.execute(db.update(MonthlySpend).where(*key_filter)
+                                .values(total=MonthlySpend.total + amount, count=MonthlySpend.count + count))
+    if result.rowcount == 0 and count > 0:
+        db.session.add(MonthlySpend(total=amount, count=count, **key))
+    elif count < 0:
+        db.session.execute(db.delete(MonthlySpend).where(*key_filter, MonthlySpend.count <= 0))
+
+def rollup_add_expense(expense):
+    """Add an expense to the monthly rollup; committed with the caller's transaction."""
+    _apply_spend_delta(expense.user_id, expense.date, expense.category, expense.emotion_tag, expense.amount, 1)
+
+def rollup_remove_expense(expense):
+    """Take an expense (or a snapshot of its old values) out of the monthly rollup."""
+    _apply_spend_delta(expense.user_id, expense.date, expense.category, expense.emotion_tag, -expense.amount, -1)
+
+def rollup_add_rows(user_id, rows):
+    """Add bulk-inserted expense rows (dicts) to the rollup with one update per month, category and emotion."""
+    deltas = defaultdict(lambda: [0, 0])
+    for row in rows:
+        delta = deltas[(row['date'].year, row['date'].month, row['category'], row['emotion_tag'])]
+        delta[0] += row['amount']; delta[1] += 1
+    for (year, month, category, emotion_tag), (amount, count) in deltas.items():
+        _apply_spend_delta(user_id, datetime.date(year, month, 1), category, emotion_tag, amount, count)
+
+def _raw_monthly_spend_query(user_id=None):
+    year_col = db.extract('year', Expense.date); month_col = db.extract('month', Expense.date)
+    emotion_col = db.func.coalesce(Expense.emotion_tag, '')
+    query = db.session.query(Expense.user_id, year_col, month_col, Expense.category, emotion_col,
+                             db.func.sum(Expense.amount), db.func.count(Expense.id))\
+        .group_by(Expense.user_id, year_col, month_col, Expense.category, emotion_col)
+    if user_id is not None: query = query.filter(Expense.user_id == user_id)
+    return query
+
+def rebuild_monthly_spend(user_id=None):
+    """Recompute the rollup from raw expenses for one user, or everyone. Returns rows written."""
+    delete_query = MonthlySpend.query
+    if user_id is not None: delete_query = delete_query.filter_by(user_id=user_id)
+    delete_query.delete(synchronize_session=False)
+    rows = [dict(user_id=uid, year=int(year), month=int(month), category=category, emotion_tag=emotion,
+                 total=total or 0, count=int(count))
+            for uid, year, month, category, emotion, total, count in _raw_monthly_spend_query(user_id)]
+    if rows: db.session.execute(db.insert(MonthlySpend), rows)
+    db.session.commit()
+    return len(rows)
+
+def monthly_spend_drift(user_id=None):
+    """Compare the rollup against raw expenses (exactly, totals are paise); returns a list of mismatched keys."""
+    expected = {(uid, int(year), int(month), category, emotion): (total or 0, int(count))
+                for uid, year, month, category, emotion, total, count in _raw_monthly_spend_query(user_id)}
+    stored_query = MonthlySpend.query
+    if user_id is not None: stored_query = stored_query.filter_by(user_id=user_id)
+    stored = {(r.user_id, r.year, r.month, r.category, r.emotion_tag): (r.total, r.count) for r in stored_query}
+    drift = []
+    for key in sorted(set(expected) | set(stored), key=str):
+        exp_total, exp_count = expected.get(key, (0, 0)); got_total, got_count = stored.get(key, (0, 0))
+        if exp_count != got_count or exp_total != got_total:
+            drift.append({"key": key, "expected": (exp_total, exp_count), "stored": (got_total, got_count)})
+    return drift
+
+# --- Budget Alert Helpers ---
+# Alerts are evaluated as expense writes commit, from the spending deltas the monthly rollup is
+# updated with (see _apply_spend_delta()), so a write costs a few reads of its months' rollup
+# rows and budgets however long the user's history is, and nothing rescans expenses later.
+BUDGET_ALERT_THRESHOLDS = (50, 80, 100) # Percent of a budget; crossing one upwards raises an alert
+
+def evaluate_budget_alerts(user_id, spend, today=None):
+    """Add a BudgetAlert for every budget threshold crossed by spending deltas {(year, month, category, emotion_tag): paise}
+    applied in this transaction, and for current-month budgets whose forecast starts to overrun; returns them.
+
+    The months' new totals are read in the transaction itself, so "before"
+    (new total minus this transaction's delta) is exact however commits
+    interleave. Forecasts add the latest stored projection for the rest of the
+    month (precompute_forecasts keeps it at most a day old) rather than
+    rebuilding it on every write.
+    """
+    today = today or datetime.date.today()
+    deltas = defaultdict(int); month_deltas = defaultdict(int)
+    for (year, month, category, _), amount in spend.items(): deltas[(year, month, category)] += amount; month_deltas[(year, month)] += amount
+    budgets = db.session.query(Budget.year, Budget.month, Budget.category, Budget.amount)\
+        .filter(Budget.user_id == user_id, Budget.amount > 0, db.tuple_(Budget.year, Budget.month).in_(month_deltas)).all()
+    # "Overall" budgets count every category, as in compute_budget_status()
+    def budget_delta(b): return month_deltas[(b.year, b.month)] if b.category == "Overall" else deltas.get((b.year, b.month, b.category), 0)
+    budgets = [b for b in budgets if budget_delta(b) > 0]
+    if not budgets: return []
+    totals = defaultdict(int); month_totals = defaultdict(int)
+    for year, month, category, total in db.session.query(MonthlySpend.year, MonthlySpend.month, MonthlySpend.category, db.func.sum(MonthlySpend.total))\
+            .filter(MonthlySpend.user_id == user_id, db.tuple_(MonthlySpend.year, MonthlySpend.month).in_({(b.year, b.month) for b in budgets}))\
+            .group_by(MonthlySpend.year, MonthlySpend.month, MonthlySpend.category):
+        totals[(year, month, category)] = total or 0; month_totals[(year, month)] += total or 0
+    projected = None
+    if any((b.year, b.month) == (today.year, today.month) for b in budgets):
+        stored = db.session.get(UserForecast, user_id)
+        if stored is not None and (stored.as_of.year, stored.as_of.month) == (today.year, today.month): projected = json.loads(stored.payload)["categories"]
+    alerts = []
+    for budget in budgets:
+        spent = month_totals[(budget.year, budget.month)] if budget.category == "Overall" else totals[(budget.year, budget.month, budget.category)]
+        before = spent - budget_delta(budget)
+        crossed = [t for t in BUDGET_ALERT_THRESHOLDS if before * 100 < budget.amount * t <= spent * 100]
+        alert = dict(user_id=user_id, year=budget.year, month=budget.month, category=budget.category, spent=spent, budget_amount=budget.amount)
+        if crossed: alerts.append(BudgetAlert(kind='threshold', threshold=crossed[-1], **alert))
+        if projected is not None and (budget.year, budget.month) == (today.year, today.month):
+            rest = sum(projected.values()) if budget.category == "Overall" else projected.get(budget.category, 0)
+            if before + rest <= budget.amount < spent + rest: alerts.append(BudgetAlert(kind='forecast', forecast=spent + rest, **alert))
+    db.session.add_all(alerts)
+    return alerts
+
+# --- Live Update Helpers ---
+# Write paths note what they change in session.info['pending_changes']; when the transaction commits, each
+# user's changes go to event_broker as one small message and every /api/events stream of that user turns
+# it into a "change" event (see change_event()). Nothing is collected into messages while nobody listens.
+event_broker = EventBroker(app.config['EVENTS_QUEUE_SIZE'], app.config['EVENTS_MAX_STREAMS'], app.config['EVENTS_SOCKET_DIR'])
+EVENT_MAX_CHANGES = 200 # Bigger transactions (imports, large batches) tell open pages to reload instead
+
+def pending_changes(user_id):
+    """What the current transaction changed for user_id: expense ids written and deleted, spending deltas
+    (paise) per (year, month, category, emotion_tag), other tables touched and whether pages must resync."""
+    changes = db.session.info.setdefault('pending_changes', {})
+    if user_id not in changes:
+        changes[user_id] = {"expenses": set(), "deleted": set(), "spend": defaultdict(int), "tables": set(), "resync": False}
+    return changes[user_id]
+
+def _note_write(mapper, connection, target):
+    if mapper.class_ is Expense: pending_changes(target.user_id)['expenses'].add(target.id)
+    else: pending_changes(target.user_id)['tables'].add(mapper.local_table.name)
+
+def _note_delete(mapper, connection, target):
+    changes = pending_changes(target.user_id)
+    if mapper.class_ is Expense: changes['expenses'].discard(target.id); changes['deleted'].add(target.id)
+    else: changes['tables'].add(mapper.local_table.name)
+
+for _synced_model in (Expense, Budget, Goal):
+    event.listen(_synced_model, 'after_insert', _note_write)
+    event.listen(_synced_model, 'after_update', _note_write)
+    event.listen(_synced_model, 'after_delete', _note_delete)
+
+def change_message(changes, version, alerts):
+    """The broker message for one user's changes; plain JSON, small enough for one datagram."""
+    if changes['resync'] or len(changes['expenses']) + len(changes['deleted']) + len(changes['spend']) > EVENT_MAX_CHANGES:
+        return {"version": version, "resync": True}
+    return {"version": version, "expenses": sorted(changes['expenses']), "deleted": sorted(changes['deleted']),
+            "spend": [[*key, amount] for key, amount in sorted(changes['spend'].items()) if amount],
+            "alerts": [alert.as_dict() for alert in alerts], "tables": sorted(changes['tables'])}
+
+@event.listens_for(db.session, 'before_commit')
+def _prepare_commit_changes(db_session):
+    db_session.flush()  # runs the mapper events that note ORM writes
+    changes = db_session.info.get('pending_changes')
+    if not changes: return
+    alerts = {user_id: evaluate_budget_alerts(user_id, {key: amount for key, amount in user_changes['spend'].items() if amount})
+              for user_id, user_changes in changes.items() if any(user_changes['spend'].values())}
+    if any(alerts.values()): db_session.flush()
+    versions = db_session.info.get('data_versions', {})
+    db_session.info['change_messages'] = {user_id: change_message(user_changes, versions.get(user_id), alerts.get(user_id, []))
+                                          for user_id, user_changes in changes.items() if event_broker.listening(user_id)}
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_change_messages(db_session):
+    for user_id, message in db_session.info.pop('change_messages', {}).items(): event_broker.publish(user_id, message)
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _forget_pending_changes(db_session, transaction):
+    if transaction.parent is None: db_session.info.pop('pending_changes', None); db_session.info.pop('change_messages', None)
+
+def change_event(user_id, message):
+    """JSON text of a "change" event for a broker message.
+
+    Carries the written expense rows as they are now, the deleted ids, the
+    spending deltas, and the current totals of every category, emotion and
+    month the deltas touched, so pages patch their charts and budget cards
+    by setting values rather than adding them up, plus the budget alerts the
+    write raised (BudgetAlert.as_dict()).
+    """
+    spend = [(year, month, category, emotion_tag, amount) for year, month, category, emotion_tag, amount in message['spend']]
+    categories = {s[2] for s in spend}; emotions = {s[3] for s in spend if s[3]}; months = {(s[0], s[1]) for s in spend}
+    rows = db.session.execute(db.select(*EXPENSE_ROWS.columns).where(Expense.user_id == user_id, Expense.id.in_(message['expenses']))
+                              .order_by(Expense.date.desc(), Expense.id.desc())).all() if message['expenses'] else []
+    category_totals = dict.fromkeys(categories, 0); emotion_totals = dict.fromkeys(emotions, 0); month_totals = {}
+    if spend:
+        category_totals.update(db.session.query(MonthlySpend.category, db.func.sum(MonthlySpend.total))
+                               .filter(MonthlySpend.user_id == user_id, MonthlySpend.category.in_(categories)).group_by(MonthlySpend.category).all())
+        if emotions:
+            emotion_totals.update(db.session.query(MonthlySpend.emotion_tag, db.func.sum(MonthlySpend.total))
+                                  .filter(MonthlySpend.user_id == user_id, MonthlySpend.emotion_tag.in_(emotions)).group_by(MonthlySpend.emotion_tag).all())
+        month_totals = {(year, month): {} for year, month in months}
+        for year, month, category, _, _ in spend: month_totals[(year, month)][category] = 0
+        for year, month, category, total in db.session.query(MonthlySpend.year, MonthlySpend.month, MonthlySpend.category, db.func.sum(MonthlySpend.total))\
+                .filter(MonthlySpend.user_id == user_id, db.tuple_(MonthlySpend.year, MonthlySpend.month).in_(months))\
+                .group_by(MonthlySpend.year, MonthlySpend.month, MonthlySpend.category):
+            month_totals[(year, month)][category] = total or 0
+    month_label = PERIOD_LABEL_FORMATS['month']
+    document = {
+        "version": message['version'], "deleted": message['deleted'],
+        "spend_deltas": [{"year": year, "month": month, "category": category, "emotion_tag": emotion_tag or None, "amount": to_rupees(amount)}
+                         for year, month, category, emotion_tag, amount in spend],
+        "category_totals": chart_series(category_totals), "emotion_totals": chart_series(emotion_totals),
+        "month_totals": [{"year": year, "month": month, "label": datetime.date(year, month, 1).strftime(month_label),
+                          "total": to_rupees(sum(totals.values())), "categories": {c: to_rupees(t) for c, t in totals.items()}}
+                         for (year, month), totals in sorted(month_totals.items())],
+        "budget_alerts": message['alerts'],
+        "budgets_changed": 'budget' in message['tables'], "goals_changed": 'goal' in message['tables']}
+    return EXPENSE_ROWS.encode_document(document, "expenses", rows)
+
+def sse_event(name, data, event_id=None):
+    return (f"id: {event_id}\n" if event_id is not None else "") + f"event: {name}\ndata: {data}\n\n"
+
+# --- Full-Text Search Helpers ---
+_search_backends = {}
+
+def expense_search(dialect_name=None):
+    """The expense_search.py backend for the database (None if it has no full-text search)."""
+    name = dialect_name or db.engine.dialect.name
+    if name not in _search_backends: _search_backends[name] = expense_search_for(name, Expense.__table__)
+    return _search_backends[name]
+
+@event.listens_for(Expense.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    backend = expense_search(connection.dialect.name)
+    if backend: backend.create(connection)
+
+@event.listens_for(Expense.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    backend = expense_search(connection.dialect.name)
+    if backend: backend.drop(connection)
+
+# Expenses written through the ORM (the add/edit/delete routes) are indexed as they flush,
+# in the same transaction; bulk Core inserts call index_expenses() themselves
+@event.listens_for(Expense, 'after_insert')
+@event.listens_for(Expense, 'after_update')
+def _index_expense(mapper, connection, target):
+    backend = expense_search(connection.dialect.name)
+    if backend: backend.index(connection, Expense.__table__.c.id == target.id)
+
+@event.listens_for(Expense, 'after_delete')
+def _unindex_expense(mapper, connection, target):
+    backend = expense_search(connection.dialect.name)
+    if backend: backend.remove(connection, [target.id])
+
+def index_expenses(*criteria):
+    """(Re)index the expenses matching criteria; runs in the session's transaction."""
+    backend = expense_search()
+    if backend: backend.index(db.session.connection(), db.and_(*criteria))
+
+def rebuild_search_index(user_id=None):
+    """Re-index one user's expenses, or rebuild the whole index. Returns rows indexed."""
+    backend = expense_search()
+    if backend is None: return 0
+    indexed = backend.rebuild(db.session.connection(), user_id)
+    db.session.commit()
+    return indexed
+
+# --- Forecast Helpers ---
+GOAL_CONTRIBUTION_CATEGORY = "Savings Goal"
+GOAL_CONTRIBUTION_PREFIX = "Contribution to goal: " # contribute_to_goal() records contributions as expenses
+FORECAST_BATCH_USERS = 500
+
+def build_forecasts(user_ids, as_of):
+    """Forecasts for several users at once: {user_id: {"categories": {...}, "goals": {...}}}.
+
+    Grouped queries load the daily history of every user in user_ids and the
+    models in forecasting.py run once over all of their series. "categories"
+    maps each category to its projected spending (paise) for the rest of
+    as_of's month; "goals" maps goal ids to their contribution rate and
+    projected completion date.
+    """
+    user_ids = list(user_ids); forecasts = {uid: {"categories": {}, "goals": {}} for uid in user_ids}
+    start = as_of - datetime.timedelta(days=HISTORY_DAYS - 1)
+    month_end = month_bounds(as_of.year, as_of.month)[1] - datetime.timedelta(days=1)
+    daily = db.session.query(Expense.user_id, Expense.category, Expense.date, db.func.sum(Expense.amount))\
+        .filter(Expense.user_id.in_(user_ids), Expense.date >= start, Expense.date <= as_of)\
+        .group_by(Expense.user_id, Expense.category, Expense.date).all()
+    # A user's history starts at their first expense in the window, not HISTORY_DAYS of zeros
+    first_day = {}
+    for uid, _, date, _ in daily: first_day[uid] = min(first_day.get(uid, HISTORY_DAYS), (date - start).days)
+    keys, matrix = daily_matrix([((uid, category), date, total) for uid, category, date, total in daily], start, HISTORY_DAYS)
+    projected = project_spending(matrix, start, month_end, [first_day[uid] for uid, _ in keys])
+    for (uid, category), amount in zip(keys, projected.tolist()): forecasts[uid]["categories"][category] = round(amount)
+
+    goals = db.session.query(Goal.id, Goal.user_id, Goal.name, Goal.target_amount, Goal.current_amount, Goal.due_date, Goal.created_at)\
+        .filter(Goal.user_id.in_(user_ids)).all()
+    if not goals: return forecasts
+    goal_start = as_of - datetime.timedelta(days=GOAL_HISTORY_DAYS - 1)
+    contributions = defaultdict(list)
+    for uid, description, date, total in db.session.query(Expense.user_id, Expense.description, Expense.date, db.func.sum(Expense.amount))\
+            .filter(Expense.user_id.in_(user_ids), Expense.category == GOAL_CONTRIBUTION_CATEGORY,
+                    Expense.description.startswith(GOAL_CONTRIBUTION_PREFIX), Expense.date >= goal_start, Expense.date <= as_of)\
+            .group_by(Expense.user_id, Expense.description, Expense.date):
+        contributions[(uid, description)].append((date, total))
+    # Contributions only carry the goal's name, so goals sharing a name share their history
+    rows = [(goal.id, date, total) for goal in goals
+            for date, total in contributions.get((goal.user_id, f"{GOAL_CONTRIBUTION_PREFIX}{goal.name}"), ())]
+    _, history = daily_matrix(rows, goal_start, GOAL_HISTORY_DAYS, keys=[goal.id for goal in goals])
+    created = [((goal.created_at.date() if goal.created_at else goal_start) - goal_start).days for goal in goals]
+    remaining = [goal.target_amount - (goal.current_amount or 0) for goal in goals]
+    rates, days_needed = project_goals(remaining, history, created)
+    for goal, left, rate, days in zip(goals, remaining, rates.tolist(), days_needed.tolist()):
+        # NaN days: nothing is being contributed; reached goals have no date to project
+        completion = as_of + datetime.timedelta(days=int(days)) if left > 0 and days == days and days <= 36500 else None
+        on_track = None if goal.due_date is None else (left <= 0 or (completion is not None and completion <= goal.due_date))
+        forecasts[goal.user_id]["goals"][str(goal.id)] = {
+            "rate": round(rate), "completion": completion.isoformat() if completion else None, "on_track": on_track}
+    return forecasts
+
+def store_forecasts(forecasts, versions, as_of):
+    """Replace the stored forecasts of the users in forecasts; commits."""
+    db.session.execute(db.delete(UserForecast).where(UserForecast.user_id.in_(list(forecasts))))
+    db.session.execute(db.insert(UserForecast), [
+        dict(user_id=uid, data_version=versions[uid], as_of=as_of, payload=json.dumps(payload, separators=(',', ':')))
+        for uid, payload in forecasts.items()])
+    db.session.commit()
+
+def user_forecast(user_id, as_of=None):
+    """A user's forecast for as_of (today): the stored one while it matches their data version and the day, else built in memory.
+
+    Read-only, so GET handlers stay side-effect free; only the
+    precompute_forecasts job stores forecasts.
+    """
+    as_of = as_of or datetime.date.today()
+    if has_request_context() and current_user.is_authenticated and current_user.id == user_id: version = current_data_version()
+    else: version = db.session.execute(db.select(User.data_version).where(User.id == user_id)).scalar()
+    stored = db.session.get(UserForecast, user_id)
+    if stored is not None and stored.data_version == version and stored.as_of == as_of: return json.loads(stored.payload)
+    return build_forecasts([user_id], as_of)[user_id]
+
+def precompute_forecasts(user_ids=None, as_of=None, batch_size=FORECAST_BATCH_USERS, progress=None):
+    """Build and store forecasts for every user (or user_ids), batch_size users per pass. Returns users written."""
+    as_of = as_of or datetime.date.today()
+    query = db.select(User.id, User.data_version).order_by(User.id)
+    if user_ids is not None: query = query.where(User.id.in_(user_ids))
+    versions = dict(db.session.execute(query).all()); ids = list(versions)
+    for offset in range(0, len(ids), batch_size):
+        chunk = ids[offset:offset + batch_size]
+        store_forecasts(build_forecasts(chunk, as_of), versions, as_of)
+        if progress: progress(offset + len(chunk), len(ids))
+    return len(ids)
+
+# --- Statement Import Helpers ---
+def insert_ignoring_conflicts(model, index_elements):
+    """INSERT ... ON CONFLICT DO NOTHING for the dialects that support it."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql': from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite': from sqlalchemy.dialects.sqlite import insert
+    else: return db.insert(model)
+    return insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+def insert_or_increment(table, index_elements, columns):
+    """INSERT ... ON CONFLICT DO UPDATE adding the inserted values to columns, or None on dialects without it."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql': from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite': from sqlalchemy.dialects.sqlite import insert
+    else: return None
+    statement = insert(table)
+    return statement.on_conflict_do_update(index_elements=index_elements,
+                                           set_={column: table.c[column] + statement.excluded[column] for column in columns})
+
+def _import_row(user_id, record):
+    category = record.get('category'); merchant = record.get('merchant'); description = record.get('description')
+    if description and not (category and merchant):
+        parsed = parse_expense_text(description)
+        category = category or parsed['category']; merchant = merchant or parsed['merchant']
+    category = (category or "Other")[:100]; emotion_tag = record.get('emotion_tag')
+    # Statement text is cut to the column sizes rather than failing the row (or, on Postgres, the batch)
+    return {"user_id": user_id, "amount": record['amount'], "category": category, "date": record['date'],
+            "description": (description or f"{category} expense")[:200], "merchant": merchant[:100] if merchant else None,
+            "emotion_tag": emotion_tag[:50] if emotion_tag else None, "import_hash": dedup_key(record['date'], record['amount'], merchant)}
+
+def _flush_import_batch(user_id, batch, summary):
+    unique_rows = {}
+    for row in batch: unique_rows.setdefault(row['import_hash'], row)
+    existing = {h for (h,) in db.session.query(Expense.import_hash)
+                .filter(Expense.user_id == user_id, Expense.import_hash.in_(list(unique_rows)))}
+    new_rows = [row for h, row in unique_rows.items() if h not in existing]
+    summary['duplicates'] += len(batch) - len(new_rows)
+    if new_rows:
+        change_seq = bump_data_version(user_id)
+        insert = insert_ignoring_conflicts(Expense.__table__, ['user_id', 'import_hash'])
+        values = [{**row, "change_seq": change_seq} for row in new_rows]
+        if db.engine.dialect.insert_executemany_returning:
+            # A concurrent import of the same statement may have inserted some rows since the SELECT above;
+            # only the rows this INSERT actually wrote go into the rollup and the summary
+            inserted = set(db.session.execute(insert.returning(Expense.import_hash), values).scalars())
+            summary['duplicates'] += len(new_rows) - len(inserted)
+            new_rows = [row for row in new_rows if row['import_hash'] in inserted]
+        else: db.session.execute(insert, values)
+        if new_rows:
+            index_expenses(Expense.user_id == user_id, Expense.import_hash.in_([row['import_hash'] for row in new_rows]))
+            rollup_add_rows(user_id, new_rows)
+            pending_changes(user_id)['resync'] = True  # too many rows to push; open pages reload instead
+    db.session.commit()
+    summary['imported'] += len(new_rows)
+
+def import_expenses(user_id, records, batch_size=None, progress=None):
+    """Insert parsed statement records in batches of one bulk INSERT + one commit each.
+
+    Records already imported (same date, amount and merchant) are skipped,
+    so re-importing a statement is idempotent. progress(summary) is called
+    after every batch.
+    """
+    batch_size = batch_size or app.config['IMPORT_BATCH_SIZE']
+    summary = {"rows": 0, "imported": 0, "duplicates": 0, "errors": 0, "error_samples": []}
+    batch = []
+    for record in records:
+        if isinstance(record, ImportRowError):
+            summary['errors'] += 1
+            if len(summary['error_samples']) < 20: summary['error_samples'].append(str(record))
+            continue
+        summary['rows'] += 1
+        batch.append(_import_row(user_id, record))
+        if len(batch) >= batch_size:
+            _flush_import_batch(user_id, batch, summary); batch = []
+            if progress: progress(summary)
+    if batch:
+        _flush_import_batch(user_id, batch, summary)
+        if progress: progress(summary)
+    return summary
+
+# --- Expense Batch Helpers ---
+EXPENSE_VALUE_FIELDS = ('amount', 'category', 'description', 'date', 'merchant', 'emotion_tag')
+
+def expense_row_from_payload(data, parsed_data=None):
+    """Validated expense column values (amount in paise) from a JSON object. Raises ValueError.
+
+    parsed_data is parse_expense_text() output for smart-log text; the
+    explicit fields in data override it.
+    """
+    parsed_data = parsed_data or {}
+    amount = data.get('amount', parsed_data.get('amount'))
+    if amount is None or amount == '': raise ValueError("amount is required.")
+    amount = to_paise(amount)
+    if amount <= 0: raise ValueError("amount must be positive.")
+    category = data.get('category') or parsed_data.get('category') or "Other"
+    date_str = data.get('date')
+    try: date = datetime.datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else parsed_data.get('date', datetime.date.today())
+    except (TypeError, ValueError): raise ValueError(f"Invalid date {date_str!r}, expected YYYY-MM-DD.")
+    row = {"amount": amount, "category": category, "date": date,
+           "description": data.get('description') or parsed_data.get('description') or f"{category} expense",
+           "merchant": data.get('merchant') or parsed_data.get('merchant'), "emotion_tag": data.get('emotion_tag') or None}
+    for field in ('category', 'description', 'merchant', 'emotion_tag'):
+        limit = Expense.__table__.c[field].type.length
+        if row[field] is not None and (not isinstance(row[field], str) or len(row[field]) > limit):
+            raise ValueError(f"{field} must be text of at most {limit} characters.")
+    return row
+
+def expense_rows_from_batch(items):
+    """(rows, errors) for a batch of smart-log strings and expense objects; errors are {index, error}.
+
+    Objects with text_input are parsed like the smart log (their other fields
+    override it); other objects need an amount.
+    """
+    payloads = [{"text_input": item} if isinstance(item, str) else item for item in items]
+    texts = [p.get('text_input') if isinstance(p, dict) else None for p in payloads]
+    parsed_items = iter(parse_expense_texts([text for text in texts if isinstance(text, str)]))
+    rows = []; errors = []
+    for index, (payload, text) in enumerate(zip(payloads, texts)):
+        parsed_data = next(parsed_items) if isinstance(text, str) else None
+        try:
+            if not isinstance(payload, dict): raise ValueError("Each item must be a text string or an expense object.")
+            if text is not None and not (isinstance(text, str) and text.strip()): raise ValueError("text_input must be non-empty text.")
+            if parsed_data is not None and not parsed_data.get('amount'): raise ValueError("Could not parse amount from text.")
+            rows.append((index, expense_row_from_payload(payload, parsed_data)))
+        except ValueError as e: errors.append({"index": index, "error": str(e)})
+    return rows, errors
+
+def insert_expense_rows(user_id, rows):
+    """Insert a user's new expenses with one bulk INSERT ... RETURNING and update the rollup, search index
+    and data version like the single-expense routes; not committed.
+
+    Returns the inserted EXPENSE_ROWS tuples in the order of rows.
+    """
+    if not rows: return []
+    change_seq = bump_data_version(user_id)
+    inserted = db.session.execute(db.insert(Expense.__table__).returning(*EXPENSE_ROWS.columns),
+                                  [{**row, "user_id": user_id, "change_seq": change_seq} for row in rows]).all()
+    # RETURNING order is not guaranteed, so rows are matched back by value (identical rows are interchangeable)
+    by_values = defaultdict(list)
+    for row in sorted(inserted, key=lambda row: row.id): by_values[tuple(getattr(row, f) for f in EXPENSE_VALUE_FIELDS)].append(row)
+    inserted = [by_values[tuple(row[f] for f in EXPENSE_VALUE_FIELDS)].pop(0) for row in rows]
+    index_expenses(Expense.id.in_([row.id for row in inserted]))
+    rollup_add_rows(user_id, rows)
+    pending_changes(user_id)['expenses'].update(row.id for row in inserted)
+    return inserted
+
+# --- Background Jobs ---
+job_registry = JobRegistry()
+job_queue = JobQueue(db, Job, job_registry)
+
+def reset_engine_after_fork():
+    """Pool process initializer: drop pooled connections inherited from the worker without closing them."""
+    with app.app_context(): db.engine.dispose(close=False)
+
+@job_registry.job('precompute_forecasts', cpu_bound=True)
+def precompute_forecasts_job(payload):
+    return {"users": precompute_forecasts(payload.get('user_ids'))}
+
+@job_registry.job('rebuild_rollup')
+def rebuild_rollup_job(payload):
+    drift = monthly_spend_drift(payload.get('user_id'))
+    if drift: rebuild_monthly_spend(payload.get('user_id'))
+    return {"drifted_rows": len(drift)}
+
+@job_registry.job('rebuild_search_index')
+def rebuild_search_index_job(payload):
+    return {"indexed": rebuild_search_index(payload.get('user_id'))}
+
+@job_registry.job('purge_jobs')
+def purge_jobs_job(payload):
+    return {"deleted": job_queue.purge(datetime.timedelta(days=payload.get('days', app.config['JOB_RETENTION_DAYS'])))}
+
+@job_registry.job('purge_idempotency_keys')
+def purge_idempotency_keys_job(payload):
+    return {"deleted": purge_idempotency_keys()}
+
+@job_registry.job('yearly_report')
+def yearly_report_job(payload):
+    """A year of one user's spending: month x category totals, top merchants and emotions, largest expenses."""
+    user_id = payload['user_id']; year = int(payload['year'])
+    in_year = (Expense.user_id == user_id, Expense.date >= datetime.date(year, 1, 1), Expense.date < datetime.date(year + 1, 1, 1))
+    by_month = defaultdict(lambda: defaultdict(int)); by_category = defaultdict(int); by_emotion = defaultdict(int); count = 0
+    for month, category, emotion_tag, total, rows in db.session.query(MonthlySpend.month, MonthlySpend.category, MonthlySpend.emotion_tag,
+                                                                      MonthlySpend.total, MonthlySpend.count).filter_by(user_id=user_id, year=year):
+        by_month[month][category] += total; by_category[category] += total; count += rows
+        if emotion_tag: by_emotion[emotion_tag] += total
+    merchants = db.session.query(Expense.merchant, db.func.sum(Expense.amount), db.func.count(Expense.id))\
+        .filter(*in_year, Expense.merchant.isnot(None)).group_by(Expense.merchant)\
+        .order_by(db.func.sum(Expense.amount).desc()).limit(10).all()
+    largest = db.session.execute(db.select(*EXPENSE_ROWS.columns).where(*in_year)
+                                 .order_by(Expense.amount.desc(), Expense.id).limit(10)).all()
+    total = sum(by_category.values()); days = (min(datetime.date.today(), datetime.date(year, 12, 31)) - datetime.date(year, 1, 1)).days + 1
+    return {
+        "year": year, "total": to_rupees(total), "expense_count": count, "daily_average": to_rupees(total // days) if days > 0 else 0,
+        "by_month": {m: {c: to_rupees(t) for c, t in sorted(by_month[m].items())} for m in range(1, 13) if m in by_month},
+        "by_category": {c: to_rupees(t) for c, t in sorted(by_category.items(), key=lambda item: -item[1])},
+        "by_emotion": {e: to_rupees(t) for e, t in sorted(by_emotion.items(), key=lambda item: -item[1])},
+        "top_merchants": [{"merchant": m, "total": to_rupees(t), "count": n} for m, t, n in merchants],
+        "largest_expenses": json.loads(EXPENSE_ROWS.encode(largest), parse_float=Decimal)}
+
+# Forecasts are per day, so they are rebuilt just after midnight (UTC) for everyone
+job_registry.schedule('precompute_forecasts', every=datetime.timedelta(days=1), at=datetime.timedelta(minutes=5))
+job_registry.schedule('purge_jobs', every=datetime.timedelta(days=1), at=datetime.timedelta(hours=3))
+job_registry.schedule('purge_idempotency_keys', every=datetime.timedelta(hours=1))
 
 # --- Authentication Routes ---
 @app.route('/register', methods=['GET', 'POST'])
@@ -191,7 +1384,10 @@ def register():
             return redirect(url_for('register'))
 
         new_user = User(username=form.username.data, email=form.email.data)
-        new_user.set_password(form.password.data)
+        try: new_user.set_password(form.password.data)
+        except HashingOverloaded:
+            flash(get_translation('auth.busy'), 'warning')
+            return render_template('register.html', title='Register', form=form), 503
         db.session.add(new_user)
         db.session.commit()
         flash('Registration successful! Please log in.', 'success')
@@ -205,7 +1401,16 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and user.check_password(form.password.data):
+        try: authenticated = user is not None and user.check_password(form.password.data)
+        except HashingOverloaded:
+            flash(get_translation('auth.busy'), 'warning')
+            return render_template('login.html', title='Login', form=form), 503
+        if authenticated and password_hasher.needs_rehash(user.password_hash):
+            # Upgrade hashes made at an older (cheaper) cost while we have the plaintext;
+            # under load just skip it, the next login will try again
+            try: user.set_password(form.password.data); db.session.commit()
+            except HashingOverloaded: pass
+        if authenticated:
             login_user(user, remember=form.remember.data)
             # Clear language selection on new login to show modal
             session.pop('language_selected', None)
@@ -271,7 +1476,7 @@ def add_expense_submit():
 
     if form.validate_on_submit():
         new_expense = Expense(
-            amount=form.amount.data,
+            amount=to_paise(form.amount.data),
             category=form.category.data,
             description=form.description.data,
             merchant=form.merchant.data,
@@ -280,6 +1485,8 @@ def add_expense_submit():
             user_id=current_user.id
         )
         db.session.add(new_expense)
+        rollup_add_expense(new_expense)
+        bump_data_version(current_user.id)
         db.session.commit()
         flash('Expense logged successfully via form!', 'success')
         return redirect(url_for('add_expense_page')) # Redirect back to clear form
@@ -290,46 +1497,82 @@ def add_expense_submit():
 
 
 # Endpoint for JSON based expense logging (primarily for Smart Log JS)
+def smart_expense_from_payload(data, parsed_data, user_id):
+    """Build an Expense from parsed smart-log text plus the explicit overrides in data."""
+    if not parsed_data.get('amount'):
+        raise ValueError("Could not parse amount from text.")
+    return Expense(user_id=user_id, **expense_row_from_payload(data, parsed_data))
+
 @app.route('/log_expense_json', methods=['POST']) # Renamed to avoid confusion with WTForm POST
 @login_required
+@idempotent
 def log_expense_json():
     data = request.json
     if not data:
         return jsonify({"error": "Invalid JSON payload"}), 400
-        
-    parsed_data = {}
+    if isinstance(data, list):
+        return log_expense_json_batch(data)
+
     text_input = data.get('text_input')
 
     if text_input:
-        parsed_data = parse_expense_text(text_input)
-        if not parsed_data.get('amount'):
-            return jsonify({"error": "Could not parse amount from text."}), 400
-        
-        parsed_data['amount'] = float(data.get('amount', parsed_data.get('amount')))
-        parsed_data['category'] = data.get('category') or parsed_data.get('category')
-        parsed_data['description'] = data.get('description') or parsed_data.get('description')
-        parsed_data['merchant'] = data.get('merchant') or parsed_data.get('merchant')
-        date_str = data.get('date')
-        parsed_data['date'] = datetime.datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else parsed_data.get('date', datetime.date.today())
-        parsed_data['emotion_tag'] = data.get('emotion_tag')
-
-        if not parsed_data.get('category'):
-            parsed_data['category'] = "Other"
-        if not parsed_data.get('description'):
-            parsed_data['description'] = f"{parsed_data['category']} expense"
-
-        new_expense = Expense(
-            amount=parsed_data['amount'], category=parsed_data['category'],
-            description=parsed_data['description'], date=parsed_data['date'],
-            merchant=parsed_data.get('merchant'), emotion_tag=parsed_data.get('emotion_tag'),
-            user_id=current_user.id
-        )
+        try: new_expense = smart_expense_from_payload(data, parse_expense_text(text_input), current_user.id)
+        except ValueError as e: return jsonify({"error": str(e)}), 400
         db.session.add(new_expense)
-        db.session.commit()
-        return jsonify({"message": "Smart expense logged successfully!", "expense": new_expense.as_dict()}), 201
+        rollup_add_expense(new_expense)
+        bump_data_version(current_user.id)
+        db.session.flush()
+        return commit_idempotent({"message": "Smart expense logged successfully!", "expense": new_expense.as_dict()}, 201)
     else:
         return jsonify({"error": "text_input not provided for smart logging OR this endpoint is for JSON only."}), 400
 
+def log_expense_json_batch(items):
+    """Array form of log_expense_json: items are text strings or expense objects, validated and inserted together.
+
+    Valid items are written with one bulk INSERT and one commit; results has
+    an entry per item, in order, with its status and expense id or error.
+    """
+    if len(items) > app.config['EXPENSE_BATCH_MAX_ITEMS']:
+        return jsonify({"error": f"At most {app.config['EXPENSE_BATCH_MAX_ITEMS']} expenses per request."}), 413
+    rows, errors = expense_rows_from_batch(items)
+    if not rows:
+        return jsonify({"error": "No expenses could be logged.", "errors": errors}), 400
+    inserted = insert_expense_rows(current_user.id, [row for _, row in rows])
+    results = sorted([{"index": index, "status": 201, "id": row.id} for (index, _), row in zip(rows, inserted)] +
+                     [{"index": error['index'], "status": 400, "error": error['error']} for error in errors], key=lambda result: result['index'])
+    return commit_idempotent({"message": f"{len(inserted)} expenses logged successfully!", "expenses": json.loads(EXPENSE_ROWS.encode(inserted), parse_float=Decimal),
+                              "errors": errors, "results": results}, 201)
+
+# Endpoint for logging many expenses at once; send an Idempotency-Key header to make retries safe
+@app.route('/api/expenses/batch', methods=['POST'])
+@login_required
+@idempotent
+def log_expenses_batch_api():
+    data = request.get_json(silent=True)
+    items = data.get('expenses') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Send a JSON array of expenses (or {\"expenses\": [...]})."}), 400
+    return log_expense_json_batch(items)
+
+# Endpoint for bulk importing a bank statement (CSV or OFX upload)
+@app.route('/api/import', methods=['POST'])
+@login_required
+def import_statement_api():
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({"error": "Upload a statement file in the 'file' field."}), 400
+    file_format = request.form.get('format') or detect_format(upload.filename)
+    try:
+        column_map = parse_column_map(request.form.get('column_map'))
+        batch_size = min(max(int(request.form.get('batch_size', app.config['IMPORT_BATCH_SIZE'])), 1), 10000)
+        text_stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', errors='replace', newline='')
+        records = iter_statement_records(text_stream, file_format, column_map, request.form.get('date_format'),
+                                         request.form.get('amount_sign') or 'auto')
+        summary = import_expenses(current_user.id, records, batch_size)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"message": f"Imported {summary['imported']} expenses.", **summary}), 201
 
 @app.route('/dashboard')
 @login_required
@@ -337,39 +1580,72 @@ def dashboard(): return render_template('dashboard.html')
 
 @app.route('/api/spending_by_category')
 @login_required
+@versioned_cache
 def spending_by_category_api():
-    category_spending = db.session.query(Expense.category, db.func.sum(Expense.amount))\
-        .filter_by(user_id=current_user.id).group_by(Expense.category).all()
+    category_spending = db.session.query(MonthlySpend.category, db.func.sum(MonthlySpend.total))\
+        .filter_by(user_id=current_user.id).group_by(MonthlySpend.category).order_by(MonthlySpend.category).all()
     labels = [item[0] for item in category_spending]
-    data_values = [float(item[1]) for item in category_spending]
+    data_values = [to_rupees(item[1]) for item in category_spending]
     return jsonify({"labels": labels, "data": data_values})
 
 @app.route('/api/spending_over_time')
 @login_required
+@versioned_cache
 def spending_over_time_api():
-    user_expenses = Expense.query.filter_by(user_id=current_user.id).order_by(Expense.date.asc()).all()
-    if not user_expenses: return jsonify({"labels": [], "data": []})
-    monthly_spending = defaultdict(float)
-    first_expense_date = user_expenses[0].date; last_expense_date = user_expenses[-1].date
-    for expense in user_expenses:
-        month_year_key = expense.date.strftime("%Y-%m")
-        monthly_spending[month_year_key] += expense.amount
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in TIME_GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of {', '.join(TIME_GRANULARITIES)}"}), 400
+    try: start, end = date_range_args()
+    except ValueError as e: return jsonify({"error": str(e)}), 400
+
+    if granularity == 'month' and start is None and end is None:
+        # Whole-history monthly view is served straight from the rollup
+        rows = db.session.query(MonthlySpend.year, MonthlySpend.month, db.func.sum(MonthlySpend.total))\
+            .filter_by(user_id=current_user.id).group_by(MonthlySpend.year, MonthlySpend.month)\
+            .order_by(MonthlySpend.year, MonthlySpend.month).all()
+        spending = {datetime.date(year, month, 1): total or 0 for year, month, total in rows}
+    else:
+        spending = {period: total or 0 for period, _, total, _, _ in spending_aggregates(current_user.id, granularity, (), start, end)}
+
+    try: return jsonify(time_series(spending, granularity, start, end))
+    except ValueError as e: return jsonify({"error": str(e)}), 400
+
+def time_series(spending, granularity, start=None, end=None):
+    """Chart labels/data for {period start: paise}, zero-filling the periods from start (or the first) to end (or the last).
+
+    More than TIME_SERIES_MAX_PERIODS periods raises ValueError for an
+    explicit start and end; with bounds taken from the data, only the
+    periods with spending are returned instead.
+    """
+    if not spending and (start is None or end is None): return {"labels": [], "data": []}
+    first = start or min(spending); last = end or max(spending)
+    periods = iter_periods(first, last, granularity)
+    if period_count(first, last, granularity) > TIME_SERIES_MAX_PERIODS:
+        if start is not None and end is not None:
+            raise ValueError(f"At most {TIME_SERIES_MAX_PERIODS} {granularity}s can be charted; narrow start/end or use a coarser granularity.")
+        # Bounds taken from the data (e.g. one expense dated decades off): chart only the periods with spending
+        periods = sorted(period for period in spending if first <= period <= last)
+    label_format = PERIOD_LABEL_FORMATS[granularity]
     labels = []; data_values = []
-    current_loop_date = datetime.date(first_expense_date.year, first_expense_date.month, 1)
-    while current_loop_date <= last_expense_date:
-        labels.append(current_loop_date.strftime("%b %Y"))
-        data_values.append(monthly_spending.get(current_loop_date.strftime("%Y-%m"), 0))
-        if current_loop_date.month == 12: current_loop_date = datetime.date(current_loop_date.year + 1, 1, 1)
-        else: current_loop_date = datetime.date(current_loop_date.year, current_loop_date.month + 1, 1)
-    return jsonify({"labels": labels, "data": data_values})
+    for period in periods:
+        labels.append(period.strftime(label_format))
+        data_values.append(to_rupees(spending[period]) if period in spending else 0)
+    return {"labels": labels, "data": data_values}
+
+def chart_series(totals):
+    """Chart labels/data for {label: paise}, in label order."""
+    labels = sorted(totals)
+    return {"labels": labels, "data": [to_rupees(totals[label]) for label in labels]}
 
 @app.route('/api/emotion_spending')
 @login_required
+@versioned_cache
 def emotion_spending_api():
-    emotion_summary_query = db.session.query(Expense.emotion_tag, db.func.sum(Expense.amount))\
-        .filter(Expense.user_id == current_user.id, Expense.emotion_tag != None).group_by(Expense.emotion_tag).all()
+    emotion_summary_query = db.session.query(MonthlySpend.emotion_tag, db.func.sum(MonthlySpend.total))\
+        .filter(MonthlySpend.user_id == current_user.id, MonthlySpend.emotion_tag != '')\
+        .group_by(MonthlySpend.emotion_tag).order_by(MonthlySpend.emotion_tag).all()
     labels = [item[0] for item in emotion_summary_query]
-    data_values = [float(item[1]) for item in emotion_summary_query]
+    data_values = [to_rupees(item[1]) for item in emotion_summary_query]
     return jsonify({"labels": labels, "data": data_values})
 
 @app.route('/budget_page')
@@ -384,48 +1660,167 @@ def budget_page():
 @app.route('/set_budget', methods=['POST']) # This is an API endpoint, keep as JSON
 @login_required
 def set_budget():
-    data = request.json; category = data.get('category'); amount = float(data.get('amount'))
+    data = request.json; category = data.get('category')
+    try: amount = to_paise(data.get('amount'))
+    except ValueError: return jsonify({"error": "Invalid budget data"}), 400
     month = int(data.get('month')); year = int(data.get('year'))
     if not category or amount < 0 or not (1 <= month <= 12) or year < 2000:
         return jsonify({"error": "Invalid budget data"}), 400
     existing_budget = Budget.query.filter_by(user_id=current_user.id, category=category, month=month, year=year).first()
     if existing_budget: existing_budget.amount = amount; message = "Budget updated!"
     else: new_budget = Budget(user_id=current_user.id, category=category, amount=amount, month=month, year=year); db.session.add(new_budget); message = "Budget set!"
+    bump_data_version(current_user.id)
     db.session.commit()
     budget_entry = existing_budget or new_budget
     return jsonify({"message": message, "budget": budget_entry.as_dict()}), 201
 
+def monthly_category_totals(user_id, year, month):
+    """Sum a user's spending per category for one month in a single grouped rollup query."""
+    rows = db.session.query(MonthlySpend.category, db.func.sum(MonthlySpend.total))\
+        .filter_by(user_id=user_id, year=year, month=month)\
+        .group_by(MonthlySpend.category).all()
+    return {category: total or 0 for category, total in rows}
+
+def compute_budget_status(user_id, year, month, now=None, category_totals=None):
+    """Budget status for every budget of a month.
+
+    Category totals come from one grouped query (or the caller, when it has
+    already read them); the "Overall" budget is the rollup of those totals,
+    so the cost does not grow with the number of budgets. Current-month
+    forecasts come from user_forecast(), which never writes.
+    """
+    now = now or datetime.datetime.now()
+    user_budgets = db.session.query(Budget.category, Budget.amount).filter_by(user_id=user_id, month=month, year=year).all()
+    if not user_budgets: return []
+    if category_totals is None: category_totals = monthly_category_totals(user_id, year, month)
+    overall_total = sum(category_totals.values())
+    is_current_month = month == now.month and year == now.year
+    # Spent so far plus the forecaster's projection for the rest of the month (weekday-adjusted trend + recurring bills)
+    if is_current_month: projected = user_forecast(user_id, now.date())["categories"]
+    status_list = []
+    for category, amount in user_budgets:
+        if category == "Overall": current_spending = overall_total; rest = sum(projected.values()) if is_current_month else 0
+        else: current_spending = category_totals.get(category, 0); rest = projected.get(category, 0) if is_current_month else 0
+        remaining_budget = amount - current_spending
+        if is_current_month:
+            forecast = current_spending + rest
+            on_track = forecast <= amount if forecast > 0 and amount > 0 else (current_spending <= amount)
+        else: forecast = current_spending; on_track = current_spending <= amount
+        status_list.append({
+            "category": category, "budget_amount": to_rupees(amount), "spent": to_rupees(current_spending),
+            "remaining": to_rupees(remaining_budget), "forecasted_spending": to_rupees(forecast), "on_track": on_track,
+            "month": month, "year": year})
+    return status_list
+
 @app.route('/api/budget_status')
 @login_required
 def budget_status_api():
     now = datetime.datetime.now()
     target_month = request.args.get('month', default=now.month, type=int)
     target_year = request.args.get('year', default=now.year, type=int)
-    user_budgets = Budget.query.filter_by(user_id=current_user.id, month=target_month, year=target_year).all()
-    status_list = []
-    for budget in user_budgets:
-        query = db.session.query(db.func.sum(Expense.amount)).filter(
-            Expense.user_id == current_user.id, 
-            db.extract('month', Expense.date) == target_month,
-            db.extract('year', Expense.date) == target_year)
-        if budget.category != "Overall": query = query.filter(Expense.category == budget.category)
-        current_spending = float(query.scalar() or 0.0)
-        remaining_budget = budget.amount - current_spending; forecast = 0; on_track = True
-        if target_month == now.month and target_year == now.year:
-            days_in_month_obj = datetime.date(target_year, target_month + 1, 1) - datetime.timedelta(days=1) if target_month < 12 else datetime.date(target_year, 12, 31)
-            days_in_month = days_in_month_obj.day; days_passed = now.day
-            days_left = days_in_month - days_passed if days_passed <= days_in_month else 0
-            if days_passed > 0 and budget.amount >= 0:
-                daily_avg_spending = current_spending / days_passed
-                forecast = current_spending + (daily_avg_spending * days_left if days_left > 0 else 0)
-            elif budget.amount == 0: forecast = current_spending
-            on_track = forecast <= budget.amount if forecast > 0 and budget.amount > 0 else (current_spending <= budget.amount)
-        else: forecast = current_spending; on_track = current_spending <= budget.amount
-        status_list.append({
-            "category": budget.category, "budget_amount": budget.amount, "spent": current_spending,
-            "remaining": remaining_budget, "forecasted_spending": forecast, "on_track": on_track,
-            "month": target_month, "year": target_year})
-    return jsonify(status_list)
+    return jsonify(compute_budget_status(current_user.id, target_year, target_month, now))
+
+@app.route('/api/alerts')
+@login_required
+@versioned_cache
+def alerts_api():
+    """Budget alerts raised by the user's expense writes, newest first.
+
+    Filter with month and year; page back with before_id (the last id seen),
+    or poll for new ones with after_id.
+    """
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+    query = db.select(BudgetAlert).where(BudgetAlert.user_id == current_user.id)
+    if request.args.get('month', type=int) and request.args.get('year', type=int):
+        query = query.where(BudgetAlert.year == request.args.get('year', type=int), BudgetAlert.month == request.args.get('month', type=int))
+    if request.args.get('before_id', type=int): query = query.where(BudgetAlert.id < request.args.get('before_id', type=int))
+    if request.args.get('after_id', type=int): query = query.where(BudgetAlert.id > request.args.get('after_id', type=int))
+    alerts = db.session.scalars(query.order_by(BudgetAlert.id.desc()).limit(per_page + 1)).all()
+    return jsonify({"alerts": [alert.as_dict() for alert in alerts[:per_page]], "has_more": len(alerts) > per_page})
+
+@app.route('/api/dashboard_summary')
+@login_required
+@versioned_cache
+def dashboard_summary_api():
+    """Everything dashboard.html draws in one response.
+
+    Without a date range all three charts and the budget month come from one
+    read of the user's monthly_spend rows; with start/end (or a finer
+    granularity) they come from one grouped pass over raw expenses instead.
+    """
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in TIME_GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of {', '.join(TIME_GRANULARITIES)}"}), 400
+    try: start, end = date_range_args()
+    except ValueError as e: return jsonify({"error": str(e)}), 400
+    now = datetime.datetime.now()
+    month = request.args.get('month', default=now.month, type=int); year = request.args.get('year', default=now.year, type=int)
+
+    by_category = defaultdict(int); by_period = defaultdict(int); by_emotion = defaultdict(int); budget_month_totals = None
+    if granularity == 'month' and start is None and end is None:
+        rows = db.session.query(MonthlySpend.year, MonthlySpend.month, MonthlySpend.category, MonthlySpend.emotion_tag, MonthlySpend.total)\
+            .filter_by(user_id=current_user.id).all()
+        budget_month_totals = defaultdict(int)
+        for row_year, row_month, category, emotion_tag, total in rows:
+            by_period[datetime.date(row_year, row_month, 1)] += total
+            if row_year == year and row_month == month: budget_month_totals[category] += total
+            by_category[category] += total
+            if emotion_tag: by_emotion[emotion_tag] += total
+    else:
+        for period, (category, emotion_tag), total, _, _ in spending_aggregates(current_user.id, granularity, ('category', 'emotion_tag'), start, end):
+            by_period[period] += total
+            by_category[category] += total
+            if emotion_tag: by_emotion[emotion_tag] += total
+
+    try: spending_over_time = time_series(by_period, granularity, start, end)
+    except ValueError as e: return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "spending_by_category": chart_series(by_category),
+        "spending_over_time": spending_over_time,
+        "emotion_spending": chart_series(by_emotion),
+        "budget_status": compute_budget_status(current_user.id, year, month, now, budget_month_totals),
+        "month": month, "year": year})
+
+@app.route('/api/analytics')
+@login_required
+@versioned_cache
+def analytics_api():
+    """Spending per period (granularity) and up to two of category/merchant/emotion_tag (group_by, comma-separated).
+
+    Each row has the total, count and average expense, and the change from
+    the same group's previous period (previous_total is 0 when the group had
+    no spending then, and null before the first period asked for). Groups
+    only appear in the periods they have spending in.
+    """
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in TIME_GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of {', '.join(TIME_GRANULARITIES)}"}), 400
+    group_by = [name for name in request.args.get('group_by', '').split(',') if name]
+    if len(group_by) > ANALYTICS_MAX_GROUP_BY or len(set(group_by)) != len(group_by) or not set(group_by) <= set(ANALYTICS_DIMENSIONS):
+        return jsonify({"error": f"group_by takes up to {ANALYTICS_MAX_GROUP_BY} of {', '.join(ANALYTICS_DIMENSIONS)}"}), 400
+    try: start, end = date_range_args()
+    except ValueError as e: return jsonify({"error": str(e)}), 400
+    if start and end and start > end: return jsonify({"error": "start must not be after end."}), 400
+
+    rows = spending_aggregates(current_user.id, granularity, group_by, start, end, previous=True, limit=ANALYTICS_MAX_ROWS + 1)
+    truncated = len(rows) > ANALYTICS_MAX_ROWS; rows = rows[:ANALYTICS_MAX_ROWS]
+    first_period = period_start(start, granularity) if start else (rows[0][0] if rows else None)
+    label_format = PERIOD_LABEL_FORMATS[granularity]
+    results = []; grand_total = 0; grand_count = 0
+    for period, groups, total, count, before in rows:
+        previous_period = period_start(period - datetime.timedelta(days=1), granularity)
+        if before is not None and before[0] == previous_period: previous_total = before[1]
+        else: previous_total = 0 if previous_period >= first_period else None
+        result = {"period": period.isoformat(), "label": period.strftime(label_format), **dict(zip(group_by, groups)),
+                  "total": to_rupees(total), "count": count, "average": to_rupees(round(total / count)),
+                  "previous_total": to_rupees(previous_total),
+                  "change": to_rupees(total - previous_total) if previous_total is not None else None,
+                  "change_pct": round((total - previous_total) * 100 / previous_total, 1) if previous_total else None}
+        results.append(result); grand_total += total; grand_count += count
+    return jsonify({
+        "granularity": granularity, "group_by": group_by, "start": start.isoformat() if start else None, "end": end.isoformat() if end else None,
+        "rows": results, "truncated": truncated,
+        "totals": {"total": to_rupees(grand_total), "count": grand_count, "average": to_rupees(round(grand_total / grand_count)) if grand_count else None}})
 
 @app.route('/goals_page')
 @login_required
@@ -438,7 +1833,7 @@ def set_goal():
     current_amount_str = data.get('current_amount', '0.0'); due_date_str = data.get('due_date')
     if not name or not target_amount_str: return jsonify({"error": "Goal name and target amount are required."}), 400
     try:
-        target_amount = float(target_amount_str); current_amount = float(current_amount_str)
+        target_amount = to_paise(target_amount_str); current_amount = to_paise(current_amount_str)
         if target_amount <= 0: raise ValueError("Target amount must be positive.")
         if current_amount < 0: raise ValueError("Current amount cannot be negative.")
     except ValueError as e: return jsonify({"error": f"Invalid amount: {e}"}), 400
@@ -447,7 +1842,7 @@ def set_goal():
         try: due_date = datetime.datetime.strptime(due_date_str, '%Y-%m-%d').date()
         except ValueError: return jsonify({"error": "Invalid due date format."}), 400
     new_goal = Goal(user_id=current_user.id, name=name, target_amount=target_amount, current_amount=current_amount, due_date=due_date)
-    db.session.add(new_goal); db.session.commit()
+    db.session.add(new_goal); bump_data_version(current_user.id); db.session.commit()
     return jsonify({"message": "Goal set successfully!", "goal": new_goal.as_dict()}), 201
 
 @app.route('/contribute_to_goal/<int:goal_id>', methods=['POST']) # API endpoint
@@ -456,20 +1851,70 @@ def contribute_to_goal(goal_id):
     data = request.json; amount_str = data.get('amount')
     if not amount_str: return jsonify({"error": "Contribution amount required."}), 400
     try:
-        amount = float(amount_str)
+        amount = to_paise(amount_str)
         if amount <= 0: raise ValueError("Contribution must be positive.")
     except ValueError as e: return jsonify({"error": f"Invalid amount: {e}"}), 400
     goal = Goal.query.filter_by(id=goal_id, user_id=current_user.id).first_or_404() 
-    goal.current_amount += amount
-    contribution_expense = Expense(user_id=current_user.id, amount=amount, category="Savings Goal", description=f"Contribution to goal: {goal.name}", date=datetime.date.today(), merchant="Self/Bank", emotion_tag="motivated")
-    db.session.add(contribution_expense); db.session.commit()
-    return jsonify({"message": f"Contributed {amount:.2f} to {goal.name}", "goal": goal.as_dict()})
+    goal.current_amount = (goal.current_amount or 0) + amount
+    contribution_expense = Expense(user_id=current_user.id, amount=amount, category=GOAL_CONTRIBUTION_CATEGORY, description=f"{GOAL_CONTRIBUTION_PREFIX}{goal.name}", date=datetime.date.today(), merchant="Self/Bank", emotion_tag="motivated")
+    db.session.add(contribution_expense); rollup_add_expense(contribution_expense); bump_data_version(current_user.id)
+    db.session.commit()
+    return jsonify({"message": f"Contributed {format_rupees(amount)} to {goal.name}", "goal": goal.as_dict()})
 
 @app.route('/api/goals')
 @login_required
+@versioned_cache
 def get_goals_api():
-    user_goals_query = Goal.query.filter_by(user_id=current_user.id).all() 
-    return jsonify([goal.as_dict() for goal in user_goals_query])
+    projections = user_forecast(current_user.id)["goals"]
+    user_goals_query = Goal.query.filter_by(user_id=current_user.id).all()
+    goals = []
+    for goal in user_goals_query:
+        projection = projections.get(str(goal.id), {})
+        goals.append({**goal.as_dict(), "contribution_rate_per_day": to_rupees(projection.get("rate", 0)),
+                      "projected_completion_date": projection.get("completion"), "on_track": projection.get("on_track")})
+    return jsonify(goals)
+
+@app.route('/api/reports/yearly', methods=['POST'])
+@login_required
+def request_yearly_report():
+    """Queue a yearly report; poll the returned job's status_url for the result."""
+    year = (request.get_json(silent=True) or {}).get('year', datetime.date.today().year)
+    try: year = int(year)
+    except (TypeError, ValueError): return jsonify({"error": "year must be a number"}), 400
+    if not 2000 <= year <= 2100: return jsonify({"error": "year must be between 2000 and 2100"}), 400
+    payload = {"user_id": current_user.id, "year": year}
+    # The same report already waiting or running is returned instead of queueing it twice
+    job = Job.query.filter(Job.user_id == current_user.id, Job.kind == 'yearly_report', Job.payload == dump_payload(payload),
+                           Job.status.in_((QUEUED, RUNNING))).first()
+    if job is None: job = job_queue.enqueue('yearly_report', payload, user_id=current_user.id)
+    response = jsonify({"job": job.as_dict(), "status_url": url_for('job_status_api', job_id=job.id)})
+    response.headers['Location'] = url_for('job_status_api', job_id=job.id)
+    return response, 202
+
+@app.route('/api/jobs')
+@login_required
+def jobs_api():
+    jobs = Job.query.filter_by(user_id=current_user.id).order_by(Job.created_at.desc(), Job.id.desc()).limit(20).all()
+    return jsonify([job.as_dict() for job in jobs])
+
+@app.route('/api/jobs/<int:job_id>')
+@login_required
+def job_status_api(job_id):
+    return jsonify(Job.query.filter_by(id=job_id, user_id=current_user.id).first_or_404().as_dict())
+
+@app.route('/api/cache_stats')
+@login_required
+def cache_stats_api():
+    return jsonify(response_cache.stats())
+
+# Prometheus scrape endpoint (all workers when METRICS_DIR is set)
+@app.route('/metrics')
+def metrics():
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        return "Unauthorized", 401
+    snapshots = metrics_store.collect(metrics_registry) if metrics_store else [metrics_registry.snapshot()]
+    return app.response_class(metrics_registry.render(snapshots), mimetype='text/plain; version=0.0.4')
 
 @app.route('/timeline_page')
 @login_required
@@ -478,34 +1923,111 @@ def timeline_page(): return render_template('timeline.html')
 @app.route('/api/expenses_timeline')
 @login_required
 def expenses_timeline_api():
-    page = request.args.get('page', 1, type=int); per_page = request.args.get('per_page', 10, type=int)
-    pagination = Expense.query.filter_by(user_id=current_user.id)\
-        .order_by(Expense.date.desc(), Expense.id.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False) 
-    expenses_on_page = [exp.as_dict() for exp in pagination.items]
-    return jsonify({
-        "expenses": expenses_on_page, "total_items": pagination.total, "current_page": pagination.page,
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), MAX_PER_PAGE)
+    if 'cursor' in request.args or request.args.get('mode') == 'cursor':
+        return expenses_timeline_keyset(per_page)
+    page = request.args.get('page', 1, type=int)
+    select = db.select(*EXPENSE_ROWS.columns).where(Expense.user_id == current_user.id)\
+        .order_by(Expense.date.desc(), Expense.id.desc())
+    pagination = RowPagination(select=select, session=db.session(), page=page, per_page=per_page,
+                               max_per_page=MAX_PER_PAGE, error_out=False)
+    return json_text_response(EXPENSE_ROWS.encode_document({
+        "total_items": pagination.total, "current_page": pagination.page,
         "per_page": pagination.per_page, "total_pages": pagination.pages,
-        "has_next": pagination.has_next, "has_prev": pagination.has_prev })
+        "has_next": pagination.has_next, "has_prev": pagination.has_prev }, "expenses", pagination.items))
+
+def expenses_timeline_keyset(per_page):
+    """Cursor mode of the timeline: an index range read on (user_id, date, id) per page, no COUNT/OFFSET."""
+    cursor = request.args.get('cursor'); direction = request.args.get('direction', 'next')
+    query = db.select(*EXPENSE_ROWS.columns).where(Expense.user_id == current_user.id)
+    if cursor:
+        try: cursor_date, cursor_id = decode_cursor(cursor)
+        except ValueError as e: return jsonify({"error": str(e)}), 400
+        key = db.tuple_(Expense.date, Expense.id)
+        query = query.where(key > (cursor_date, cursor_id) if direction == 'prev' else key < (cursor_date, cursor_id))
+    if cursor and direction == 'prev':
+        rows = db.session.execute(query.order_by(Expense.date.asc(), Expense.id.asc()).limit(per_page + 1)).all()
+        has_prev = len(rows) > per_page; has_next = True
+        rows = list(reversed(rows[:per_page]))
+    else:
+        rows = db.session.execute(query.order_by(Expense.date.desc(), Expense.id.desc()).limit(per_page + 1)).all()
+        has_next = len(rows) > per_page; has_prev = bool(cursor)
+        rows = rows[:per_page]
+    response = {
+        "per_page": per_page,
+        "next_cursor": encode_cursor(rows[-1]) if rows and has_next else None,
+        "prev_cursor": encode_cursor(rows[0]) if rows and has_prev else None,
+        "has_next": has_next, "has_prev": has_prev }
+    if request.args.get('include_total') == '1':
+        response["total_items"] = user_expense_count(current_user.id)
+    return json_text_response(EXPENSE_ROWS.encode_document(response, "expenses", rows))
+
+SEARCH_SORTS = ('relevance', 'date')
+
+@app.route('/api/search')
+@login_required
+@versioned_cache
+def search_expenses_api():
+    """Full-text search over description, merchant and category.
+
+    Every word of q must match the start of a word (so "ube rid" finds "Uber
+    ride"). min_amount/max_amount (rupees) and start/end narrow the results;
+    sort=relevance (default) or date. Pages are keyset cursors, so deep pages
+    cost the same as the first.
+    """
+    terms = search_terms(request.args.get('q'))
+    if not terms: return jsonify({"error": "q must contain at least one word"}), 400
+    sort = request.args.get('sort', 'relevance')
+    if sort not in SEARCH_SORTS: return jsonify({"error": f"sort must be one of {', '.join(SEARCH_SORTS)}"}), 400
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), MAX_PER_PAGE))
+    try:
+        start, end = date_range_args()
+        min_amount = to_paise(request.args['min_amount']) if request.args.get('min_amount') else None
+        max_amount = to_paise(request.args['max_amount']) if request.args.get('max_amount') else None
+        cursor = decode_search_cursor(request.args['cursor'], sort) if request.args.get('cursor') else None
+    except ValueError as e: return jsonify({"error": str(e)}), 400
+    backend = expense_search()
+    if backend is None: return jsonify({"error": "Search is not available on this database"}), 501
+
+    if sort == 'date':
+        score = db.literal(None)
+        query = db.select(*EXPENSE_ROWS.columns, score.label('score')).where(backend.filter(current_user.id, terms))
+    else:
+        from_clause, match, score = backend.match(current_user.id, terms)
+        query = db.select(*EXPENSE_ROWS.columns, score.label('score')).select_from(from_clause).where(match)
+    if start: query = query.where(Expense.date >= start)
+    if end: query = query.where(Expense.date <= end)
+    if min_amount is not None: query = query.where(Expense.amount >= min_amount)
+    if max_amount is not None: query = query.where(Expense.amount <= max_amount)
+    newest_first = (Expense.date.desc(), Expense.id.desc())
+    if cursor:
+        cursor_score, cursor_date, cursor_id = cursor
+        older = db.tuple_(Expense.date, Expense.id) < (cursor_date, cursor_id)
+        query = query.where(older if sort == 'date' else db.or_(score > cursor_score, db.and_(score == cursor_score, older)))
+    query = query.order_by(*newest_first) if sort == 'date' else query.order_by(score, *newest_first)
+    rows = db.session.execute(query.limit(per_page + 1)).all()
+    has_next = len(rows) > per_page; rows = rows[:per_page]
+    document = {"query": terms, "sort": sort, "per_page": per_page, "has_next": has_next,
+                "next_cursor": encode_search_cursor(rows[-1], sort) if has_next else None}
+    return json_text_response(EXPENSE_ROWS.encode_document(document, "expenses", [row[:-1] for row in rows]))
 
 # API endpoint to get available months with expenses
 @app.route('/api/available_months')
 @login_required
+@versioned_cache
 def available_months_api():
-    # Get distinct months from user's expenses
-    months_query = db.session.query(
-        db.extract('year', Expense.date).label('year'),
-        db.extract('month', Expense.date).label('month')
-    ).filter_by(user_id=current_user.id).distinct().order_by(
-        db.desc('year'), db.desc('month')
-    ).all()
+    # Months with spending, from the monthly rollup rather than a scan of the user's expenses
+    months_query = db.session.query(MonthlySpend.year, MonthlySpend.month)\
+        .filter(MonthlySpend.user_id == current_user.id, MonthlySpend.count > 0).distinct()\
+        .order_by(MonthlySpend.year.desc(), MonthlySpend.month.desc()).all()
     
-    months_list = [{"year": int(row.year), "month": int(row.month)} for row in months_query]
+    months_list = [{"year": row.year, "month": row.month} for row in months_query]
     return jsonify(months_list)
 
 # API endpoint to get expenses for a specific month
 @app.route('/api/expenses_by_month')
 @login_required
+@versioned_cache
 def expenses_by_month_api():
     month = request.args.get('month', type=int)
     year = request.args.get('year', type=int)
@@ -515,14 +2037,177 @@ def expenses_by_month_api():
         now = datetime.datetime.now()
         month = now.month
         year = now.year
+    try: in_month = month_filter(Expense.date, year, month)
+    except ValueError: return jsonify({"error": "month must be 1-12 and year a valid calendar year"}), 400
     
-    expenses = Expense.query.filter(
+    rows = db.session.execute(db.select(*EXPENSE_ROWS.columns).where(
         Expense.user_id == current_user.id,
-        db.extract('month', Expense.date) == month,
-        db.extract('year', Expense.date) == year
-    ).order_by(Expense.date.desc(), Expense.id.desc()).all()
+        in_month
+    ).order_by(Expense.date.desc(), Expense.id.desc()))
     
-    return jsonify([exp.as_dict() for exp in expenses])
+    return json_text_response(EXPENSE_ROWS.encode(rows))
+
+@app.route('/api/sync')
+@login_required
+def sync_api():
+    """Expenses, budgets and goals changed after the since token, and the ids of those deleted since.
+
+    Clients apply a page's deletes before its rows, keep the token and call
+    again while has_more. Without since, or with a token this database never
+    issued, everything is sent again with reset: true (deletes are then
+    implied by absence).
+    """
+    per_page = min(max(request.args.get('per_page', 500, type=int), 1), SYNC_MAX_PER_PAGE)
+    include = request.args.get('include', ','.join(name for name, _ in SYNC_KINDS)).split(',')
+    if not set(include) <= {name for name, _ in SYNC_KINDS}:
+        return jsonify({"error": f"include takes a comma-separated subset of {', '.join(name for name, _ in SYNC_KINDS)}."}), 400
+    try: cursor = decode_sync_token(request.args['since']) if request.args.get('since') else None
+    except ValueError as e: return jsonify({"error": str(e)}), 400
+    # Versions commit in order (bump_data_version locks the user row), so everything stamped up to the
+    # committed version is visible now and later commits can only stamp higher ones
+    upper = db.session.execute(db.select(User.data_version).where(User.id == current_user.id)).scalar()
+    reset = cursor is None or cursor[0] > upper
+    seq, rank, row_id = (-1, SYNC_TOMBSTONE_RANK + 1, 0) if reset else cursor
+
+    def changed_after(model, kind_rank):
+        if kind_rank < rank: return model.change_seq > seq
+        if kind_rank == rank: return db.tuple_(model.change_seq, model.id) > (seq, row_id)
+        return model.change_seq >= seq
+
+    streams = []
+    for kind_rank, (name, model) in enumerate(SYNC_KINDS):
+        if name not in include: continue
+        columns = EXPENSE_ROWS.columns if model is Expense else (model,)
+        rows = db.session.execute(db.select(model.change_seq, model.id, *columns)
+                                  .where(model.user_id == current_user.id, model.change_seq <= upper, changed_after(model, kind_rank))
+                                  .order_by(model.change_seq, model.id).limit(per_page + 1)).all()
+        streams.append([(row[0], kind_rank, row[1], name, row[2:] if model is Expense else row[2]) for row in rows])
+    if not reset:
+        kind_names = {model.__tablename__: name for name, model in SYNC_KINDS if name in include}
+        rows = db.session.execute(db.select(Tombstone.change_seq, Tombstone.id, Tombstone.kind, Tombstone.row_id)
+                                  .where(Tombstone.user_id == current_user.id, Tombstone.kind.in_(kind_names), Tombstone.change_seq <= upper,
+                                         changed_after(Tombstone, SYNC_TOMBSTONE_RANK))
+                                  .order_by(Tombstone.change_seq, Tombstone.id).limit(per_page + 1)).all()
+        streams.append([(row[0], SYNC_TOMBSTONE_RANK, row[1], kind_names[row[2]], row[3]) for row in rows])
+    changes = list(itertools.islice(heapq.merge(*streams), per_page + 1))
+    has_more = len(changes) > per_page; changes = changes[:per_page]
+
+    document = {"deleted": {name: [] for name in include}, "has_more": has_more, "reset": reset,
+                "token": encode_sync_token(*changes[-1][:3]) if has_more else encode_sync_token(upper)}
+    expense_rows = []
+    for name in include:
+        if name != 'expenses': document[name] = []
+    for _, kind_rank, _, name, value in changes:
+        if kind_rank == SYNC_TOMBSTONE_RANK: document['deleted'][name].append(value)
+        elif name == 'expenses': expense_rows.append(value)
+        else: document[name].append(value.as_dict())
+    if 'expenses' not in include: return jsonify(document)
+    return json_text_response(EXPENSE_ROWS.encode_document(document, "expenses", expense_rows))
+
+@app.route('/api/events')
+@login_required
+def events_api():
+    """Server-Sent Events stream of the user's committed changes (see change_event()).
+
+    Each change event's id is the data version it brings the page to. A
+    reconnect whose Last-Event-ID (or last_event_id argument) is not the
+    current version, or a stream too slow to keep up, gets a resync event
+    instead and the page reloads its data. Streams end after EVENTS_STREAM_SECONDS; browsers
+    reconnect by themselves.
+    """
+    user_id = current_user.id
+    subscription = event_broker.subscribe(user_id)
+    if subscription is None:
+        response = jsonify({"error": "Too many live update streams right now; try again shortly."}); response.status_code = 503
+        response.headers['Retry-After'] = str(int(app.config['EVENTS_HEARTBEAT_SECONDS']))
+        return response
+    # Read after subscribing: a commit in between is both counted here and delivered to the subscription
+    version = db.session.execute(db.select(User.data_version).where(User.id == user_id)).scalar()
+    last_seen = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    stale = last_seen is not None and (not last_seen.isdigit() or int(last_seen) != version)
+    heartbeat = app.config['EVENTS_HEARTBEAT_SECONDS']; deadline = time.monotonic() + app.config['EVENTS_STREAM_SECONDS']
+    db.session.close()  # no pooled connection is held while the stream waits
+
+    def generate():
+        try:
+            yield f"retry: {int(heartbeat * 1000)}\n\n"
+            if stale: yield sse_event('resync', json.dumps({"version": version}), version)
+            while time.monotonic() < deadline:
+                messages = subscription.get(min(heartbeat, max(deadline - time.monotonic(), 0)))
+                if not messages: yield ": heartbeat\n\n"; continue
+                for message in messages:
+                    if message.get('resync'):
+                        current = db.session.execute(db.select(User.data_version).where(User.id == user_id)).scalar()
+                        yield sse_event('resync', json.dumps({"version": current}), current)
+                    else: yield sse_event('change', change_event(user_id, message), message['version'])
+                db.session.close()
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    response = app.response_class(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Don't let a reverse proxy buffer the stream
+    return response
+
+EXPORT_COLUMNS = ('id', 'date', 'amount', 'category', 'description', 'merchant', 'emotion_tag', 'user_id', 'created_at')
+EXPORT_AMOUNT_INDEX = EXPORT_COLUMNS.index('amount')
+EXPORT_FORMATS = {'csv': ('text/csv', 'csv'), 'ndjson': ('application/x-ndjson', 'ndjson')}
+
+def _export_lines(rows, export_format):
+    if export_format == 'csv':
+        buffer = io.StringIO(); writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS); yield buffer.getvalue()
+        for row in rows:
+            buffer.seek(0); buffer.truncate()
+            row = list(row); row[EXPORT_AMOUNT_INDEX] = to_rupees(row[EXPORT_AMOUNT_INDEX])
+            writer.writerow(row); yield buffer.getvalue()
+    else:
+        for row in rows:
+            record = dict(zip(EXPORT_COLUMNS, row))
+            record['amount'] = to_rupees(record['amount']); record['date'] = record['date'].isoformat()
+            if record['created_at'] is not None: record['created_at'] = record['created_at'].isoformat()
+            yield dumps_json(record) + '\n'
+
+def _export_chunks(lines, compress, chunk_size=64 * 1024):
+    """Group lines into ~64KB chunks, gzipping on the fly when asked."""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    pending = []; pending_size = 0
+    for line in lines:
+        pending.append(line); pending_size += len(line)
+        if pending_size >= chunk_size:
+            data = ''.join(pending).encode(); pending = []; pending_size = 0
+            data = compressor.compress(data) if compressor else data
+            if data: yield data
+    data = ''.join(pending).encode()
+    if compressor: data = compressor.compress(data) + compressor.flush()
+    if data: yield data
+
+# Stream the user's expenses as CSV or NDJSON without loading them into memory
+@app.route('/api/export')
+@login_required
+def export_expenses_api():
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    try: start, end = date_range_args()
+    except ValueError as e: return jsonify({"error": str(e)}), 400
+    compress = request.args.get('gzip') == '1'
+    query = db.select(*(getattr(Expense, c) for c in EXPORT_COLUMNS)).where(Expense.user_id == current_user.id)
+    if start: query = query.where(Expense.date >= start)
+    if end: query = query.where(Expense.date <= end)
+    if request.args.get('category'): query = query.where(Expense.category == request.args['category'])
+    # yield_per streams rows through a server-side cursor on Postgres
+    query = query.order_by(Expense.date, Expense.id).execution_options(yield_per=1000)
+
+    def generate():
+        rows = db.session.execute(query)
+        yield from _export_chunks(_export_lines(rows, export_format), compress)
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f"expenses.{extension}.gz" if compress else f"expenses.{extension}"
+    response = app.response_class(stream_with_context(generate()), mimetype='application/gzip' if compress else mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 # Route to display edit expense page
 @app.route('/edit_expense/<int:expense_id>', methods=['GET'])
@@ -530,6 +2215,7 @@ def expenses_by_month_api():
 def edit_expense_page(expense_id):
     expense = Expense.query.filter_by(id=expense_id, user_id=current_user.id).first_or_404()
     form = ExpenseForm(obj=expense)
+    form.amount.data = to_rupees(expense.amount)
     form.category.choices = [(c, c) for c in categories_db_static_list]
     return render_template('edit_expense.html', form=form, expense=expense)
 
@@ -542,12 +2228,15 @@ def edit_expense_submit(expense_id):
     form.category.choices = [(c, c) for c in categories_db_static_list]
     
     if form.validate_on_submit():
-        expense.amount = form.amount.data
+        rollup_remove_expense(expense)
+        expense.amount = to_paise(form.amount.data)
         expense.category = form.category.data
         expense.description = form.description.data
         expense.merchant = form.merchant.data
         expense.date = form.date.data
         expense.emotion_tag = form.emotion_tag.data if form.emotion_tag.data else None
+        rollup_add_expense(expense)
+        bump_data_version(current_user.id)
         db.session.commit()
         flash('Expense updated successfully!', 'success')
         return redirect(url_for('index'))
@@ -560,7 +2249,9 @@ def edit_expense_submit(expense_id):
 @login_required
 def delete_expense(expense_id):
     expense = Expense.query.filter_by(id=expense_id, user_id=current_user.id).first_or_404()
+    rollup_remove_expense(expense)
     db.session.delete(expense)
+    bump_data_version(current_user.id)
     db.session.commit()
     flash('Expense deleted successfully!', 'success')
     return redirect(url_for('index'))
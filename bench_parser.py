@@ -0,0 +1,65 @@
+import datetime
+import random
+import sys
+import timeit
+
+from app import parse_expense_text, parse_expense_texts
+from keyword_matcher import KeywordMatcher, longest_first
+
+# Micro-benchmark: compiled matcher parse_expense_text vs the original
+# per-call scan, at growing dictionary sizes.  Run: python bench_parser.py [n_texts]
+
+
+def legacy_parse_expense_text(text, categories, merchants):
+    """The pre-matcher implementation, kept here only as the benchmark baseline."""
+    amount = None; category = None; merchant = None; description = text
+    words = text.lower().split()
+    for i, word in enumerate(words):
+        cleaned_word = ''.join(filter(lambda x: x.isdigit() or x == '.', word))
+        if cleaned_word and (cleaned_word.replace('.', '', 1).isdigit() and cleaned_word.count('.') < 2):
+            try: amount = float(cleaned_word); words.pop(i); text = " ".join(words); break
+            except ValueError: pass
+    remaining_text_lower = text.lower()
+    for cat_option in categories:
+        if cat_option.lower() in remaining_text_lower: category = cat_option; break
+    sorted_merchants = sorted(merchants, key=len, reverse=True)
+    for merch_option in sorted_merchants:
+        if merch_option.lower() in remaining_text_lower: merchant = merch_option; break
+    if amount:
+        if category and merchant: description = f"{category} at {merchant}"
+        elif category: description = f"{category} expense"
+        elif merchant: description = f"Spent at {merchant}"
+        else: description = f"Expense of {amount}"
+    return {"amount": amount, "category": category, "merchant": merchant, "description": description, "date": datetime.date.today()}
+
+
+def synthetic_dictionary(prefix, size, rng):
+    syllables = ['ka', 'ro', 'mi', 'zu', 'ta', 'ne', 'shi', 'po', 'la', 'vi', 'dor', 'mart']
+    words = {f"{prefix}{''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))}" for _ in range(size * 2)}
+    return sorted(words)[:size]
+
+
+def main(n_texts=500):
+    rng = random.Random(42)
+    for size in (10, 1000, 10000):
+        categories = synthetic_dictionary('c', size, rng)
+        merchants = synthetic_dictionary('m', size, rng)
+        texts = [f"spent {rng.randint(1, 5000)} at {rng.choice(merchants)} for {rng.choice(categories)} today"
+                 if i % 4 else f"{rng.randint(1, 500)} misc stuff" for i in range(n_texts)]
+        category_matcher = KeywordMatcher(categories)
+        merchant_matcher = KeywordMatcher(merchants, rank=longest_first)
+
+        for text in texts:
+            assert legacy_parse_expense_text(text, categories, merchants) == \
+                parse_expense_text(text, category_matcher, merchant_matcher), text
+
+        legacy = timeit.timeit(lambda: [legacy_parse_expense_text(t, categories, merchants) for t in texts], number=1)
+        compiled = timeit.timeit(lambda: parse_expense_texts(texts, category_matcher, merchant_matcher), number=1)
+        build = timeit.timeit(lambda: (KeywordMatcher(categories), KeywordMatcher(merchants, rank=longest_first)), number=1)
+        print(f"dictionary={size:>6}  legacy {legacy / n_texts * 1e6:9.1f} us/text  "
+              f"compiled {compiled / n_texts * 1e6:7.1f} us/text  speedup {legacy / compiled:7.1f}x  "
+              f"(one-off build {build * 1e3:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,89 @@
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import timeit
+
+# Benchmark: /api/expenses_by_month served through RowEncoder vs the previous
+# ORM + as_dict() + jsonify path, for 1k and 10k expense months. Asserts the
+# two responses are byte-identical first.
+#
+#   python bench_serialization.py [--sizes 1000,10000] [--database-url URL]
+#
+# The database (a temp SQLite file by default) is dropped and refilled.
+
+
+def legacy_expenses_by_month(user_id, year, month):
+    """The pre-RowEncoder implementation, kept here only as the benchmark baseline."""
+    from flask import jsonify
+    from app import Expense, month_filter
+    expenses = Expense.query.filter(Expense.user_id == user_id, month_filter(Expense.date, year, month))\
+        .order_by(Expense.date.desc(), Expense.id.desc()).all()
+    return jsonify([exp.as_dict() for exp in expenses])
+
+
+def fill_month(db, Expense, user_id, year, month, size, rng):
+    days = (datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)).day
+    now = datetime.datetime(year, month, 1, 12)
+    descriptions = ["Groceries at Big Bazaar", "Uber ride", "Chai ☕ with team", "दवाई", 'Quote "test" \\ path']
+    db.session.execute(db.insert(Expense.__table__), [
+        {"user_id": user_id, "amount": rng.randint(100, 500000), "category": rng.choice(["Dining", "Transport", "Other"]),
+         "description": rng.choice(descriptions), "merchant": rng.choice([None, "Swiggy", "Uber"]),
+         "date": datetime.date(year, month, rng.randint(1, days)), "emotion_tag": rng.choice([None, "happy"]),
+         "created_at": now + datetime.timedelta(seconds=n * 37, microseconds=rng.randint(0, 999999))}
+        for n in range(size)])
+    db.session.commit()
+
+
+def main(sizes, iterations):
+    import app as app_module
+    from app import app, db, User, Expense, EXPENSE_ROWS
+    from response_cache import MemoryCacheBackend, ResponseCache
+    from werkzeug.security import generate_password_hash
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    app_module.response_cache = ResponseCache(MemoryCacheBackend(max_bytes=0))  # measure the work, not the cache
+    rng = random.Random(7)
+    with app.app_context():
+        db.drop_all(); db.create_all()
+        db.session.add(User(id=1, username='bench', email='bench@example.com',
+                            password_hash=generate_password_hash('benchmark-password', 'pbkdf2:sha256:1000')))
+        db.session.commit()
+        for n, size in enumerate(sizes):
+            fill_month(db, Expense, 1, 2025, n + 1, size, rng)
+
+    client = app.test_client()
+    client.post('/login', data={"email": "bench@example.com", "password": "benchmark-password"})
+    print(f"orjson {'used' if EXPENSE_ROWS._use_orjson else 'not used (not installed, or the rows hold money)'}")
+    for n, size in enumerate(sizes):
+        month = n + 1; url = f'/api/expenses_by_month?month={month}&year=2025'
+        with app.test_request_context():
+            expected = legacy_expenses_by_month(1, 2025, month).get_data()
+        body = client.get(url).get_data()
+        assert body == expected, f"responses differ for {size} rows"
+        with app.app_context():
+            rows = db.session.execute(db.select(*EXPENSE_ROWS.columns).where(Expense.user_id == 1,
+                                      app_module.month_filter(Expense.date, 2025, month))).all()
+        assert EXPENSE_ROWS._encode_pure(rows) == EXPENSE_ROWS.encode(rows)
+
+        def legacy():
+            with app.test_request_context(): legacy_expenses_by_month(1, 2025, month).get_data()
+        legacy_s = timeit.timeit(legacy, number=iterations) / iterations
+        route_s = timeit.timeit(lambda: client.get(url).get_data(), number=iterations) / iterations
+        pure_s = timeit.timeit(lambda: EXPENSE_ROWS._encode_pure(rows), number=iterations) / iterations
+        fast_s = timeit.timeit(lambda: EXPENSE_ROWS.encode(rows), number=iterations) / iterations
+        print(f"{size:>6} rows  legacy {legacy_s * 1e3:8.2f} ms  route {route_s * 1e3:8.2f} ms  "
+              f"speedup {legacy_s / route_s:5.1f}x  (encode only: pure {pure_s * 1e3:.2f} ms, "
+              f"default {fast_s * 1e3:.2f} ms, {len(body) / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Row encoder vs ORM serialisation benchmark.')
+    parser.add_argument('--sizes', default='1000,10000', help='Comma-separated rows per month.')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--database-url', default=None, help='Scratch database (defaults to a temp SQLite file).')
+    options = parser.parse_args()
+    os.environ['DATABASE_URL'] = options.database_url or \
+        f"sqlite:///{os.path.join(tempfile.gettempdir(), 'expense_tracker_bench_serialization.db')}"
+    main([int(s) for s in options.sizes.split(',')], options.iterations)
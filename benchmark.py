@@ -0,0 +1,314 @@
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Synthetic dataset generator and route benchmark runner.
+#
+# Both run against whatever DATABASE_URL the process was started with, which
+# must be a scratch database: `generate` drops and recreates every table.
+# manage.py's `bench run` starts a fresh `python benchmark.py generate` and
+# `python benchmark.py measure` subprocess per (database, size) so each data
+# point gets its own schema, engine and peak-RSS reading.
+
+BENCH_PASSWORD = 'benchmark-password'
+
+# category -> (share of expenses, median amount in ₹, merchants)
+CATEGORY_PROFILE = {
+    "Groceries": (0.22, 600, ["Big Bazaar", "Local Market"]),
+    "Transport": (0.18, 180, ["Uber"]),
+    "Dining": (0.17, 350, ["Swiggy", "Starbucks"]),
+    "Shopping": (0.12, 1200, ["Amazon"]),
+    "Entertainment": (0.07, 500, ["INOX"]),
+    "Utilities": (0.06, 1500, ["BSES"]),
+    "Health": (0.05, 700, ["Apollo Pharmacy"]),
+    "Education": (0.03, 1500, ["Udemy"]),
+    "Travel": (0.03, 4000, [None]),
+    "Other": (0.07, 300, [None, "Local Market"]),
+}
+EMOTION_WEIGHTS = {None: 0.4, "necessary": 0.2, "happy": 0.12, "neutral": 0.1, "stressed": 0.06,
+                   "excited": 0.05, "regretful": 0.04, "sad": 0.03}
+
+# Extra parameterised URLs; every argument-free GET route is discovered automatically
+EXTRA_URLS = [
+    "/api/spending_over_time?granularity=day&start={month_start}&end={today}",
+    "/api/spending_over_time?granularity=week",
+    "/api/expenses_timeline?mode=cursor&per_page=20",
+    "/api/expenses_timeline?page=5&per_page=20",
+    "/api/expenses_by_month?month={month}&year={year}",
+    "/api/budget_status?month={month}&year={year}",
+    "/api/export?format=ndjson&start={month_start}",
+    "/api/search?q=uber",
+    "/api/search?q=swiggy&sort=date",
+]
+# search_expenses_api needs q (it is benchmarked through EXTRA_URLS instead); events_api is a
+# Server-Sent Events stream that stays open for EVENTS_STREAM_SECONDS, so it has no latency to time
+SKIPPED_ENDPOINTS = {'static', 'init_db', 'logout', 'metrics', 'search_expenses_api', 'events_api'}
+
+
+def generate_dataset(users, expenses_per_user, seed=42, days=730, batch_size=5000):
+    """Drop/recreate the schema and fill it with a reproducible synthetic dataset."""
+    from werkzeug.security import generate_password_hash
+    from app import app, db, User, Expense, Budget, Goal, rebuild_monthly_spend, rebuild_search_index
+
+    rng = random.Random(seed)
+    categories = list(CATEGORY_PROFILE); category_weights = [CATEGORY_PROFILE[c][0] for c in categories]
+    emotions = list(EMOTION_WEIGHTS); emotion_weights = list(EMOTION_WEIGHTS.values())
+    today = datetime.date.today(); now = datetime.datetime.utcnow()
+    password_hash = generate_password_hash(BENCH_PASSWORD, method='pbkdf2:sha256')
+    with app.app_context():
+        db.drop_all(); db.create_all()
+        db.session.execute(db.insert(User.__table__), [
+            {"id": uid, "username": f"bench{uid}", "email": f"bench{uid}@example.com", "password_hash": password_hash}
+            for uid in range(1, users + 1)])
+        batch = []
+        for uid in range(1, users + 1):
+            for _ in range(expenses_per_user):
+                category = rng.choices(categories, category_weights)[0]
+                _, median, merchants = CATEGORY_PROFILE[category]
+                merchant = rng.choice(merchants)
+                # Recent months are denser than old ones, like a real user's history
+                date = today - datetime.timedelta(days=int(rng.triangular(0, days, 0)))
+                batch.append({"user_id": uid, "category": category, "merchant": merchant, "date": date,
+                              "amount": round(rng.lognormvariate(math.log(median), 0.6) * 100),  # paise
+                              "description": f"{category} at {merchant}" if merchant else f"{category} expense",
+                              "emotion_tag": rng.choices(emotions, emotion_weights)[0], "created_at": now})
+                if len(batch) >= batch_size:
+                    db.session.execute(db.insert(Expense.__table__), batch); batch = []
+        if batch: db.session.execute(db.insert(Expense.__table__), batch)
+        budgets = []; goals = []
+        for uid in range(1, users + 1):
+            for back in range(3):
+                month_date = (today.replace(day=1) - datetime.timedelta(days=back * 28)).replace(day=1)
+                for category in rng.sample(categories, 6) + ["Overall"]:
+                    scale = 30 if category == "Overall" else 8
+                    budgets.append({"user_id": uid, "category": category, "month": month_date.month, "year": month_date.year,
+                                    "amount": CATEGORY_PROFILE.get(category, (0, 1000, []))[1] * scale * 100})
+            for n in range(3):
+                target = rng.choice([5000, 20000, 50000, 150000])
+                goals.append({"user_id": uid, "name": f"Goal {n + 1}", "target_amount": target * 100,
+                              "current_amount": round(target * 100 * rng.random()), "created_at": now,
+                              "due_date": today + datetime.timedelta(days=rng.randint(30, 720))})
+        db.session.execute(db.insert(Budget.__table__), budgets)
+        db.session.execute(db.insert(Goal.__table__), goals)
+        db.session.commit()
+        rebuild_monthly_spend(); rebuild_search_index()
+
+
+def benchmark_urls(app):
+    today = datetime.date.today()
+    values = {"today": today.isoformat(), "month_start": today.replace(day=1).isoformat(),
+              "month": today.month, "year": today.year}
+    urls = sorted(rule.rule for rule in app.url_map.iter_rules()
+                  if 'GET' in rule.methods and not rule.arguments and rule.endpoint not in SKIPPED_ENDPOINTS)
+    return urls + [url.format(**values) for url in EXTRA_URLS]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def measure_routes(iterations=30, user_id=1, use_cache=False):
+    """Hit every route as a logged-in synthetic user; returns per-route latency/query stats."""
+    from sqlalchemy import event
+    import app as app_module
+    from app import app, db
+    from response_cache import MemoryCacheBackend, ResponseCache
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    if not use_cache: app_module.response_cache = ResponseCache(MemoryCacheBackend(max_bytes=0))
+    statements = [0]
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.__setitem__(0, statements[0] + 1))
+    client = app.test_client()
+    login = client.post('/login', data={"email": f"bench{user_id}@example.com", "password": BENCH_PASSWORD})
+    if login.status_code != 302: raise RuntimeError("benchmark login failed; run `generate` first")
+    results = {}
+    for url in benchmark_urls(app):
+        latencies = []; queries = []; size = 0; status = None
+        for _ in range(iterations):
+            statements[0] = 0
+            started = time.perf_counter()
+            response = client.get(url)
+            body = response.get_data()
+            latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(statements[0]); size = len(body); status = response.status_code
+        results[url] = {"status": status, "p50_ms": round(percentile(latencies, 0.50), 3),
+                        "p95_ms": round(percentile(latencies, 0.95), 3), "p99_ms": round(percentile(latencies, 0.99), 3),
+                        "mean_queries": round(statistics.mean(queries), 2), "max_queries": max(queries), "bytes": size}
+    return {"routes": results, "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+def measure_logins(concurrency, duration=5.0, user_id=1, probe_url='/api/available_months'):
+    """Hammer /login from `concurrency` threads while one logged-in client polls probe_url.
+
+    Returns login throughput/latency, how many logins were shed with 503, and the
+    probe's latency, which shows whether other routes stay responsive during the storm.
+    """
+    from app import app, password_hasher
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    credentials = {"email": f"bench{user_id}@example.com", "password": BENCH_PASSWORD}
+    probe_client = app.test_client()
+    if probe_client.post('/login', data=credentials).status_code != 302:
+        raise RuntimeError("benchmark login failed; run `generate` first")
+    lock = threading.Lock(); logins = []; statuses = {}; probes = []
+    deadline = time.perf_counter() + duration
+
+    def log_in():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = app.test_client().post('/login', data=credentials).status_code  # fresh client = fresh session
+            with lock:
+                logins.append((time.perf_counter() - started) * 1000); statuses[status] = statuses.get(status, 0) + 1
+
+    def probe():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter(); probe_client.get(probe_url).get_data()
+            probes.append((time.perf_counter() - started) * 1000); time.sleep(0.01)
+
+    threads = [threading.Thread(target=log_in) for _ in range(concurrency)] + [threading.Thread(target=probe)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    return {"concurrency": concurrency, "iterations": password_hasher.iterations, "hash_workers": password_hasher.workers,
+            "logins_per_second": round(statuses.get(302, 0) / duration, 2), "statuses": statuses,
+            "login_p50_ms": round(percentile(logins, 0.50), 1) if logins else None,
+            "login_p95_ms": round(percentile(logins, 0.95), 1) if logins else None,
+            "probe_p50_ms": round(percentile(probes, 0.50), 2) if probes else None,
+            "probe_p95_ms": round(percentile(probes, 0.95), 2) if probes else None}
+
+
+CONCURRENCY_READ_URLS = ["/api/expenses_timeline?mode=cursor&per_page=20", "/api/spending_by_category",
+                         "/api/budget_status", "/api/expenses_by_month"]
+
+
+def hammer(duration, write_ratio, user_id, start_at, seed=0):
+    """One benchmark worker process: mixed reads and smart-log writes as one user until the deadline."""
+    import app as app_module
+    from app import app
+    from response_cache import MemoryCacheBackend, ResponseCache
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    app_module.response_cache = ResponseCache(MemoryCacheBackend(max_bytes=0))
+    client = app.test_client()
+    if client.post('/login', data={"email": f"bench{user_id}@example.com", "password": BENCH_PASSWORD}).status_code != 302:
+        raise RuntimeError("benchmark login failed")
+    rng = random.Random(seed); reads = []; writes = []; statuses = {}
+    time.sleep(max(0.0, start_at - time.time()))  # all workers start together
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        is_write = rng.random() < write_ratio
+        started = time.perf_counter()
+        if is_write: response = client.post('/log_expense_json', json={"text_input": f"{rng.randint(50, 900)} swiggy lunch"})
+        else: response = client.get(rng.choice(CONCURRENCY_READ_URLS))
+        response.get_data()
+        (writes if is_write else reads).append((time.perf_counter() - started) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return {"reads": reads, "writes": writes, "statuses": statuses}
+
+
+def measure_sqlite_concurrency(processes, duration=5.0, write_ratio=0.2, users=4, expenses=2000,
+                               database_path=None, profile=True, progress=print):
+    """Regenerate a scratch SQLite file, then run `processes` hammer workers against it at once.
+
+    profile=False runs the same load with SQLITE_PRODUCTION_PROFILE=0 on a fresh
+    (rollback-journal) file, for comparison.
+    """
+    database_path = database_path or os.path.join(tempfile.gettempdir(), 'expense_tracker_bench_concurrency.db')
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(database_path + suffix): os.remove(database_path + suffix)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}", SQLITE_PRODUCTION_PROFILE='1' if profile else '0')
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    progress(f"[sqlite {'tuned' if profile else 'default'}] generating {users} users x {expenses} expenses...")
+    subprocess.run([sys.executable, __file__, 'generate', '--users', str(users), '--expenses', str(expenses)], env=env, check=True, cwd=cwd)
+    progress(f"[sqlite {'tuned' if profile else 'default'}] {processes} processes x {duration}s, {write_ratio:.0%} writes...")
+    start_at = time.time() + 3.0  # leaves time for every worker to import the app
+    workers = [subprocess.Popen([sys.executable, __file__, 'hammer', '--duration', str(duration), '--write-ratio', str(write_ratio),
+                                 '--user-id', str(n % users + 1), '--start-at', str(start_at), '--seed', str(n)],
+                                env=env, cwd=cwd, stdout=subprocess.PIPE, text=True) for n in range(processes)]
+    reads = []; writes = []; statuses = {}
+    for worker in workers:
+        output, _ = worker.communicate()
+        if worker.returncode: raise RuntimeError(f"hammer worker exited with {worker.returncode}")
+        result = json.loads(output.strip().splitlines()[-1])
+        reads += result["reads"]; writes += result["writes"]
+        for status, count in result["statuses"].items(): statuses[status] = statuses.get(status, 0) + count
+    summary = lambda samples: {"per_second": round(len(samples) / duration, 1),
+                               "p50_ms": round(percentile(samples, 0.50), 2) if samples else None,
+                               "p95_ms": round(percentile(samples, 0.95), 2) if samples else None,
+                               "p99_ms": round(percentile(samples, 0.99), 2) if samples else None}
+    return {"profile": "tuned" if profile else "default", "processes": processes, "write_ratio": write_ratio,
+            "reads": summary(reads), "writes": summary(writes), "statuses": statuses}
+
+
+def run_suite(database_urls, sizes, users, iterations, use_cache=False, progress=print):
+    """Generate + measure in subprocesses for each (database, size); returns the JSON report."""
+    report = {"commit": _git_commit(), "timestamp": datetime.datetime.utcnow().isoformat(timespec='seconds'),
+              "python": sys.version.split()[0], "iterations": iterations, "runs": []}
+    for database_url in database_urls:
+        for size in sizes:
+            env = dict(os.environ, DATABASE_URL=database_url)
+            progress(f"[{_backend_name(database_url)}] generating {users} users x {size} expenses...")
+            started = time.perf_counter()
+            subprocess.run([sys.executable, __file__, 'generate', '--users', str(users), '--expenses', str(size)],
+                           env=env, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            generated = time.perf_counter() - started
+            progress(f"[{_backend_name(database_url)}] measuring {iterations} requests per route...")
+            args = [sys.executable, __file__, 'measure', '--iterations', str(iterations)] + (['--use-cache'] if use_cache else [])
+            output = subprocess.run(args, env=env, check=True, capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+            measured = json.loads(output.strip().splitlines()[-1])
+            report["runs"].append({"database": _backend_name(database_url), "users": users, "expenses_per_user": size,
+                                   "generate_seconds": round(generated, 2), **measured})
+    return report
+
+
+def compare_reports(baseline, current, threshold=1.2):
+    """Yield (database, size, url, old_p95, new_p95) for routes whose p95 grew past threshold x."""
+    old_runs = {(r["database"], r["expenses_per_user"]): r for r in baseline["runs"]}
+    for run in current["runs"]:
+        old = old_runs.get((run["database"], run["expenses_per_user"]))
+        if old is None: continue
+        for url, stats in run["routes"].items():
+            old_stats = old["routes"].get(url)
+            if old_stats and stats["p95_ms"] > old_stats["p95_ms"] * threshold:
+                yield run["database"], run["expenses_per_user"], url, old_stats["p95_ms"], stats["p95_ms"]
+
+
+def default_sqlite_url():
+    return f"sqlite:///{os.path.join(tempfile.gettempdir(), 'expense_tracker_bench.db')}"
+
+def _backend_name(database_url):
+    return database_url.split(':', 1)[0].split('+', 1)[0]
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Synthetic dataset generator and route benchmark worker.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    gen = sub.add_parser('generate'); gen.add_argument('--users', type=int, default=10); gen.add_argument('--expenses', type=int, default=1000)
+    gen.add_argument('--seed', type=int, default=42)
+    mes = sub.add_parser('measure'); mes.add_argument('--iterations', type=int, default=30); mes.add_argument('--use-cache', action='store_true')
+    ham = sub.add_parser('hammer'); ham.add_argument('--duration', type=float, default=5.0); ham.add_argument('--write-ratio', type=float, default=0.2)
+    ham.add_argument('--user-id', type=int, default=1); ham.add_argument('--start-at', type=float, default=0.0); ham.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+    if options.command == 'generate': generate_dataset(options.users, options.expenses, options.seed)
+    elif options.command == 'hammer':
+        print(json.dumps(hammer(options.duration, options.write_ratio, options.user_id, options.start_at, options.seed)))
+    else: print(json.dumps(measure_routes(options.iterations, use_cache=options.use_cache)))
@@ -0,0 +1,151 @@
+import collections
+import glob
+import json
+import logging
+import os
+import socket
+import threading
+from decimal import Decimal
+
+from money import dumps_json
+
+# Per-user publish/subscribe for the /api/events Server-Sent Events stream.
+# Each process keeps its own subscribers; with a socket directory configured,
+# messages are also sent as datagrams to every other process on the host that
+# has subscribers (one Unix socket per process, like METRICS_DIR's files), so
+# a write answered by one gunicorn worker reaches streams held by the others.
+# Messages must be JSON-serialisable (Decimal amounts included) and small (a datagram each).
+
+logger = logging.getLogger(__name__)
+
+RESYNC = {"resync": True}
+
+
+class Subscription:
+    """Bounded queue of one stream's messages.
+
+    A subscriber that falls max_queue messages behind gets a single RESYNC
+    in place of the backlog, so a slow client costs bounded memory and
+    reloads its state instead of replaying every change.
+    """
+
+    def __init__(self, user_id, max_queue):
+        self.user_id = user_id
+        self.max_queue = max_queue
+        self._messages = collections.deque()
+        self._ready = threading.Condition()
+
+    def put(self, message):
+        with self._ready:
+            if message is RESYNC or message.get('resync') or len(self._messages) >= self.max_queue:
+                self._messages.clear(); message = RESYNC
+            self._messages.append(message)
+            self._ready.notify()
+
+    def get(self, timeout):
+        """Every queued message, waiting up to timeout seconds for one; [] when none arrived."""
+        with self._ready:
+            if not self._messages: self._ready.wait(timeout)
+            messages = list(self._messages); self._messages.clear()
+        return messages
+
+
+class EventBroker:
+    def __init__(self, max_queue=100, max_streams=None, socket_dir=None):
+        self.max_queue = max_queue
+        self.max_streams = max_streams
+        self.socket_dir = socket_dir
+        self._subscribers = collections.defaultdict(set)
+        self._lock = threading.Lock()
+        self._streams = 0
+        self._fanout = SocketFanout(socket_dir) if socket_dir else None
+
+    def subscribe(self, user_id):
+        """A Subscription for user_id, or None when this process already serves max_streams streams."""
+        with self._lock:
+            if self.max_streams is not None and self._streams >= self.max_streams: return None
+            self._streams += 1
+            subscription = Subscription(user_id, self.max_queue)
+            self._subscribers[user_id].add(subscription)
+            # Only processes that hold streams need to hear about other processes' writes
+            if self._fanout is not None and self._fanout.path is None: self._fanout.listen(self.deliver)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription); self._streams -= 1
+                if not subscribers: del self._subscribers[subscription.user_id]
+
+    def listening(self, user_id):
+        """Whether a message for user_id could reach any stream (always, when other processes may hold them)."""
+        return bool(self.socket_dir) or user_id in self._subscribers
+
+    def publish(self, user_id, message):
+        self.deliver(user_id, message)
+        if self._fanout is not None: self._fanout.send(user_id, message)
+
+    def deliver(self, user_id, message):
+        """Queue message for this process's subscribers (user_id None reaches everyone)."""
+        with self._lock:
+            subscribers = [s for subs in self._subscribers.values() for s in subs] if user_id is None \
+                else list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers: subscription.put(message)
+
+
+class SocketFanout:
+    """Sends messages to the other processes' SOCKET_DIR/events-<pid>.sock and, once listening, receives theirs."""
+
+    def __init__(self, socket_dir):
+        os.makedirs(socket_dir, exist_ok=True)
+        self.socket_dir = socket_dir
+        self.path = None
+        # Peers whose socket buffer was full; they get a RESYNC with the next message that fits
+        self._lost_peers = set()
+        self._lock = threading.Lock()  # publishing request threads share _lost_peers
+
+    def listen(self, deliver):
+        """Bind this process's socket and hand every message received on it to deliver."""
+        path = os.path.join(self.socket_dir, f"events-{os.getpid()}.sock")
+        if os.path.exists(path): os.unlink(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.path = path
+        self.deliver = deliver
+        threading.Thread(target=self._receive, name='event-fanout', daemon=True).start()
+
+    def _receive(self):
+        while True:
+            try:
+                user_id, message = json.loads(self.sock.recv(65536), parse_float=Decimal)
+                self.deliver(user_id, message)
+            except (ValueError, TypeError):
+                logger.warning("Ignoring malformed event datagram")
+            except OSError:
+                logger.exception("Event fan-out socket failed; streams in this process only see local writes")
+                return
+
+    def send(self, user_id, message):
+        """Best effort: a full or vanished peer never blocks or fails the publishing request."""
+        data = dumps_json([user_id, message], separators=(',', ':')).encode()
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        try:
+            for path in glob.glob(os.path.join(self.socket_dir, 'events-*.sock')):
+                if path == self.path: continue
+                try:
+                    with self._lock: lost = path in self._lost_peers
+                    if lost:
+                        sender.sendto(json.dumps([None, RESYNC]).encode(), path)
+                        with self._lock: self._lost_peers.discard(path)
+                    sender.sendto(data, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    try: os.unlink(path)  # its process exited
+                    except OSError: pass
+                    with self._lock: self._lost_peers.discard(path)
+                except OSError:
+                    # Receiver not keeping up (or message too large): it resyncs its streams later
+                    with self._lock: self._lost_peers.add(path)
+        finally:
+            sender.close()
@@ -0,0 +1,162 @@
+import unicodedata
+
+import sqlalchemy as sa
+
+# Full-text search over expense description, merchant and category.
+#
+# SQLite: an FTS5 table expense_fts (rowid = expense.id) that the app keeps in
+# sync on every expense write. Each row also carries an "owner" token so the
+# MATCH itself is restricted to one user instead of filtering afterwards.
+# Postgres: a generated tsvector column expense.search_vector with a GIN
+# index, which the database keeps in sync by itself.
+#
+# Both backends score matches so that lower is more relevant (bm25() is
+# already negative; ts_rank_cd() is negated), so callers can order and page
+# by (score, date desc, id desc) the same way on either.
+
+MAX_TERMS = 8
+
+FTS_COLUMNS = ('description', 'merchant', 'category')
+# bm25 weights per FTS column (owner, description, merchant, category)
+BM25_WEIGHTS = (0.0, 2.0, 3.0, 1.0)
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts USING fts5("
+    "owner, description, merchant, category, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+SQLITE_DROP = "DROP TABLE IF EXISTS expense_fts"
+POSTGRES_VECTOR = ("to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(merchant, '') || ' ' || "
+                   "coalesce(category, ''))")
+POSTGRES_CREATE = (
+    f"ALTER TABLE expense ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({POSTGRES_VECTOR}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_expense_search_vector ON expense USING GIN (search_vector)",
+)
+POSTGRES_DROP = (
+    "DROP INDEX IF EXISTS ix_expense_search_vector",
+    "ALTER TABLE expense DROP COLUMN IF EXISTS search_vector",
+)
+
+
+def is_search_schema_object(name, type_, table_name=None):
+    """Whether a reflected table/column/index is one of the search objects above, which the models don't declare.
+
+    Used by migrations/env.py so autogenerate and `flask db check` leave them alone.
+    """
+    if type_ == 'table': return name == 'expense_fts' or name.startswith('expense_fts_')  # incl. FTS5 shadow tables
+    if type_ == 'column': return table_name == 'expense' and name == 'search_vector'
+    if type_ == 'index': return name == 'ix_expense_search_vector'
+    return False
+
+
+def _is_word_char(char):
+    # Letters, digits and combining marks (Devanagari vowel signs are marks), like FTS5's unicode61
+    return char.isalnum() or unicodedata.category(char).startswith('M')
+
+
+def search_terms(text):
+    """Lower-cased word tokens of a search box string (at most MAX_TERMS), safe to quote in either backend."""
+    words = ''.join(char if _is_word_char(char) else ' ' for char in (text or '').lower()).split()
+    return words[:MAX_TERMS]
+
+
+def owner_token(user_id):
+    return f"u{int(user_id)}"
+
+
+fts_table = sa.table('expense_fts', sa.column('rowid', sa.Integer), sa.column('owner', sa.String),
+                     *(sa.column(name, sa.String) for name in FTS_COLUMNS))
+
+
+class SQLiteExpenseSearch:
+    """FTS5 backend; index/remove must be called for every expense write."""
+
+    def __init__(self, expense_table):
+        self.expense = expense_table
+
+    def create(self, connection):
+        connection.exec_driver_sql(SQLITE_CREATE)
+
+    def drop(self, connection):
+        connection.exec_driver_sql(SQLITE_DROP)
+
+    def _rows(self, where):
+        e = self.expense.c
+        owner = sa.literal('u') + sa.cast(e.user_id, sa.String)
+        return sa.select(e.id, owner, e.description, e.merchant, e.category).where(where)
+
+    def index(self, connection, where):
+        """(Re)index the expenses matching a where clause on the expense table."""
+        self.remove(connection, sa.select(self.expense.c.id).where(where).scalar_subquery())
+        connection.execute(sa.insert(fts_table).from_select(['rowid', 'owner', *FTS_COLUMNS], self._rows(where)))
+
+    def remove(self, connection, ids):
+        """Drop rows by a list of expense ids (or a subquery of them)."""
+        connection.execute(sa.delete(fts_table).where(fts_table.c.rowid.in_(ids)))
+
+    def rebuild(self, connection, user_id=None):
+        """Re-index one user's expenses, or recreate the whole index. Returns rows indexed."""
+        if user_id is None:
+            self.drop(connection); self.create(connection)
+            connection.execute(sa.insert(fts_table).from_select(['rowid', 'owner', *FTS_COLUMNS], self._rows(sa.true())))
+            connection.exec_driver_sql("INSERT INTO expense_fts(expense_fts) VALUES ('optimize')")
+        else:
+            self.index(connection, self.expense.c.user_id == user_id)
+        where = sa.true() if user_id is None else fts_table.c.owner == owner_token(user_id)
+        return connection.execute(sa.select(sa.func.count()).select_from(fts_table).where(where)).scalar()
+
+    def _match(self, user_id, terms):
+        quoted = ' AND '.join(f'"{term}"*' for term in terms)
+        return sa.literal_column('expense_fts').op('MATCH')(f'owner:{owner_token(user_id)} AND {{{" ".join(FTS_COLUMNS)}}}: ({quoted})')
+
+    def match(self, user_id, terms):
+        """(from clause joined to expense, where clause, score expression) for an AND of prefix terms."""
+        from_clause = fts_table.join(self.expense, self.expense.c.id == fts_table.c.rowid)
+        return from_clause, self._match(user_id, terms), sa.func.bm25(sa.literal_column('expense_fts'), *BM25_WEIGHTS)
+
+    def filter(self, user_id, terms):
+        """Where clause on the expense table alone, for orders that do not need a score.
+
+        SQLite turns the IN into a set of matching ids and then walks the
+        (user_id, date, id) index, stopping after one page.
+        """
+        matching = sa.select(fts_table.c.rowid).where(self._match(user_id, terms))
+        return sa.and_(self.expense.c.user_id == user_id, self.expense.c.id.in_(matching))
+
+
+class PostgresExpenseSearch:
+    """tsvector backend; the generated column needs no help staying in sync."""
+
+    def __init__(self, expense_table):
+        self.expense = expense_table
+
+    def create(self, connection):
+        for statement in POSTGRES_CREATE: connection.exec_driver_sql(statement)
+
+    def drop(self, connection):
+        for statement in POSTGRES_DROP: connection.exec_driver_sql(statement)
+
+    def index(self, connection, where): pass
+
+    def remove(self, connection, ids): pass
+
+    def rebuild(self, connection, user_id=None):
+        if user_id is None: connection.exec_driver_sql("REINDEX INDEX ix_expense_search_vector")
+        query = sa.select(sa.func.count()).select_from(self.expense)
+        if user_id is not None: query = query.where(self.expense.c.user_id == user_id)
+        return connection.execute(query).scalar()
+
+    def _tsquery(self, terms):
+        return sa.func.to_tsquery('simple', ' & '.join(f"{term}:*" for term in terms))
+
+    def match(self, user_id, terms):
+        vector = sa.literal_column('expense.search_vector'); tsquery = self._tsquery(terms)
+        return self.expense, self.filter(user_id, terms), -sa.func.ts_rank_cd(vector, tsquery)
+
+    def filter(self, user_id, terms):
+        return sa.and_(self.expense.c.user_id == user_id, sa.literal_column('expense.search_vector').op('@@')(self._tsquery(terms)))
+
+
+def expense_search_for(dialect_name, expense_table):
+    """The search backend for a dialect, or None where full-text search is unsupported."""
+    backend = {'sqlite': SQLiteExpenseSearch, 'postgresql': PostgresExpenseSearch}.get(dialect_name)
+    return backend(expense_table) if backend else None
@@ -0,0 +1,113 @@
+import datetime
+
+import numpy as np
+
+# Spending and goal forecasts over (series, day) matrices of daily amounts in
+# paise, where the last column is the as-of date. A series is one category of
+# one user (or one goal's contributions); every model below runs on all rows
+# at once, so forecasting every user costs one pass rather than a loop per budget.
+
+HISTORY_DAYS = 112           # 16 weeks: enough for weekday effects and three monthly cycles
+MIN_HISTORY_DAYS = 14        # new users are averaged over at least this many days
+TREND_HALF_LIFE_DAYS = 14
+GOAL_HISTORY_DAYS = 180
+GOAL_HALF_LIFE_DAYS = 30
+SPIKE_FACTOR = 4.0           # a day above 4x the series' mean daily spend is a spike...
+RECURRING_MIN_MONTHS = 2     # ...and recurring when spikes land on that day of the month this often
+WEEKDAY_PRIOR_DAYS = 4.0     # shrinks weekday factors towards 1 until a weekday has some history
+
+_EPOCH = np.datetime64('1970-01-01', 'D')  # a Thursday
+
+
+def _calendar(start, days):
+    """(weekday 0=Mon, day of month) arrays for days consecutive dates from start."""
+    dates = np.datetime64(start, 'D') + np.arange(days)
+    weekday = ((dates - _EPOCH).astype(np.int64) + 3) % 7
+    day_of_month = (dates - dates.astype('datetime64[M]')).astype(np.int64) + 1
+    return weekday, day_of_month
+
+
+def _first_day(first_day, series, days):
+    first = np.zeros(series, dtype=np.int64) if first_day is None else np.asarray(first_day, dtype=np.int64)
+    return np.clip(first, 0, max(days - MIN_HISTORY_DAYS, 0))
+
+
+def _decay_weights(days, half_life, first):
+    """Exponential weights (newest day = 1) with each row's days before first zeroed."""
+    weights = 0.5 ** (np.arange(days)[::-1] / half_life)
+    return np.where(np.arange(days)[None, :] >= first[:, None], weights[None, :], 0.0)
+
+
+def daily_matrix(rows, start, days, keys=None):
+    """(keys, matrix) from (key, date, amount) rows; matrix[i, d] is the total of keys[i] on start + d days.
+
+    Rows for unknown keys or outside the window are ignored.
+    """
+    if keys is None: keys = sorted({key for key, _, _ in rows}, key=str)
+    index = {key: i for i, key in enumerate(keys)}
+    matrix = np.zeros((len(keys), days))
+    cells = [(index[key], (date - start).days, amount) for key, date, amount in rows if key in index]
+    cells = [cell for cell in cells if 0 <= cell[1] < days]
+    if cells:
+        series, day, amount = zip(*cells)
+        np.add.at(matrix, (np.array(series), np.array(day)), np.array(amount, dtype=float))
+    return keys, matrix
+
+
+def project_spending(matrix, start, until, first_day=None):
+    """Projected spending per series for the days after the matrix through until (inclusive).
+
+    Per series: recurring spikes (same day of month in RECURRING_MIN_MONTHS
+    months, e.g. rent or subscriptions) are projected onto their day of the
+    month; one-off spikes are capped; what is left is a weekday-adjusted,
+    exponentially weighted daily level. first_day[i] is the index of the first
+    day series i has history for (days before it do not count as zero spending).
+    """
+    series, days = matrix.shape
+    horizon = (until - start).days + 1 - days
+    if series == 0 or days == 0 or horizon <= 0: return np.zeros(series)
+    first = _first_day(first_day, series, days)
+    active = np.arange(days)[None, :] >= first[:, None]
+    weekday, day_of_month = _calendar(start, days)
+    by_weekday = np.eye(7)[weekday]; by_day_of_month = np.eye(32)[day_of_month]
+
+    # Spikes stand out from the series' mean daily spend; recurring ones land on the same day of the month
+    active_days = active.sum(axis=1)
+    spikes = active & (matrix > SPIKE_FACTOR * (np.where(active, matrix, 0.0).sum(axis=1) / active_days)[:, None])
+    spike_months = spikes @ by_day_of_month
+    recurring = spike_months >= RECURRING_MIN_MONTHS
+    spike_size = np.divide(np.where(spikes, matrix, 0.0) @ by_day_of_month, spike_months,
+                           out=np.zeros_like(spike_months), where=recurring)
+    # Recurring spikes are projected separately; other outliers are capped relative to a typical spending day
+    with np.errstate(invalid='ignore'):
+        cap = SPIKE_FACTOR * np.nan_to_num(np.nanmedian(np.where(active & (matrix > 0), matrix, np.nan), axis=1))
+    baseline = np.where(active & ~(spikes & recurring[:, day_of_month]), np.minimum(matrix, cap[:, None]), 0.0)
+
+    mean = baseline.sum(axis=1) / active_days
+    weekday_days = active @ by_weekday
+    weekday_factor = np.divide(baseline @ by_weekday + WEEKDAY_PRIOR_DAYS * mean[:, None],
+                               (weekday_days + WEEKDAY_PRIOR_DAYS) * mean[:, None],
+                               out=np.ones((series, 7)), where=mean[:, None] > 0)
+    weights = _decay_weights(days, TREND_HALF_LIFE_DAYS, first)
+    level = (baseline / weekday_factor[:, weekday] * weights).sum(axis=1) / weights.sum(axis=1)
+
+    future_weekday, future_day_of_month = _calendar(start + datetime.timedelta(days=days), horizon)
+    daily = level[:, None] * weekday_factor[:, future_weekday]
+    return daily.sum(axis=1) + spike_size[:, future_day_of_month].sum(axis=1)
+
+
+def project_goals(remaining, contributions, first_day=None):
+    """(daily rate, days until reached) per goal from its contribution history matrix.
+
+    The rate is an exponentially weighted average of daily contributions since
+    first_day (the goal's creation). Days are 0 for reached goals and NaN
+    when nothing is being contributed.
+    """
+    goals, days = contributions.shape
+    remaining = np.asarray(remaining, dtype=float)
+    if goals == 0 or days == 0: return np.zeros(goals), np.full(goals, np.nan)
+    weights = _decay_weights(days, GOAL_HALF_LIFE_DAYS, _first_day(first_day, goals, days))
+    rate = (contributions * weights).sum(axis=1) / weights.sum(axis=1)
+    days_needed = np.ceil(np.divide(remaining, rate, out=np.full(goals, np.nan), where=(rate > 0) & (remaining > 0)))
+    days_needed[remaining <= 0] = 0
+    return rate, days_needed
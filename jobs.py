@@ -0,0 +1,241 @@
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+
+from money import dumps_json
+
+# Database-backed background jobs. A job is a row in the job table; workers
+# (`flask --app manage jobs worker`) claim due rows with a compare-and-set
+# UPDATE, so any number of them can share one table on SQLite or Postgres
+# without a broker. CPU-bound kinds run in a process pool, the rest inline in
+# the worker. Times are naive UTC, like the models' created_at columns.
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+logger = logging.getLogger(__name__)
+
+JobSpec = namedtuple('JobSpec', 'name func max_attempts backoff cpu_bound')
+
+
+def utcnow():
+    return datetime.datetime.utcnow()
+
+
+def dump_payload(payload):
+    """Canonical JSON for a payload, so equal payloads compare equal in SQL."""
+    return json.dumps(payload or {}, sort_keys=True, separators=(',', ':'))
+
+
+class Schedule(namedtuple('Schedule', 'kind every at payload')):
+    """Enqueue kind once per `every`, `at` into each period (e.g. daily at 00:05 UTC)."""
+
+    def slot(self, now):
+        """Index of the latest period whose start time has passed."""
+        every = self.every.total_seconds(); offset = self.at.total_seconds()
+        return int(((now - datetime.datetime(1970, 1, 1)).total_seconds() - offset) // every)
+
+    def key(self, now):
+        return f"{self.kind}:{self.slot(now)}"
+
+
+class JobRegistry:
+    """Job kinds by name, plus the schedules workers enqueue on their own."""
+
+    def __init__(self):
+        self.specs = {}
+        self.schedules = []
+
+    def job(self, name, max_attempts=3, backoff=30.0, cpu_bound=False):
+        """Register func(payload) -> JSON-serialisable result as job kind `name`.
+
+        Failed attempts are retried after backoff * 2**(attempt - 1) seconds.
+        """
+        def decorator(func):
+            self.specs[name] = JobSpec(name, func, max_attempts, backoff, cpu_bound)
+            return func
+        return decorator
+
+    def schedule(self, kind, every, at=datetime.timedelta(0), payload=None):
+        self.schedules.append(Schedule(kind, every, at, payload or {}))
+
+
+class JobQueue:
+    """Enqueue, claim and settle rows of the job model through db.session."""
+
+    def __init__(self, db, model, registry):
+        self.db = db
+        self.model = model
+        self.registry = registry
+
+    def enqueue(self, kind, payload=None, user_id=None, run_at=None, schedule_key=None, commit=True):
+        spec = self.registry.specs.get(kind)
+        if spec is None: raise ValueError(f"Unknown job kind: {kind}")
+        job = self.model(kind=kind, payload=dump_payload(payload), user_id=user_id, status=QUEUED, attempts=0,
+                         max_attempts=spec.max_attempts, run_at=run_at or utcnow(), schedule_key=schedule_key)
+        self.db.session.add(job)
+        if commit: self.db.session.commit()
+        return job
+
+    def enqueue_scheduled(self, now=None):
+        """Enqueue every schedule whose current period has no job yet; returns how many were added."""
+        now = now or utcnow(); added = 0
+        for schedule in self.registry.schedules:
+            # schedule_key is unique, so workers racing on the same period add it once
+            try:
+                self.enqueue(schedule.kind, schedule.payload, schedule_key=schedule.key(now)); added += 1
+            except IntegrityError:
+                self.db.session.rollback()
+        return added
+
+    def claim(self, worker_id, now=None, kinds=None):
+        """Mark the next due job as running for worker_id; returns (id, kind, payload) or None."""
+        model = self.model; now = now or utcnow()
+        for _ in range(5):  # another worker may claim the candidate first
+            query = self.db.select(model.id).where(model.status == QUEUED, model.run_at <= now)
+            if kinds is not None: query = query.where(model.kind.in_(kinds))
+            job_id = self.db.session.execute(query.order_by(model.run_at, model.id).limit(1)).scalar()
+            if job_id is None: return None
+            claimed = self.db.session.execute(self.db.update(model).where(model.id == job_id, model.status == QUEUED).values(
+                status=RUNNING, locked_by=worker_id, locked_at=now, attempts=model.attempts + 1)).rowcount
+            self.db.session.commit()
+            if claimed:
+                kind, payload = self.db.session.execute(self.db.select(model.kind, model.payload).where(model.id == job_id)).one()
+                return job_id, kind, json.loads(payload)
+        return None
+
+    def succeed(self, job_id, result):
+        self._settle(job_id, status=SUCCEEDED, result=dumps_json(result), error=None, finished_at=utcnow())
+
+    def fail(self, job_id, error, now=None):
+        """Requeue with exponential backoff, or mark failed once max_attempts is used up."""
+        now = now or utcnow()
+        job = self.db.session.get(self.model, job_id)
+        if job is None: return
+        spec = self.registry.specs.get(job.kind)
+        if job.attempts < job.max_attempts and spec is not None:
+            delay = datetime.timedelta(seconds=spec.backoff * 2 ** (job.attempts - 1))
+            self._settle(job_id, status=QUEUED, error=error, run_at=now + delay)
+        else:
+            self._settle(job_id, status=FAILED, error=error, finished_at=now)
+
+    def _settle(self, job_id, **values):
+        self.db.session.execute(self.db.update(self.model).where(self.model.id == job_id)
+                                .values(locked_by=None, locked_at=None, **values))
+        self.db.session.commit()
+
+    def requeue_stale(self, lease, now=None):
+        """Jobs whose worker held them longer than lease seconds (it probably died) count as failed attempts."""
+        now = now or utcnow()
+        stale = self.db.session.execute(self.db.select(self.model.id).where(
+            self.model.status == RUNNING, self.model.locked_at < now - datetime.timedelta(seconds=lease))).scalars().all()
+        for job_id in stale: self.fail(job_id, f"Lease of {lease:.0f}s expired", now)
+        return len(stale)
+
+    def purge(self, older_than, now=None):
+        """Delete finished jobs older than older_than (a timedelta); returns rows deleted."""
+        cutoff = (now or utcnow()) - older_than
+        deleted = self.db.session.execute(self.db.delete(self.model).where(
+            self.model.status.in_((SUCCEEDED, FAILED)), self.model.finished_at < cutoff)).rowcount
+        self.db.session.commit()
+        return deleted
+
+
+# Set in the worker before the pool forks, so child processes inherit the app and registry
+_fork_state = {}
+
+def _run_in_process(kind, payload):
+    app, registry = _fork_state['app'], _fork_state['registry']
+    with app.app_context():
+        return registry.specs[kind].func(payload)
+
+
+class Worker:
+    """Poll loop: enqueue due schedules, claim jobs, run them, record the outcome.
+
+    processes > 0 runs CPU-bound kinds in that many forked processes while the
+    loop keeps going; on platforms without fork they run inline like the rest.
+    """
+
+    def __init__(self, app, queue, processes=None, poll_interval=2.0, lease=3600.0, process_initializer=None):
+        self.app = app
+        self.queue = queue
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        if 'fork' not in multiprocessing.get_all_start_methods(): self.processes = 0
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.process_initializer = process_initializer
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def run(self, once=False):
+        """Work until stop() (or SIGTERM/SIGINT); with once=True, until nothing is due."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop); signal.signal(signal.SIGINT, self.stop)
+        pool = None
+        if self.processes:
+            _fork_state.update(app=self.app, registry=self.queue.registry)
+            pool = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('fork'),
+                                       initializer=self.process_initializer)
+        running = {}; last_maintenance = None; claimed_total = 0
+        try:
+            while not self._stop.is_set():
+                with self.app.app_context():
+                    if last_maintenance is None or time.monotonic() - last_maintenance > 60:
+                        self.queue.enqueue_scheduled(); self.queue.requeue_stale(self.lease)
+                        last_maintenance = time.monotonic()
+                    self._collect(running)
+                    claimed = self._claim_and_start(pool, running)
+                claimed_total += claimed
+                if once and not claimed and not running: break
+                # While pool jobs are in flight, wake up often enough to record their results promptly
+                if not claimed: self._stop.wait(min(self.poll_interval, 0.1) if running else self.poll_interval)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+                with self.app.app_context(): self._collect(running)
+        return claimed_total
+
+    def _claim_and_start(self, pool, running):
+        """Claim one due job: start it in the pool if it is CPU-bound and a process is free, else run it here."""
+        specs = self.queue.registry.specs
+        pool_full = pool is not None and len(running) >= self.processes
+        kinds = [name for name, spec in specs.items() if not spec.cpu_bound] if pool_full else None
+        claimed = self.queue.claim(self.worker_id, kinds=kinds)
+        if claimed is None: return 0
+        job_id, kind, payload = claimed
+        spec = specs.get(kind)
+        if spec is None: self.queue.fail(job_id, f"Unknown job kind: {kind}"); return 1
+        if spec.cpu_bound and pool is not None:
+            running[pool.submit(_run_in_process, kind, payload)] = job_id
+            return 1
+        started = time.perf_counter()
+        try: result = spec.func(payload)
+        except Exception as e:
+            self.queue.db.session.rollback()
+            logger.exception("Job %s (%s) failed", job_id, kind); self.queue.fail(job_id, f"{type(e).__name__}: {e}")
+        else:
+            self.queue.succeed(job_id, result)
+            logger.info("Job %s (%s) finished in %.2fs", job_id, kind, time.perf_counter() - started)
+        return 1
+
+    def _collect(self, running):
+        """Record the outcome of finished pool jobs."""
+        for future in [future for future in running if future.done()]:
+            job_id = running.pop(future)
+            try: result = future.result()
+            except Exception as e:
+                logger.error("Job %s failed in a worker process: %s", job_id, e); self.queue.fail(job_id, f"{type(e).__name__}: {e}")
+            else: self.queue.succeed(job_id, result)
@@ -0,0 +1,66 @@
+from collections import deque
+
+# Aho-Corasick keyword matcher used by parse_expense_text. The automaton is
+# built once per dictionary; matching a text then costs O(len(text) + hits)
+# no matter how many keywords the dictionary holds.
+
+
+class KeywordMatcher:
+    """Case-insensitive substring matcher over a fixed keyword list.
+
+    best_match() reports every occurrence, overlapping ones included, and
+    returns the keyword with the lowest rank, so it gives the same answer as
+    scanning the keywords in rank order with `in`.
+    """
+
+    def __init__(self, keywords, rank=None):
+        self.keywords = list(keywords)
+        rank = rank or (lambda index, keyword: index)
+        self._goto = [{}]; self._fail = [0]; self._out = [None]
+        for index, keyword in enumerate(self.keywords):
+            lowered = keyword.lower()
+            if not lowered: continue
+            node = 0
+            for char in lowered:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto.append({}); self._fail.append(0); self._out.append(None)
+                    self._goto[node][char] = next_node
+                node = next_node
+            key = (rank(index, keyword), index)
+            if self._out[node] is None or key < self._out[node]: self._out[node] = key
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]: fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                # Fold the best output reachable through the failure chain into the node
+                inherited = self._out[self._fail[child]]
+                if inherited is not None and (self._out[child] is None or inherited < self._out[child]):
+                    self._out[child] = inherited
+
+    def best_match(self, text):
+        """Return the best-ranked keyword occurring in text, or None."""
+        goto = self._goto; fail = self._fail; out = self._out
+        node = 0; best = None
+        for char in text.lower():
+            while node and char not in goto[node]: node = fail[node]
+            node = goto[node].get(char, 0)
+            found = out[node]
+            if found is not None and (best is None or found < best): best = found
+        return self.keywords[best[1]] if best is not None else None
+
+    def __len__(self):
+        return len(self.keywords)
+
+
+def longest_first(index, keyword):
+    """Rank for "longest keyword wins, earlier keyword breaks ties"."""
+    return -len(keyword)
@@ -1,6 +1,14 @@
+import click
 from flask import Flask
+from flask.cli import AppGroup
 from flask_migrate import Migrate
-from app import app, db   # import app & db from your app.py
+import json
+import logging
+import time
+from app import app, db, User, rebuild_monthly_spend, monthly_spend_drift, import_expenses, revoke_sessions, precompute_forecasts, Job, job_queue, reset_engine_after_fork, rebuild_search_index   # import app & db from your app.py
+from statement_import import AMOUNT_SIGNS, detect_format, iter_statement_records, parse_column_map
+from jobs import Worker
+from password_hashing import calibrate_iterations
 
 migrate = Migrate(app, db)
 
@@ -8,3 +16,218 @@ migrate = Migrate(app, db)
 @app.shell_context_processor
 def make_shell_context():
     return {"db": db, "app": app}
+
+# --- Log a user out of every device: flask --app manage revoke-sessions --user-id N ---
+@app.cli.command('revoke-sessions')
+@click.option('--user-id', type=int, required=True)
+def revoke_sessions_command(user_id):
+    """Invalidate every session and remember-me cookie of a user."""
+    if db.session.get(User, user_id) is None: raise click.BadParameter(f"no user with id {user_id}", param_hint='--user-id')
+    revoke_sessions(user_id)
+    click.echo(f"Revoked all sessions of user {user_id}. Workers on this host drop cached logins on their next request (USER_CACHE_SIGNAL_FILE), "
+               "workers on other hosts within USER_CACHE_TTL seconds.")
+
+@app.cli.command('calibrate-password-hash')
+def calibrate_password_hash_command():
+    """Print a PASSWORD_HASH_ITERATIONS value for this machine, so workers need not calibrate on their own."""
+    iterations = calibrate_iterations(app.config['PASSWORD_HASH_TARGET_MS'], app.config['PASSWORD_HASH_MIN_ITERATIONS'])
+    click.echo(f"PASSWORD_HASH_ITERATIONS={iterations}")
+
+# --- Monthly rollup maintenance: flask --app manage rollup verify|rebuild ---
+rollup_cli = AppGroup('rollup', help='Maintain the monthly_spend rollup table.')
+
+@rollup_cli.command('verify')
+@click.option('--user-id', type=int, default=None, help='Only check this user.')
+def rollup_verify(user_id):
+    """Report drift between monthly_spend and raw expenses."""
+    drift = monthly_spend_drift(user_id)
+    for entry in drift:
+        click.echo(f"DRIFT {entry['key']}: expected {entry['expected']}, stored {entry['stored']}")
+    click.echo(f"{len(drift)} drifted rollup row(s).")
+    if drift: raise SystemExit(1)
+
+@rollup_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+def rollup_rebuild(user_id):
+    """Recompute monthly_spend from raw expenses."""
+    drift = monthly_spend_drift(user_id)
+    written = rebuild_monthly_spend(user_id)
+    click.echo(f"Fixed {len(drift)} drifted row(s); wrote {written} rollup row(s).")
+
+app.cli.add_command(rollup_cli)
+
+# --- Full-text search index: flask --app manage search rebuild ---
+search_cli = AppGroup('search', help='Maintain the expense full-text search index.')
+
+@search_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Only re-index this user.')
+def search_rebuild(user_id):
+    """Re-index expenses written outside the app (e.g. bulk SQL loads)."""
+    started = time.perf_counter()
+    indexed = rebuild_search_index(user_id)
+    click.echo(f"Indexed {indexed} expense(s) in {time.perf_counter() - started:.1f}s.")
+
+app.cli.add_command(search_cli)
+
+# --- Forecasts: flask --app manage forecast precompute ---
+forecast_cli = AppGroup('forecast', help='Spending and goal forecasts.')
+
+@forecast_cli.command('precompute')
+@click.option('--user-id', type=int, default=None, help='Only this user.')
+@click.option('--as-of', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Forecast date (defaults to today).')
+@click.option('--batch-size', type=int, default=500, show_default=True, help='Users forecast per pass.')
+def forecast_precompute(user_id, as_of, batch_size):
+    """Build and store every user's forecast so budget and goal pages never compute one on request."""
+    started = time.perf_counter()
+    def report(done, total): click.echo(f"  {done}/{total} users ({time.perf_counter() - started:.1f}s)")
+    written = precompute_forecasts([user_id] if user_id is not None else None, as_of.date() if as_of else None, batch_size, report)
+    click.echo(f"Stored forecasts for {written} user(s) in {time.perf_counter() - started:.1f}s.")
+
+app.cli.add_command(forecast_cli)
+
+# --- Background jobs: flask --app manage jobs worker|enqueue|list ---
+jobs_cli = AppGroup('jobs', help='Run and inspect background jobs.')
+
+@jobs_cli.command('worker')
+@click.option('--processes', type=int, default=None, help='Processes for CPU-bound jobs (JOB_WORKER_PROCESSES, default one per CPU).')
+@click.option('--once', is_flag=True, help='Exit when no job is due instead of polling forever.')
+def jobs_worker(processes, once):
+    """Claim and run queued and scheduled jobs until stopped (SIGTERM finishes running jobs first)."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    worker = Worker(app, job_queue, processes if processes is not None else app.config['JOB_WORKER_PROCESSES'],
+                    poll_interval=app.config['JOB_POLL_INTERVAL'], lease=app.config['JOB_LEASE_SECONDS'],
+                    process_initializer=reset_engine_after_fork)
+    click.echo(f"Worker {worker.worker_id} started with {worker.processes} process(es) for CPU-bound jobs.")
+    claimed = worker.run(once=once)
+    click.echo(f"Worker stopped after {claimed} job(s).")
+
+@jobs_cli.command('enqueue')
+@click.argument('kind')
+@click.option('--payload', default=None, help='JSON object passed to the job.')
+@click.option('--user-id', type=int, default=None, help='Owner of the job (shown in their /api/jobs).')
+def jobs_enqueue(kind, payload, user_id):
+    """Queue a job by kind, e.g. rebuild_rollup or precompute_forecasts."""
+    try: job = job_queue.enqueue(kind, json.loads(payload) if payload else None, user_id=user_id)
+    except ValueError as e: raise click.BadParameter(str(e), param_hint='KIND')
+    click.echo(f"Queued job {job.id} ({kind}).")
+
+@jobs_cli.command('list')
+@click.option('--status', type=click.Choice(['queued', 'running', 'succeeded', 'failed']), default=None)
+@click.option('--limit', type=int, default=20, show_default=True)
+def jobs_list(status, limit):
+    """Show the most recent jobs."""
+    query = Job.query.order_by(Job.id.desc())
+    if status: query = query.filter_by(status=status)
+    for job in query.limit(limit):
+        click.echo(f"{job.id:>6} {job.kind:<22} {job.status:<9} attempts {job.attempts}/{job.max_attempts}  "
+                   f"run_at {job.run_at:%Y-%m-%d %H:%M:%S}  {job.error or ''}")
+
+app.cli.add_command(jobs_cli)
+
+# --- Bulk statement import: flask --app manage import-statement FILE --user-id N ---
+@app.cli.command('import-statement')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user-id', type=int, required=True, help='User the expenses belong to.')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ofx']), default=None, help='Defaults to the file extension.')
+@click.option('--batch-size', type=int, default=None, help='Rows per bulk INSERT (IMPORT_BATCH_SIZE).')
+@click.option('--date-format', default=None, help='strptime format of the date column, e.g. %d/%m/%Y.')
+@click.option('--column-map', default=None, help='JSON object mapping expense fields to CSV headers.')
+@click.option('--amount-sign', type=click.Choice(AMOUNT_SIGNS), default='auto', show_default=True,
+              help='CSV only: negative = debits are negative and credits are skipped; positive = debits are positive and negative rows are skipped.')
+def import_statement(path, user_id, file_format, batch_size, date_format, column_map, amount_sign):
+    """Stream a CSV/OFX bank statement into a user's expenses."""
+    if db.session.get(User, user_id) is None: raise click.BadParameter(f"no user with id {user_id}", param_hint='--user-id')
+    try: column_map = parse_column_map(column_map)
+    except ValueError as e: raise click.BadParameter(str(e), param_hint='--column-map')
+    started = time.perf_counter()
+    def report(summary):
+        click.echo(f"  {summary['rows']} rows read, {summary['imported']} imported, "
+                   f"{summary['duplicates']} duplicates, {summary['errors']} errors ({time.perf_counter() - started:.1f}s)")
+    with open(path, encoding='utf-8-sig', errors='replace', newline='') as f:
+        records = iter_statement_records(f, file_format or detect_format(path),
+                                         column_map, date_format, amount_sign)
+        summary = import_expenses(user_id, records, batch_size, progress=report)
+    for sample in summary['error_samples']: click.echo(f"  skipped {sample}")
+    click.echo(f"Imported {summary['imported']} expenses in {time.perf_counter() - started:.1f}s.")
+
+# --- Benchmarks: flask --app manage bench generate|run|compare|login|sqlite-concurrency ---
+# benchmark is imported inside each command: it needs the Unix-only resource module.
+bench_cli = AppGroup('bench', help='Synthetic data generation and route benchmarks.')
+
+@bench_cli.command('generate')
+@click.option('--users', type=int, default=10, show_default=True)
+@click.option('--expenses', type=int, default=1000, show_default=True, help='Expenses per user.')
+@click.option('--seed', type=int, default=42, show_default=True)
+@click.confirmation_option(prompt='This DROPS every table in DATABASE_URL. Continue?')
+def bench_generate(users, expenses, seed):
+    """Replace the configured database with a synthetic dataset."""
+    import benchmark
+    started = time.perf_counter()
+    benchmark.generate_dataset(users, expenses, seed)
+    click.echo(f"Generated {users} users x {expenses} expenses in {time.perf_counter() - started:.1f}s.")
+
+@bench_cli.command('run')
+@click.option('--sizes', default='100,1000,10000', show_default=True, help='Comma-separated expenses per user.')
+@click.option('--users', type=int, default=5, show_default=True)
+@click.option('--iterations', type=int, default=30, show_default=True, help='Requests per route.')
+@click.option('--sqlite-url', default=None, help='Scratch SQLite database (defaults to a temp file).')
+@click.option('--postgres-url', default=None, help='Scratch local Postgres database; its tables are dropped.')
+@click.option('--use-cache', is_flag=True, help='Measure with the response cache enabled.')
+@click.option('--output', type=click.Path(dir_okay=False), default='bench_results.json', show_default=True)
+def bench_run(sizes, users, iterations, sqlite_url, postgres_url, use_cache, output):
+    """Benchmark every page and /api route at several data sizes; writes JSON."""
+    import benchmark
+    database_urls = [sqlite_url or benchmark.default_sqlite_url()] + ([postgres_url] if postgres_url else [])
+    report = benchmark.run_suite(database_urls, [int(s) for s in sizes.split(',')], users, iterations, use_cache, progress=click.echo)
+    with open(output, 'w') as f: json.dump(report, f, indent=2)
+    for run in report['runs']:
+        click.echo(f"\n{run['database']} - {run['users']} users x {run['expenses_per_user']} expenses, peak RSS {run['peak_rss_mb']} MB")
+        for url, stats in run['routes'].items():
+            click.echo(f"  {url:<70} p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+                       f"p99 {stats['p99_ms']:8.2f}ms  {stats['mean_queries']:5.1f} queries")
+    click.echo(f"\nWrote {output}")
+
+@bench_cli.command('compare')
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', type=float, default=1.2, show_default=True, help='Flag routes whose p95 grew by this factor.')
+def bench_compare(baseline, current, threshold):
+    """Report p95 regressions between two `bench run` results."""
+    import benchmark
+    with open(baseline) as f: old = json.load(f)
+    with open(current) as f: new = json.load(f)
+    regressions = list(benchmark.compare_reports(old, new, threshold))
+    for database, size, url, old_p95, new_p95 in regressions:
+        click.echo(f"REGRESSION [{database} x{size}] {url}: p95 {old_p95:.2f}ms -> {new_p95:.2f}ms")
+    click.echo(f"{len(regressions)} regression(s) between {old.get('commit')} and {new.get('commit')}.")
+    if regressions: raise SystemExit(1)
+
+@bench_cli.command('login')
+@click.option('--concurrency', default='1,4,16', show_default=True, help='Comma-separated numbers of concurrent login threads.')
+@click.option('--duration', type=float, default=5.0, show_default=True, help='Seconds per concurrency level.')
+def bench_login(concurrency, duration):
+    """Login throughput and API responsiveness under concurrent logins (run `bench generate` first)."""
+    import benchmark
+    for level in (int(c) for c in concurrency.split(',')):
+        result = benchmark.measure_logins(level, duration)
+        click.echo(f"x{level:<3} {result['logins_per_second']:7.2f} logins/s  login p95 {result['login_p95_ms']}ms  "
+                   f"probe p95 {result['probe_p95_ms']}ms  statuses {result['statuses']}  "
+                   f"({result['iterations']} iterations, {result['hash_workers']} hash workers)")
+
+@bench_cli.command('sqlite-concurrency')
+@click.option('--processes', default='1,4,8', show_default=True, help='Comma-separated numbers of worker processes.')
+@click.option('--duration', type=float, default=5.0, show_default=True, help='Seconds per run.')
+@click.option('--write-ratio', type=float, default=0.2, show_default=True, help='Share of requests that log an expense.')
+@click.option('--compare-default/--no-compare-default', default=True, show_default=True,
+              help='Also run each level with SQLITE_PRODUCTION_PROFILE=0.')
+def bench_sqlite_concurrency(processes, duration, write_ratio, compare_default):
+    """Multi-process read/write load on a scratch SQLite file, tuned profile vs defaults."""
+    import benchmark
+    for level in (int(p) for p in processes.split(',')):
+        for profile in ((True, False) if compare_default else (True,)):
+            result = benchmark.measure_sqlite_concurrency(level, duration, write_ratio, profile=profile, progress=lambda m: None)
+            reads, writes = result['reads'], result['writes']
+            click.echo(f"{result['profile']:<8} x{level:<3} reads {reads['per_second']:7.1f}/s p95 {reads['p95_ms']}ms  "
+                       f"writes {writes['per_second']:6.1f}/s p95 {writes['p95_ms']}ms  statuses {result['statuses']}")
+
+app.cli.add_command(bench_cli)
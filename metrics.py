@@ -0,0 +1,154 @@
+import glob
+import json
+import os
+import threading
+import time
+
+# Minimal Prometheus-style metrics registry used by app.py's request hooks.
+# Each worker process keeps its own counters and periodically writes them to
+# METRICS_DIR/metrics-<pid>.json; /metrics sums every file so the numbers are
+# correct no matter which gunicorn worker answers the scrape.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+HISTOGRAM_BUCKETS = {
+    'http_request_duration_seconds': LATENCY_BUCKETS,
+    'http_response_size_bytes': SIZE_BUCKETS,
+    'sql_queries_per_request': QUERY_COUNT_BUCKETS,
+}
+
+METRIC_HELP = {
+    'http_requests_total': ('counter', 'Requests handled, by endpoint, method and status.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by endpoint.'),
+    'http_response_size_bytes': ('histogram', 'Response body size by endpoint.'),
+    'sql_queries_per_request': ('histogram', 'SQL statements issued per request, by endpoint.'),
+    'sql_queries_total': ('counter', 'SQL statements issued, by endpoint.'),
+    'sql_duration_seconds_total': ('counter', 'Time spent executing SQL, by endpoint.'),
+    'sql_slow_queries_total': ('counter', 'Statements slower than SLOW_QUERY_MS, by endpoint.'),
+}
+
+
+class MetricsRegistry:
+    def __init__(self, prefix='expense_tracker_'):
+        self.prefix = prefix
+        self.counters = {}    # (name, labels) -> float
+        self.histograms = {}  # (name, labels) -> [bucket_counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels=(), amount=1.0):
+        key = (name, tuple(labels))
+        with self._lock: self.counters[key] = self.counters.get(key, 0.0) + amount
+
+    def observe(self, name, value, labels=()):
+        key = (name, tuple(labels)); buckets = HISTOGRAM_BUCKETS[name]
+        with self._lock:
+            state = self.histograms.get(key)
+            if state is None: state = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound: state[i] += 1
+            state[len(buckets)] += 1; state[-1] += value
+
+    def observe_request(self, endpoint, method, status, seconds, sql_count, sql_seconds, response_bytes):
+        labels = (('endpoint', endpoint),)
+        self.inc('http_requests_total', labels + (('method', method), ('status', str(status))))
+        self.observe('http_request_duration_seconds', seconds, labels)
+        self.observe('http_response_size_bytes', response_bytes, labels)
+        self.observe('sql_queries_per_request', sql_count, labels)
+        self.inc('sql_queries_total', labels, sql_count)
+        self.inc('sql_duration_seconds_total', labels, sql_seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {'counters': [[n, list(map(list, l)), v] for (n, l), v in self.counters.items()],
+                    'histograms': [[n, list(map(list, l)), list(s)] for (n, l), s in self.histograms.items()]}
+
+    def render(self, snapshots):
+        """Prometheus text exposition of the sum of several snapshots."""
+        counters = {}; histograms = {}
+        for snap in snapshots:
+            for name, labels, value in snap['counters']:
+                key = (name, tuple(map(tuple, labels))); counters[key] = counters.get(key, 0.0) + value
+            for name, labels, state in snap['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.get(key)
+                histograms[key] = list(state) if merged is None else [a + b for a, b in zip(merged, state)]
+        lines = []; described = set()
+        def describe(name):
+            if name in described: return
+            described.add(name); kind, text = METRIC_HELP.get(name, ('untyped', name))
+            lines.append(f"# HELP {self.prefix}{name} {text}"); lines.append(f"# TYPE {self.prefix}{name} {kind}")
+        for (name, labels), value in sorted(counters.items()):
+            describe(name); lines.append(f"{self.prefix}{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), state in sorted(histograms.items()):
+            describe(name)
+            buckets = HISTOGRAM_BUCKETS[name]
+            for bound, count in zip(buckets, state):
+                lines.append(f"{self.prefix}{name}_bucket{_labels(labels + (('le', _number(bound)),))} {count}")
+            lines.append(f"{self.prefix}{name}_bucket{_labels(labels + (('le', '+Inf'),))} {state[len(buckets)]}")
+            lines.append(f"{self.prefix}{name}_sum{_labels(labels)} {_number(state[-1])}")
+            lines.append(f"{self.prefix}{name}_count{_labels(labels)} {state[len(buckets)]}")
+        return '\n'.join(lines) + '\n'
+
+
+class MultiprocessStore:
+    """Per-process snapshot files in a shared directory (one file per worker pid; dead workers' are pruned on collect)."""
+
+    def __init__(self, directory, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def flush(self, registry, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval: return
+        self._last_flush = now
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f: json.dump(registry.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def collect(self, registry):
+        self.flush(registry, force=True)
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            if not _process_alive(path):
+                # A restarted worker's file would otherwise be summed forever
+                try: os.remove(path)
+                except OSError: pass
+                continue
+            try:
+                with open(path) as f: snapshots.append(json.load(f))
+            except (OSError, ValueError): continue  # a worker is mid-write or the file vanished
+        return snapshots
+
+
+def _process_alive(path):
+    """Whether the worker that wrote METRICS_DIR/metrics-<pid>.json is still running (assumed so off POSIX)."""
+    try: pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+    except ValueError: return True
+    if os.name != 'posix' or pid == os.getpid(): return True
+    try: os.kill(pid, 0)
+    except ProcessLookupError: return False
+    except PermissionError: pass  # alive, owned by another user
+    return True
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels):
+    if not labels: return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def parameters_shape(parameters):
+    """Describe bound parameters without their values, for the slow query log."""
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)): return f"executemany x{len(parameters)}"
+        return f"positional({', '.join(type(p).__name__ for p in parameters)})"
+    if isinstance(parameters, dict):
+        return f"named({', '.join(f'{k}:{type(v).__name__}' for k, v in parameters.items())})"
+    return type(parameters).__name__
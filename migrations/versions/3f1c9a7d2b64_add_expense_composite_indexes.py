@@ -0,0 +1,28 @@
+"""Add composite indexes on expense
+
+Revision ID: 3f1c9a7d2b64
+Revises: a828428011f7
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b64'
+down_revision = 'a828428011f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.create_index('ix_expense_user_date_id', ['user_id', 'date', 'id'], unique=False)
+        batch_op.create_index('ix_expense_user_category_date', ['user_id', 'category', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.drop_index('ix_expense_user_category_date')
+        batch_op.drop_index('ix_expense_user_date_id')
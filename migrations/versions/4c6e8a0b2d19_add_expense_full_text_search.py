@@ -0,0 +1,42 @@
+"""Add full-text search index on expenses
+
+Revision ID: 4c6e8a0b2d19
+Revises: b8e2d4f6a031
+Create Date: 2026-10-19 00:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c6e8a0b2d19'
+down_revision = 'b8e2d4f6a031'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # Kept in sync by the app (see expense_search.py); "owner" scopes a MATCH to one user
+        op.execute("CREATE VIRTUAL TABLE expense_fts USING fts5("
+                   "owner, description, merchant, category, tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+        op.execute("INSERT INTO expense_fts(rowid, owner, description, merchant, category) "
+                   "SELECT id, 'u' || user_id, description, merchant, category FROM expense")
+        op.execute("INSERT INTO expense_fts(expense_fts) VALUES ('optimize')")
+    elif dialect == 'postgresql':
+        op.execute("ALTER TABLE expense ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+                   "to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(merchant, '') || ' ' || "
+                   "coalesce(category, ''))) STORED")
+        op.execute("CREATE INDEX ix_expense_search_vector ON expense USING GIN (search_vector)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS expense_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_expense_search_vector")
+        with op.batch_alter_table('expense', schema=None) as batch_op:
+            batch_op.drop_column('search_vector')
@@ -0,0 +1,28 @@
+"""Add import_hash to expense
+
+Revision ID: 5a9d3e7c1f28
+Revises: c4d8e2f6a913
+Create Date: 2026-10-18 19:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a9d3e7c1f28'
+down_revision = 'c4d8e2f6a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('import_hash', sa.String(length=40), nullable=True))
+        batch_op.create_index('ix_expense_user_import_hash', ['user_id', 'import_hash'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.drop_index('ix_expense_user_import_hash')
+        batch_op.drop_column('import_hash')
@@ -0,0 +1,49 @@
+"""Add monthly_spend rollup table
+
+Revision ID: 7b2e4c91d0a5
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 18:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4c91d0a5'
+down_revision = '3f1c9a7d2b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    monthly_spend = op.create_table('monthly_spend',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('emotion_tag', sa.String(length=50), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'year', 'month', 'category', 'emotion_tag', name='_user_month_category_emotion_uc')
+    )
+
+    # Backfill from existing expenses
+    expense = sa.table('expense',
+        sa.column('id', sa.Integer), sa.column('user_id', sa.Integer), sa.column('date', sa.Date),
+        sa.column('category', sa.String), sa.column('emotion_tag', sa.String), sa.column('amount', sa.Float))
+    year_col = sa.cast(sa.extract('year', expense.c.date), sa.Integer)
+    month_col = sa.cast(sa.extract('month', expense.c.date), sa.Integer)
+    emotion_col = sa.func.coalesce(expense.c.emotion_tag, '')
+    backfill = sa.select(expense.c.user_id, year_col, month_col, expense.c.category, emotion_col,
+                         sa.func.sum(expense.c.amount), sa.func.count(expense.c.id))\
+        .group_by(expense.c.user_id, year_col, month_col, expense.c.category, emotion_col)
+    op.execute(monthly_spend.insert().from_select(
+        ['user_id', 'year', 'month', 'category', 'emotion_tag', 'total', 'count'], backfill))
+
+
+def downgrade():
+    op.drop_table('monthly_spend')
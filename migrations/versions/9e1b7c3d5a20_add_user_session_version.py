@@ -0,0 +1,26 @@
+"""Add session_version to user
+
+Revision ID: 9e1b7c3d5a20
+Revises: 5a9d3e7c1f28
+Create Date: 2026-10-18 20:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e1b7c3d5a20'
+down_revision = '5a9d3e7c1f28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('session_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('session_version')
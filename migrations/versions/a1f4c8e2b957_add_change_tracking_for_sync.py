@@ -0,0 +1,55 @@
+"""Add updated_at, change_seq and tombstones for delta sync
+
+Revision ID: a1f4c8e2b957
+Revises: e5b1d7f3c820
+Create Date: 2026-10-19 01:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1f4c8e2b957'
+down_revision = 'e5b1d7f3c820'
+branch_labels = None
+depends_on = None
+
+SYNCED_TABLES = ('expense', 'budget', 'goal')
+
+
+def upgrade():
+    for table in SYNCED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            batch_op.add_column(sa.Column('change_seq', sa.Integer(), server_default='0', nullable=False))
+            batch_op.create_index(f'ix_{table}_user_change_seq', ['user_id', 'change_seq', 'id'], unique=False)
+    # Existing rows count as unchanged since they were created; the first sync sends them all anyway
+    op.execute("UPDATE expense SET updated_at = created_at")
+    op.execute("UPDATE goal SET updated_at = created_at")
+
+    op.create_table('tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.create_index('ix_tombstone_user_change_seq', ['user_id', 'change_seq', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.drop_index('ix_tombstone_user_change_seq')
+
+    op.drop_table('tombstone')
+
+    for table in reversed(SYNCED_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_user_change_seq')
+            batch_op.drop_column('change_seq')
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,43 @@
+"""Add budget_alert table for alerts raised on expense writes
+
+Revision ID: b7d3e9a5c146
+Revises: a1f4c8e2b957
+Create Date: 2026-10-19 02:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e9a5c146'
+down_revision = 'a1f4c8e2b957'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('budget_alert',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('threshold', sa.Integer(), nullable=True),
+    sa.Column('spent', sa.BigInteger(), nullable=False),
+    sa.Column('budget_amount', sa.BigInteger(), nullable=False),
+    sa.Column('forecast', sa.BigInteger(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('budget_alert', schema=None) as batch_op:
+        batch_op.create_index('ix_budget_alert_user_id', ['user_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('budget_alert', schema=None) as batch_op:
+        batch_op.drop_index('ix_budget_alert_user_id')
+
+    op.drop_table('budget_alert')
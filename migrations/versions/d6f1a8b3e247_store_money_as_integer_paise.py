@@ -0,0 +1,63 @@
+"""Store money columns as integer paise
+
+Revision ID: d6f1a8b3e247
+Revises: 9e1b7c3d5a20
+Create Date: 2026-10-18 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6f1a8b3e247'
+down_revision = '9e1b7c3d5a20'
+branch_labels = None
+depends_on = None
+
+MONEY_COLUMNS = (
+    ('expense', 'amount', False),
+    ('budget', 'amount', False),
+    ('goal', 'target_amount', False),
+    ('goal', 'current_amount', True),
+    ('monthly_spend', 'total', False),
+)
+
+# Run verify_money_migration.py snapshot before and check after this revision
+# to compare the converted amounts and totals with the old float values.
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    for table, column, nullable in MONEY_COLUMNS:
+        if postgres:
+            # Round through NUMERIC so x.xx5 values round half-up like to_paise()
+            op.alter_column(table, column, existing_type=sa.Float(), type_=sa.BigInteger(), existing_nullable=nullable,
+                            postgresql_using=f'ROUND(CAST({column} AS NUMERIC) * 100)::bigint')
+        else:
+            op.execute(f'UPDATE "{table}" SET {column} = CAST(ROUND({column} * 100) AS INTEGER)')
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.alter_column(column, existing_type=sa.Float(), type_=sa.BigInteger(), existing_nullable=nullable)
+    # Recompute the rollup from the converted expenses so it matches them exactly,
+    # rather than rounding float totals that may carry sub-paisa drift
+    year, month = (('EXTRACT(YEAR FROM expense.date)', 'EXTRACT(MONTH FROM expense.date)') if postgres else
+                   ("CAST(strftime('%Y', expense.date) AS INTEGER)", "CAST(strftime('%m', expense.date) AS INTEGER)"))
+    op.execute(f"""
+        UPDATE monthly_spend SET total = COALESCE((
+            SELECT SUM(expense.amount) FROM expense
+            WHERE expense.user_id = monthly_spend.user_id AND expense.category = monthly_spend.category
+              AND COALESCE(expense.emotion_tag, '') = monthly_spend.emotion_tag
+              AND {year} = monthly_spend.year AND {month} = monthly_spend.month), 0)
+    """)
+
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    for table, column, nullable in MONEY_COLUMNS:
+        if postgres:
+            op.alter_column(table, column, existing_type=sa.BigInteger(), type_=sa.Float(), existing_nullable=nullable,
+                            postgresql_using=f'{column} / 100.0')
+        else:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.alter_column(column, existing_type=sa.BigInteger(), type_=sa.Float(), existing_nullable=nullable)
+            op.execute(f'UPDATE "{table}" SET {column} = {column} / 100.0')
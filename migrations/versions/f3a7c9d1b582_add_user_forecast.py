@@ -0,0 +1,31 @@
+"""Add user_forecast table
+
+Revision ID: f3a7c9d1b582
+Revises: d6f1a8b3e247
+Create Date: 2026-10-18 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a7c9d1b582'
+down_revision = 'd6f1a8b3e247'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_forecast',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('data_version', sa.Integer(), nullable=False),
+    sa.Column('as_of', sa.Date(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_forecast')
@@ -0,0 +1,96 @@
+import json
+import re
+import secrets
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.types import BigInteger, TypeDecorator
+
+# Money is stored and summed as integer paise. Rupee values only exist at
+# the edges: forms, JSON payloads and statement files are converted with
+# to_paise() on the way in, and responses with to_rupees() on the way out.
+# to_rupees() gives an exact two-place Decimal, which dumps_json() and
+# MoneyJSONProvider write as a JSON number (12.50), never through a float.
+
+PAISE_PER_RUPEE = 100
+# One amount is at most 10 trillion rupees, so a BIGINT SUM() overflows only past ~9,000 of them
+MAX_PAISE = 10 ** 15
+
+
+class Money(TypeDecorator):
+    """BIGINT column holding an amount in paise.
+
+    Binding anything but an int raises, so an unconverted rupee float can
+    never be stored 100x too small. SUM() over a Money column comes back as
+    an int on every backend.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or (isinstance(value, int) and not isinstance(value, bool)): return value
+        raise TypeError(f"Money columns take integer paise, got {type(value).__name__}; convert with to_paise()")
+
+    def process_result_value(self, value, dialect):
+        return int(value) if value is not None else None  # Postgres returns SUM(bigint) as Decimal
+
+
+def to_paise(value):
+    """Rupees as str, int, float or Decimal -> int paise, rounded half-up. Raises ValueError."""
+    if isinstance(value, bool): raise ValueError(f"Invalid amount: {value!r}")
+    if isinstance(value, int): paise = value * PAISE_PER_RUPEE
+    else:
+        try:
+            rupees = value if isinstance(value, Decimal) else Decimal(str(value).replace(',', '').replace('₹', '').strip())
+            if not rupees.is_finite(): raise ValueError(f"Invalid amount: {value!r}")
+            paise = int((rupees * PAISE_PER_RUPEE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        except InvalidOperation as e: raise ValueError(f"Invalid amount: {value!r}") from e  # also quantize() past the context precision
+    if abs(paise) > MAX_PAISE: raise ValueError(f"Amount too large: {value!r}")
+    return paise
+
+
+def to_rupees(paise):
+    """Int paise -> exact rupees as a two-place Decimal (Decimal('12.50'))."""
+    return Decimal(paise).scaleb(-2) if paise is not None else None
+
+
+def format_rupees(paise):
+    """Int paise -> '1234.50' without going through float."""
+    whole, fraction = divmod(abs(paise), PAISE_PER_RUPEE)
+    return f"{'-' if paise < 0 else ''}{whole}.{fraction:02d}"
+
+
+# The json module can only write numbers from int and float, so Decimals are
+# written as strings carrying a per-process tag and the quotes are stripped
+# afterwards. Control characters are always escaped, so the tag (which starts
+# with one) can only appear in output as the escaped form matched here.
+_AMOUNT_TAG = f"\x00{secrets.token_hex(8)}:"
+_TAGGED_AMOUNT = re.compile(re.escape(json.dumps(_AMOUNT_TAG)[:-1]) + r'(-?[0-9.E+-]+)"')
+
+
+def json_default(value):
+    """`default` hook for json.dumps/orjson.dumps: finite Decimals become tagged strings for untag_amounts()."""
+    if isinstance(value, Decimal) and value.is_finite(): return f"{_AMOUNT_TAG}{value}"
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def untag_amounts(text):
+    """Turn the tagged strings json_default() produced back into bare JSON numbers."""
+    return _TAGGED_AMOUNT.sub(r'\1', text) if '\\u0000' in text else text
+
+
+def dumps_json(value, **kwargs):
+    """json.dumps() that writes Decimal amounts as exact JSON numbers."""
+    return untag_amounts(json.dumps(value, default=json_default, **kwargs))
+
+
+class MoneyJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider for jsonify() and friends that writes Decimal amounts as numbers (not strings)."""
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, Decimal): return json_default(value)
+        return DefaultJSONProvider.default(value)
+
+    def dumps(self, obj, **kwargs):
+        return untag_amounts(super().dumps(obj, **kwargs))
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Password hashing off the request thread. hashlib.pbkdf2_hmac releases the
+# GIL, so a small thread pool hashes in parallel while request threads keep
+# serving other routes. Admission control turns a login storm into fast 503s
+# instead of an ever-growing queue of CPU-bound work.
+
+
+class HashingOverloaded(RuntimeError):
+    """Raised when too many hashes are already queued; the caller should ask the client to retry."""
+
+
+def calibrate_iterations(target_ms, minimum, sample_iterations=20000):
+    """Pick a pbkdf2-sha256 iteration count that takes about target_ms on this machine."""
+    started = time.perf_counter()
+    hashlib.pbkdf2_hmac('sha256', b'calibration', b'salt', sample_iterations)
+    per_iteration = (time.perf_counter() - started) / sample_iterations
+    calibrated = int(target_ms / 1000 / per_iteration) // 10000 * 10000
+    return max(minimum, calibrated)
+
+
+def hash_iterations(password_hash):
+    """Iteration count of a werkzeug pbkdf2 hash, or None for any other method."""
+    method = password_hash.split('$', 1)[0]
+    parts = method.split(':')
+    if parts[0] != 'pbkdf2' or len(parts) < 2 or parts[1] != 'sha256': return None
+    try: return int(parts[2]) if len(parts) > 2 else None
+    except ValueError: return None
+
+
+class PasswordHasher:
+    """iterations is a count, or a callable (e.g. calibrate_iterations) run once on first use.
+
+    Deferring calibration keeps its ~100ms of hashing out of the import of
+    every process that never hashes a password (CLI commands, job workers).
+    """
+
+    def __init__(self, iterations, workers=None, max_pending=None, timeout=10.0):
+        self._iterations = iterations
+        self._calibration_lock = threading.Lock()
+        self.workers = workers or os.cpu_count() or 2
+        self.max_pending = max_pending or self.workers * 4
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self.rejected = 0
+
+    @property
+    def iterations(self):
+        if callable(self._iterations):
+            with self._calibration_lock:
+                if callable(self._iterations): self._iterations = self._iterations()
+        return self._iterations
+
+    @property
+    def method(self):
+        return f'pbkdf2:sha256:{self.iterations}'
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingOverloaded("Too many password hashes in flight")
+        try: future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release(); raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try: return future.result(timeout=self.timeout)
+        except FutureTimeout as e: raise HashingOverloaded("Password hashing timed out") from e
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True for hashes made with another method or fewer iterations than the current cost."""
+        iterations = hash_iterations(password_hash)
+        return iterations is None or iterations < self.iterations
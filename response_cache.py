@@ -0,0 +1,214 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Response cache backends used by app.py for the read-only JSON APIs.
+# Keys already embed the user's data version, so nothing is ever invalidated
+# explicitly: stale versions simply stop being requested and age out.
+
+
+class MemoryCacheBackend:
+    """In-process LRU bounded by the total size of the cached payloads."""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, size):
+        if size > self.max_bytes: return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None: self.current_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """Cache stored in a local SQLite file, shared by every gunicorn worker on the host.
+
+    Hits are read-only: access times for LRU eviction are collected in
+    memory and written in one batch every ACCESS_FLUSH_SECONDS (or
+    ACCESS_FLUSH_KEYS keys), and before evicting.
+    """
+    ACCESS_FLUSH_SECONDS = 10.0
+    ACCESS_FLUSH_KEYS = 500
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._accessed = {}
+        self._accessed_lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS response_cache ("
+                         "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_accessed ON response_cache (accessed)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn; self._local.pid = os.getpid()
+        return conn
+
+    def lookup(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None: return None
+        with self._accessed_lock:
+            self._accessed[key] = time.time()
+            due = len(self._accessed) >= self.ACCESS_FLUSH_KEYS or time.monotonic() - self._flushed_at >= self.ACCESS_FLUSH_SECONDS
+        if due: self._flush_accessed(conn)
+        return pickle.loads(row[0])
+
+    def _flush_accessed(self, conn):
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}; self._flushed_at = time.monotonic()
+        if accessed:
+            conn.executemany("UPDATE response_cache SET accessed = MAX(accessed, ?) WHERE key = ?",
+                             [(when, key) for key, when in accessed.items()])
+
+    def set(self, key, value, size):
+        if size > self.max_bytes: return
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO response_cache (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                     (key, pickle.dumps(value), size, time.time()))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+        if total > self.max_bytes:
+            # Evict least recently used rows until we are back under the limit
+            self._flush_accessed(conn)
+            excess = total - self.max_bytes; freed = 0; doomed = []
+            for doomed_key, doomed_size in conn.execute("SELECT key, size FROM response_cache ORDER BY accessed"):
+                doomed.append((doomed_key,)); freed += doomed_size
+                if freed >= excess: break
+            conn.executemany("DELETE FROM response_cache WHERE key = ?", doomed)
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """Front end over a backend that keeps hit/miss counters for tuning."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # requests on gthread workers count concurrently
+
+    def get(self, key):
+        value = self.backend.lookup(key)
+        with self._lock:
+            if value is None: self.misses += 1
+            else: self.hits += 1
+        return value
+
+    def set(self, key, value, size):
+        self.backend.set(key, value, size)
+
+    def stats(self):
+        with self._lock: hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {"backend": type(self.backend).__name__, "entries": len(self.backend),
+                "hits": hits, "misses": misses,
+                "hit_ratio": round(hits / total, 4) if total else 0.0}
+
+
+def create_response_cache(url, max_bytes):
+    """Build a cache from a config URL: 'memory' or 'sqlite:///path/to/cache.db'."""
+    if url and url.startswith('sqlite:///'):
+        return ResponseCache(SQLiteCacheBackend(url[len('sqlite:///'):], max_bytes))
+    return ResponseCache(MemoryCacheBackend(max_bytes))
+
+
+class TTLCache:
+    """Small in-process LRU whose entries also expire after ttl seconds."""
+
+    def __init__(self, max_entries=1024, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]; return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+
+    def evict(self, key):
+        with self._lock: self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class EvictionSignal:
+    """Append-only file of cache keys to evict, shared by the processes on one host.
+
+    send() appends keys; poll() returns the keys other processes appended since
+    the last call. Polling is one stat() unless something was sent, so it is
+    cheap enough to run on every request.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try: self._offset = os.path.getsize(path)
+        except OSError: self._offset = 0
+
+    def send(self, keys):
+        lines = ''.join(f"{key}\n" for key in keys)
+        if not lines: return
+        # One O_APPEND write per call, so lines from concurrent senders never interleave
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try: os.write(fd, lines.encode())
+        finally: os.close(fd)
+
+    def poll(self):
+        """Keys sent since the last poll, or None if the file was truncated (evict everything)."""
+        try: size = os.path.getsize(self.path)
+        except OSError: return []
+        if size == self._offset: return []
+        with self._lock:
+            if size < self._offset:
+                self._offset = size; return None
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset); data = f.read(size - self._offset)
+            complete = data.rfind(b'\n') + 1  # leave a line still being written for the next poll
+            self._offset += complete
+            return data[:complete].decode().split()
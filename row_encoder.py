@@ -0,0 +1,80 @@
+import json
+import re
+from json.encoder import encode_basestring_ascii
+
+from sqlalchemy import Date, DateTime, Float, Integer, String, Text
+
+from money import Money, dumps_json, format_rupees
+
+try:
+    import orjson
+except ImportError:  # optional speedup, the pure encoder produces the same bytes
+    orjson = None
+
+# ORM-free JSON for list endpoints. A RowEncoder is built once per model and
+# serialises the column tuples of db.select(*encoder.columns) straight to the
+# JSON jsonify([obj.as_dict() for obj in ...]) would produce, byte for byte:
+# sorted keys, compact separators, ASCII-only output.
+
+_NON_ASCII_RUN = re.compile(r'[^\x00-\x7f]+')
+
+
+def _kind(column_type):
+    if isinstance(column_type, Money): return 'money'
+    if isinstance(column_type, DateTime): return 'datetime'
+    if isinstance(column_type, Date): return 'date'
+    if isinstance(column_type, Integer): return 'int'
+    if isinstance(column_type, Float): return 'float'
+    if isinstance(column_type, (String, Text)): return 'str'
+    return 'json'
+
+
+class RowEncoder:
+    """Precompiled encoder for one model's rows (fields in jsonify's sorted key order)."""
+
+    def __init__(self, model, exclude=()):
+        columns = sorted((c for c in model.__table__.columns if c.name not in exclude), key=lambda c: c.name)
+        self.fields = tuple(c.name for c in columns)
+        self.columns = tuple(getattr(model, c.name) for c in columns)
+        self._kinds = tuple(_kind(c.type) for c in columns)
+        # orjson has no exact two-place money output, and going through Decimals loses its speed
+        self._use_orjson = orjson is not None and 'money' not in self._kinds
+        self._template = '{' + ','.join(f'{encode_basestring_ascii(name)}:%s' for name in self.fields) + '}'
+
+    def _converters(self):
+        """Per-field value -> JSON text; dates are formatted once per distinct value."""
+        dates = {}
+        def date(value):
+            text = dates.get(value)
+            if text is None: text = dates[value] = f'"{value.isoformat()}"'
+            return text
+        table = {'money': format_rupees, 'datetime': lambda v: f'"{v.isoformat()}"', 'date': date,
+                 'int': int.__repr__, 'float': float.__repr__, 'str': encode_basestring_ascii,
+                 'json': lambda v: json.dumps(v, separators=(',', ':'), sort_keys=True)}
+        return tuple(table[kind] for kind in self._kinds)
+
+    def encode(self, rows):
+        """JSON array text for an iterable of column tuples."""
+        return self._encode_orjson(rows) if self._use_orjson else self._encode_pure(rows)
+
+    def _encode_pure(self, rows):
+        template = self._template; converters = self._converters()
+        return '[' + ','.join(template % tuple('null' if v is None else convert(v) for convert, v in zip(converters, row))
+                              for row in rows) + ']'
+
+    def _encode_orjson(self, rows):
+        # orjson formats naive dates/datetimes exactly like isoformat()
+        fields = self.fields
+        body = orjson.dumps([dict(zip(fields, row)) for row in rows]).decode()
+        if body.isascii(): return body
+        # orjson writes raw UTF-8 (only ever inside strings); escape it the way jsonify's ensure_ascii does
+        return _NON_ASCII_RUN.sub(lambda m: encode_basestring_ascii(m.group())[1:-1], body)
+
+    def encode_document(self, document, rows_key, rows):
+        """JSON object text for document (plain JSON values) with rows encoded under rows_key."""
+        parts = []
+        for key in sorted([*document, rows_key]):
+            value = self.encode(rows) if key == rows_key else \
+                dumps_json(document[key], separators=(',', ':'), sort_keys=True)
+            parts.append(f'{encode_basestring_ascii(key)}:{value}')
+        return '{' + ','.join(parts) + '}'
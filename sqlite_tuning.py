@@ -0,0 +1,55 @@
+import time
+
+from sqlalchemy import event
+
+# Production profile for file-backed SQLite, applied to every pooled
+# connection through engine events. WAL lets readers run alongside the one
+# writer and busy_timeout makes a second writer wait instead of failing with
+# "database is locked"; the remaining pragmas trade durability of the last
+# few transactions on power loss (synchronous=NORMAL) and some memory for speed.
+
+
+def is_sqlite_file(database_uri):
+    """True for sqlite:///path URIs; in-memory databases keep SQLAlchemy's defaults."""
+    return database_uri.startswith('sqlite:///') and ':memory:' not in database_uri
+
+
+def sqlite_pragmas(busy_timeout_ms=5000, cache_size_kb=65536, mmap_size=256 * 1024 * 1024):
+    return (
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('busy_timeout', int(busy_timeout_ms)),
+        ('cache_size', -int(cache_size_kb)),  # negative = KiB rather than pages
+        ('mmap_size', int(mmap_size)),
+        ('temp_store', 'MEMORY'),
+    )
+
+
+class SQLiteTuning:
+    """Applies pragmas to each new connection and re-runs PRAGMA optimize every optimize_interval seconds."""
+
+    def __init__(self, pragmas, optimize_interval=3600.0):
+        self.pragmas = tuple(pragmas)
+        self.optimize_interval = optimize_interval
+
+    def install(self, engine):
+        event.listen(engine, 'connect', self.on_connect)
+        if self.optimize_interval: event.listen(engine, 'checkout', self.on_checkout)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.pragmas: cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+        connection_record.info['optimized_at'] = time.monotonic()
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        # SQLite recommends PRAGMA optimize every few hours on long-lived connections;
+        # it only re-analyzes tables whose statistics are stale, so it is usually a no-op
+        now = time.monotonic()
+        if now - connection_record.info.get('optimized_at', now) < self.optimize_interval: return
+        connection_record.info['optimized_at'] = now
+        cursor = dbapi_connection.cursor()
+        try: cursor.execute("PRAGMA optimize")
+        finally: cursor.close()
@@ -0,0 +1,158 @@
+import csv
+import datetime
+import hashlib
+import json
+import re
+
+from money import format_rupees, to_paise
+
+# Streaming parsers for bank statement files. Each parser yields one
+# normalised record per transaction and never holds more than the current
+# row in memory, so arbitrarily large statements can be imported.
+
+# Header aliases used when no explicit column map is given (matched lowercase)
+CSV_COLUMN_ALIASES = {
+    'date': ('date', 'transaction date', 'txn date', 'value date', 'posting date'),
+    'amount': ('amount', 'amount (inr)', 'transaction amount', 'debit', 'withdrawal', 'withdrawal amt.', 'debit amount'),
+    'description': ('description', 'narration', 'details', 'particulars', 'remarks', 'memo'),
+    'merchant': ('merchant', 'payee', 'name'),
+    'category': ('category',),
+    'emotion_tag': ('emotion', 'emotion_tag'),
+}
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d-%b-%Y', '%d %b %Y', '%d/%m/%y', '%Y%m%d')
+# How a CSV amount column's sign is read: 'negative' = debits are negative and positive rows are
+# credits (skipped, like OFX); 'positive' = debits are positive (debit-only columns, expense lists) and
+# negative rows are refunds or reversals (skipped); 'auto' = 'positive' for a debit-only column,
+# otherwise 'negative' once the file shows a negative amount
+AMOUNT_SIGNS = ('auto', 'negative', 'positive')
+DEBIT_COLUMN_HEADERS = ('debit', 'withdrawal', 'withdrawal amt.', 'debit amount')
+SIGN_LOOKAHEAD_ROWS = 1000  # 'auto' rows held back before an all-positive file is taken as debits
+
+
+class ImportRowError(ValueError):
+    """A single statement row that could not be turned into an expense."""
+
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def parse_date(value, date_format=None):
+    """Parse a statement date; returns (date, format_used) so callers can pin the format."""
+    value = value.strip()
+    for fmt in ((date_format,) if date_format else DATE_FORMATS):
+        try: return datetime.datetime.strptime(value, fmt).date(), fmt
+        except ValueError: continue
+    raise ValueError(f"unrecognised date {value!r}")
+
+def parse_amount(value):
+    """Statement amount text -> int paise (parenthesised amounts are negative)."""
+    cleaned = value.replace(',', '').replace('₹', '').strip()
+    if cleaned.startswith('(') and cleaned.endswith(')'): cleaned = '-' + cleaned[1:-1]
+    return to_paise(cleaned)
+
+def dedup_key(date, amount, merchant):
+    """Stable key for (date, amount in paise, merchant) so re-importing a statement is a no-op."""
+    raw = f"{date.isoformat()}|{format_rupees(amount)}|{(merchant or '').strip().lower()}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def parse_column_map(text):
+    """A JSON {field: header} column map (None for empty text); raises ValueError unless it is one."""
+    if not text: return None
+    column_map = json.loads(text)
+    if not isinstance(column_map, dict) or not all(isinstance(header, str) for header in column_map.values()):
+        raise ValueError('column_map must be a JSON object mapping expense fields to CSV header names.')
+    return column_map
+
+def resolve_columns(header, column_map=None):
+    """Map Expense field -> column index from the header row and an optional {field: header} override."""
+    lowered = [h.strip().lower() for h in header]
+    columns = {}
+    for field, aliases in CSV_COLUMN_ALIASES.items():
+        wanted = (column_map or {}).get(field)
+        candidates = (wanted.strip().lower(),) if wanted else aliases
+        for candidate in candidates:
+            if candidate in lowered: columns[field] = lowered.index(candidate); break
+    missing = [f for f in ('date', 'amount') if f not in columns]
+    if missing: raise ValueError(f"CSV header is missing required column(s): {', '.join(missing)}")
+    return columns
+
+def iter_csv_records(text_stream, column_map=None, date_format=None, amount_sign='auto'):
+    """Yield records (or ImportRowError instances) from a CSV text stream, one row at a time.
+
+    With amount_sign 'auto' on a signed column, rows are held back (at most
+    SIGN_LOOKAHEAD_ROWS) until a negative amount shows that positives are credits.
+    """
+    reader = csv.reader(text_stream)
+    header = next(reader, None)
+    if header is None: return
+    columns = resolve_columns(header, column_map)
+    if amount_sign == 'auto' and header[columns['amount']].strip().lower() in DEBIT_COLUMN_HEADERS: amount_sign = 'positive'
+    detected = date_format  # the first format that parses is tried first for later rows
+    held = []  # 'auto' records (and row errors) read before the sign convention is known
+    for row in reader:
+        line = reader.line_num
+        if not any(cell.strip() for cell in row): continue
+        try:
+            get = lambda field: row[columns[field]].strip() if field in columns and columns[field] < len(row) else ''
+            amount_text = get('amount')
+            if not amount_text: continue  # credit-only rows of debit/credit statements
+            amount = parse_amount(amount_text)
+            if amount == 0: continue
+            if amount > 0 and amount_sign == 'negative': continue  # a credit
+            if amount < 0 and amount_sign == 'positive': continue  # a refund or reversal
+            if amount < 0 and amount_sign == 'auto':
+                # A signed statement after all: the positive rows held back were credits
+                amount_sign = 'negative'; yield from (item for item in held if isinstance(item, ImportRowError)); held = []
+            try: date, detected = parse_date(get('date'), detected)
+            except ValueError: date, detected = parse_date(get('date'), date_format)
+            record = {'date': date, 'amount': amount,
+                      'description': get('description') or None, 'merchant': get('merchant') or None,
+                      'category': get('category') or None, 'emotion_tag': get('emotion_tag') or None}
+        except (ValueError, IndexError) as e:
+            record = ImportRowError(line, str(e))
+        if amount_sign != 'auto': yield _as_debit(record); continue
+        held.append(record)
+        if len(held) >= SIGN_LOOKAHEAD_ROWS:
+            amount_sign = 'positive'  # no negative amount so far: an expense list, not a signed statement
+            yield from map(_as_debit, held); held = []
+    yield from map(_as_debit, held)
+
+def _as_debit(record):
+    return record if isinstance(record, ImportRowError) else {**record, 'amount': abs(record['amount'])}
+
+_OFX_TAG = re.compile(r'<(/?)([A-Z0-9.]+)>([^<\r\n]*)', re.IGNORECASE)
+
+def iter_ofx_records(text_stream):
+    """Yield debit transactions from an OFX (SGML or XML) stream, scanning one line at a time."""
+    current = None; line_no = 0
+    for line_no, line in enumerate(text_stream, 1):
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper(); value = value.strip()
+            if tag == 'STMTTRN' and not closing: current = {'line': line_no}
+            elif tag == 'STMTTRN' and closing and current is not None:
+                record = _ofx_record(current)
+                if record is not None: yield record
+                current = None
+            elif current is not None and not closing and value:
+                current[tag] = value
+
+def _ofx_record(fields):
+    try:
+        amount = parse_amount(fields.get('TRNAMT', ''))
+        if amount >= 0: return None  # credits are not expenses
+        date = datetime.datetime.strptime(fields.get('DTPOSTED', '')[:8], '%Y%m%d').date()
+    except ValueError as e:
+        return ImportRowError(fields['line'], str(e))
+    return {'date': date, 'amount': -amount, 'description': fields.get('MEMO') or fields.get('NAME'),
+            'merchant': fields.get('NAME'), 'category': None, 'emotion_tag': None}
+
+def iter_statement_records(text_stream, file_format, column_map=None, date_format=None, amount_sign='auto'):
+    if file_format == 'ofx': return iter_ofx_records(text_stream)
+    if file_format == 'csv':
+        if amount_sign not in AMOUNT_SIGNS: raise ValueError(f"amount_sign must be one of {', '.join(AMOUNT_SIGNS)}.")
+        return iter_csv_records(text_stream, column_map, date_format, amount_sign)
+    raise ValueError(f"Unsupported statement format {file_format!r}; use csv or ofx.")
+
+def detect_format(filename):
+    return 'ofx' if (filename or '').lower().endswith(('.ofx', '.qfx')) else 'csv'
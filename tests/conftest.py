@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py reads its configuration at import time: point it at a scratch database
+# (and user-cache signal file) and a cheap password hash before the first import
+_db_dir = tempfile.mkdtemp(prefix='expense-tracker-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+os.environ.setdefault('PASSWORD_HASH_ITERATIONS', '1000')
+os.environ['USER_CACHE_SIGNAL_FILE'] = os.path.join(_db_dir, 'user-evictions')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from app import app as flask_app, db  # noqa: E402
+from response_cache import TTLCache, create_response_cache  # noqa: E402
+
+
+@pytest.fixture
+def app(monkeypatch):
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    # User ids and data versions restart with the tables, so cached entries of earlier tests would match again
+    monkeypatch.setattr(app_module, 'response_cache', create_response_cache('memory', flask_app.config['RESPONSE_CACHE_MAX_BYTES']))
+    monkeypatch.setattr(app_module, 'user_cache', TTLCache(flask_app.config['USER_CACHE_SIZE'], flask_app.config['USER_CACHE_TTL']))
+    with flask_app.app_context():
+        db.drop_all(); db.create_all()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove(); db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/register', data={"username": "tester", "email": "tester@example.com",
+                                   "password": "password1", "confirm_password": "password1"})
+    assert client.post('/login', data={"email": "tester@example.com", "password": "password1"}).status_code == 302
+    return client
@@ -0,0 +1,27 @@
+import datetime
+
+
+def spend(client, amount, day=None):
+    item = {"amount": amount, "category": "Dining"}
+    if day is not None: item["date"] = day.isoformat()
+    assert client.post('/api/expenses/batch', json=[item]).status_code == 201
+
+
+def threshold_alerts(client, year, month):
+    alerts = client.get(f'/api/alerts?year={year}&month={month}').get_json()["alerts"]
+    return [(a["category"], a["threshold"]) for a in reversed(alerts) if a["kind"] == "threshold"]
+
+
+def test_each_threshold_alerts_once_per_month(client):
+    today = datetime.date.today(); last_month = today.replace(day=1) - datetime.timedelta(days=1)
+    for day in (today, last_month):
+        assert client.post('/set_budget', json={"category": "Dining", "amount": 1000, "month": day.month, "year": day.year}).status_code == 201
+
+    for amount in (600, 100, 150, 10, 300, 500):  # 600 -> 50%, 850 -> 80%, 1160 -> 100%
+        spend(client, amount)
+    assert threshold_alerts(client, today.year, today.month) == [("Dining", 50), ("Dining", 80), ("Dining", 100)]
+
+    # A different month has its own budget and alerts; one write crossing several thresholds raises the highest
+    spend(client, 900, last_month)
+    assert threshold_alerts(client, last_month.year, last_month.month) == [("Dining", 80)]
+    assert threshold_alerts(client, today.year, today.month) == [("Dining", 50), ("Dining", 80), ("Dining", 100)]
@@ -0,0 +1,53 @@
+import datetime
+
+from flask import g
+
+CATEGORIES = ["Groceries", "Transport", "Dining", "Shopping", "Entertainment", "Utilities", "Health",
+              "Education", "Travel", "Rent", "Insurance", "Gifts", "Pets", "Fitness", "Subscriptions", "Overall"]
+
+
+def set_budgets(client, categories, year, month):
+    for category in categories:
+        response = client.post('/set_budget', json={"category": category, "amount": 5000, "month": month, "year": year})
+        assert response.status_code in (200, 201), response.data
+
+
+def budget_status_queries(client, year, month):
+    with client:
+        response = client.get(f'/api/budget_status?month={month}&year={year}')
+        assert response.status_code == 200
+        return len(response.get_json()), g.sql_count
+
+
+def test_budget_status_query_count_does_not_grow_with_budgets(client):
+    today = datetime.date.today(); last_month = today.replace(day=1) - datetime.timedelta(days=1)
+    expenses = [{"amount": 120 + i, "category": CATEGORIES[i % 15], "date": day.replace(day=1 + i % 20).isoformat()}
+                for day in (today, last_month) for i in range(40)]
+    assert client.post('/api/expenses/batch', json=expenses).status_code == 201
+    for year, month in ((last_month.year, last_month.month), (today.year, today.month)):
+        set_budgets(client, CATEGORIES[:1], year, month)
+        few = budget_status_queries(client, year, month)
+        set_budgets(client, CATEGORIES[1:], year, month)
+        many = budget_status_queries(client, year, month)
+        assert (few[0], many[0]) == (1, len(CATEGORIES))
+        assert many[1] == few[1], (year, month, few, many)
+
+
+def test_forecast_reads_do_not_write(app, client):
+    from sqlalchemy import event
+    from app import db, UserForecast
+    today = datetime.date.today()
+    assert client.post('/api/expenses/batch', json=[{"amount": 250, "category": "Dining"}]).status_code == 201
+    set_budgets(client, ["Dining", "Overall"], today.year, today.month)
+    client.post('/set_goal', json={"name": "Bike", "target_amount": 20000})
+    statements = []
+    with app.app_context():
+        listener = lambda conn, cursor, statement, *args: statements.append(statement.split(None, 1)[0].upper())
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            for url in ('/api/budget_status', '/api/goals', '/api/dashboard_summary'):
+                assert client.get(url).status_code == 200
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert db.session.query(UserForecast).count() == 0
+    assert statements and set(statements) <= {'SELECT', 'WITH'}, statements
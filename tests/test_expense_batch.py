@@ -0,0 +1,33 @@
+from app import db, Expense
+
+
+def expense_count(app):
+    with app.app_context():
+        return db.session.query(Expense).count()
+
+
+def test_batch_logs_valid_items_and_reports_the_rest(app, client):
+    response = client.post('/api/expenses/batch', json=[{"amount": 120, "category": "Dining"}, {"amount": "abc", "category": "Dining"},
+                                                        "Spent 40 on coffee"])
+    body = response.get_json()
+    assert response.status_code == 201
+    assert [(r["index"], r["status"]) for r in body["results"]] == [(0, 201), (1, 400), (2, 201)]
+    assert [e["amount"] for e in body["expenses"]] == [120, 40]
+    assert expense_count(app) == 2
+
+
+def test_idempotent_replay_returns_the_same_response_without_writing(app, client):
+    items = [{"amount": 99.5, "category": "Travel"}, {"amount": 10, "category": "Dining"}]
+    first = client.post('/api/expenses/batch', json=items, headers={'Idempotency-Key': 'retry-1'})
+    replay = client.post('/api/expenses/batch', json=items, headers={'Idempotency-Key': 'retry-1'})
+    assert first.status_code == replay.status_code == 201
+    assert replay.data == first.data and replay.headers['Idempotent-Replayed'] == 'true'
+    assert expense_count(app) == 2
+
+
+def test_idempotency_key_reused_for_a_different_body_is_rejected(app, client):
+    assert client.post('/api/expenses/batch', json=[{"amount": 5, "category": "Dining"}],
+                       headers={'Idempotency-Key': 'retry-2'}).status_code == 201
+    reused = client.post('/api/expenses/batch', json=[{"amount": 6, "category": "Dining"}], headers={'Idempotency-Key': 'retry-2'})
+    assert reused.status_code == 422
+    assert expense_count(app) == 1
@@ -0,0 +1,30 @@
+import datetime
+
+from app import parse_expense_text, parse_expense_texts
+from keyword_matcher import KeywordMatcher, longest_first
+
+
+def test_compiled_matchers_keep_longest_and_first_listed_semantics():
+    parsed = parse_expense_text("250 dinner uber eats")
+    assert (parsed["amount"], parsed["merchant"]) == (250.0, "Uber")
+
+    merchants = KeywordMatcher(["Uber", "Uber Eats", "Eats"], rank=longest_first)
+    categories = KeywordMatcher(["Dining", "Travel"])
+    parsed = parse_expense_text("250 travel dining at uber eats", categories, merchants)
+    assert (parsed["amount"], parsed["category"], parsed["merchant"]) == (250.0, "Dining", "Uber Eats")
+    assert parsed["description"] == "Dining at Uber Eats"
+
+
+def test_batch_parse_shares_one_date():
+    parsed = parse_expense_texts(["40 starbucks", "no amount here"])
+    assert [p["merchant"] for p in parsed] == ["Starbucks", None]
+    assert parsed[1]["description"] == "no amount here"
+    assert {p["date"] for p in parsed} == {datetime.date.today()}
+
+
+def test_log_expense_json_accepts_an_array_of_texts(client):
+    response = client.post('/log_expense_json', json=["120 swiggy dining", {"amount": 30, "category": "Transport"}, "no amount"])
+    assert response.status_code == 201
+    body = response.get_json()
+    assert [r["status"] for r in body["results"]] == [201, 201, 400]
+    assert [(e["merchant"], e["category"]) for e in body["expenses"]] == [("Swiggy", "Dining"), (None, "Transport")]
@@ -0,0 +1,31 @@
+import datetime
+
+from app import db, MonthlySpend, monthly_spend_drift
+
+
+def rollup(app):
+    with app.app_context():
+        return {(r.year, r.month, r.category, r.emotion_tag): (r.total, r.count)
+                for r in db.session.query(MonthlySpend).filter(MonthlySpend.count > 0)}
+
+
+def test_rollup_follows_inserts_edits_and_deletes(app, client):
+    today = datetime.date.today(); last_month = today.replace(day=1) - datetime.timedelta(days=1)
+    results = client.post('/api/expenses/batch', json=[
+        {"amount": 100.25, "category": "Dining", "emotion_tag": "happy"}, {"amount": 50, "category": "Dining", "emotion_tag": "happy"},
+        {"amount": 70, "category": "Travel", "date": last_month.isoformat()}]).get_json()["results"]
+    first, second, third = (r["id"] for r in results)
+    assert rollup(app) == {(today.year, today.month, "Dining", "happy"): (15025, 2),
+                           (last_month.year, last_month.month, "Travel", ""): (7000, 1)}
+
+    # Moving an expense to another month, category and emotion moves its amount between rollup rows
+    assert client.post(f'/edit_expense/{second}', data={"amount": "80.50", "category": "Travel", "description": "Train",
+                                                         "date": last_month.isoformat(), "emotion_tag": ""}).status_code == 302
+    assert client.post(f'/delete_expense/{third}').status_code == 302
+    assert rollup(app) == {(today.year, today.month, "Dining", "happy"): (10025, 1),
+                           (last_month.year, last_month.month, "Travel", ""): (8050, 1)}
+
+    assert client.post(f'/delete_expense/{first}').status_code == 302
+    assert rollup(app) == {(last_month.year, last_month.month, "Travel", ""): (8050, 1)}
+    with app.app_context():
+        assert monthly_spend_drift() == []
@@ -0,0 +1,15 @@
+from app import db, Expense, EXPENSE_ROWS, month_filter
+
+
+def explain(statement):
+    sql = str(statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+    return ' '.join(row[-1] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql)))
+
+
+def test_month_range_query_uses_user_date_index(app):
+    with app.app_context():
+        statement = db.select(*EXPENSE_ROWS.columns).where(Expense.user_id == 1, month_filter(Expense.date, 2026, 3))\
+            .order_by(Expense.date.desc(), Expense.id.desc())
+        plan = explain(statement)
+    # The date bounds must be part of the index search, not a filter over all of the user's rows
+    assert 'USING INDEX ix_expense_user_date' in plan and 'date>' in plan and 'date<' in plan, plan
@@ -0,0 +1,23 @@
+def test_repeat_get_is_304_until_data_changes(client):
+    assert client.post('/api/expenses/batch', json=[{"amount": 120, "category": "Dining"}]).status_code == 201
+    first = client.get('/api/spending_by_category')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag
+
+    repeat = client.get('/api/spending_by_category', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304 and repeat.headers['ETag'] == etag and repeat.data == b''
+
+    assert client.post('/api/expenses/batch', json=[{"amount": 30, "category": "Travel"}]).status_code == 201
+    changed = client.get('/api/spending_by_category', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert changed.get_json() == {"labels": ["Dining", "Travel"], "data": [120, 30]}
+
+
+def test_cached_responses_are_per_user(app, client):
+    assert client.post('/api/expenses/batch', json=[{"amount": 75, "category": "Dining"}]).status_code == 201
+    assert client.get('/api/spending_by_category').get_json()["data"] == [75]
+    other = app.test_client()
+    other.post('/register', data={"username": "other", "email": "other@example.com",
+                                  "password": "password1", "confirm_password": "password1"})
+    other.post('/login', data={"email": "other@example.com", "password": "password1"})
+    assert other.get('/api/spending_by_category').get_json() == {"labels": [], "data": []}
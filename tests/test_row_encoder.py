@@ -0,0 +1,27 @@
+import datetime
+
+from flask import jsonify
+
+from app import db, Expense, EXPENSE_ROWS
+
+
+def test_row_encoder_matches_jsonify_byte_for_byte(app, client):
+    expenses = [{"amount": "12.50", "category": "Dining", "description": 'Chai ☕ "quoted" \\ path', "merchant": "दवाई"},
+                {"amount": 0.1, "category": "Travel", "emotion_tag": "happy", "date": "2026-02-28"},
+                {"amount": "9999999999999.99", "category": "Rent", "description": "café\nline two"}]
+    assert client.post('/api/expenses/batch', json=expenses).status_code == 201
+    with app.app_context():
+        rows = db.session.execute(db.select(*EXPENSE_ROWS.columns).order_by(Expense.id)).all()
+        with app.test_request_context():
+            expected = jsonify([expense.as_dict() for expense in Expense.query.order_by(Expense.id)]).get_data(as_text=True)
+        assert EXPENSE_ROWS.encode(rows) + '\n' == expected
+    assert '"amount":12.50' in expected and '"amount":9999999999999.99' in expected
+
+
+def test_list_endpoint_matches_jsonify(app, client):
+    today = datetime.date.today()
+    assert client.post('/api/expenses/batch', json=[{"amount": 5 + i, "category": "Dining"} for i in range(3)]).status_code == 201
+    body = client.get(f'/api/expenses_by_month?month={today.month}&year={today.year}').get_data(as_text=True)
+    with app.app_context(), app.test_request_context():
+        expenses = Expense.query.order_by(Expense.date.desc(), Expense.id.desc())
+        assert body == jsonify([expense.as_dict() for expense in expenses]).get_data(as_text=True)
@@ -0,0 +1,32 @@
+import io
+
+STATEMENT = """Date,Narration,Debit
+05/03/2026,UPI Swiggy order,250.00
+06/03/2026,Uber trip,180.50
+06/03/2026,Uber trip,180.50
+not a date,Broken row,10
+"""
+
+
+def upload(client, text, **form):
+    return client.post('/api/import', data={"file": (io.BytesIO(text.encode()), 'statement.csv'), **form},
+                       content_type='multipart/form-data')
+
+
+def test_reimporting_a_statement_reports_duplicates(client):
+    first = upload(client, STATEMENT).get_json()
+    # The dedup key is (date, amount, merchant), so the second Uber row is a duplicate of the first
+    assert (first["rows"], first["imported"], first["duplicates"], first["errors"]) == (3, 2, 1, 1)
+
+    again = upload(client, STATEMENT).get_json()
+    assert (again["rows"], again["imported"], again["duplicates"], again["errors"]) == (3, 0, 3, 1)
+
+    overlapping = upload(client, STATEMENT.splitlines()[0] + "\n05/03/2026,UPI Swiggy order,250.00\n07/03/2026,Rent,15000\n").get_json()
+    assert (overlapping["imported"], overlapping["duplicates"]) == (1, 1)
+    totals = client.get('/api/spending_over_time?start=2026-03-01&end=2026-03-31&granularity=day').get_json()["data"]
+    assert totals[4:7] == [250, 180.5, 15000]
+
+
+def test_column_map_must_be_a_json_object(client):
+    response = upload(client, STATEMENT, column_map='["date", "amount"]')
+    assert response.status_code == 400 and 'column_map' in response.get_json()["error"]
@@ -0,0 +1,24 @@
+def test_sync_returns_only_changes_and_tombstones_after_the_token(client):
+    ids = [r["id"] for r in client.post('/api/expenses/batch', json=[{"amount": 10 + i, "category": "Dining"} for i in range(3)]).get_json()["results"]]
+    full = client.get('/api/sync').get_json()
+    assert full["reset"] is True and sorted(e["id"] for e in full["expenses"]) == ids
+
+    assert client.post(f'/delete_expense/{ids[0]}').status_code == 302
+    added = client.post('/api/expenses/batch', json=[{"amount": 99, "category": "Travel"}]).get_json()["results"][0]["id"]
+    delta = client.get(f'/api/sync?since={full["token"]}').get_json()
+    assert delta["reset"] is False and delta["has_more"] is False
+    assert delta["deleted"]["expenses"] == [ids[0]]
+    assert [e["id"] for e in delta["expenses"]] == [added]
+
+    assert client.get(f'/api/sync?since={delta["token"]}').get_json()["deleted"]["expenses"] == []
+
+
+def test_sync_pages_through_changes_without_gaps(client):
+    client.post('/api/expenses/batch', json=[{"amount": 1 + i, "category": "Dining"} for i in range(5)])
+    client.post('/api/expenses/batch', json=[{"amount": 50, "category": "Travel"}])
+    seen = []; token = None
+    while True:
+        page = client.get('/api/sync?per_page=2&include=expenses' + (f'&since={token}' if token else '')).get_json()
+        seen += [e["id"] for e in page["expenses"]]; token = page["token"]
+        if not page["has_more"]: break
+    assert seen == list(range(1, 7))
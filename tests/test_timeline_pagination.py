@@ -0,0 +1,25 @@
+import datetime
+
+
+def test_keyset_pages_cover_every_expense_once(client):
+    # Many expenses share a date, so pages must break ties by id
+    days = [datetime.date(2026, 3, 1) + datetime.timedelta(days=i % 4) for i in range(23)]
+    assert client.post('/api/expenses/batch', json=[{"amount": 10 + i, "category": "Dining", "date": day.isoformat()}
+                                                   for i, day in enumerate(days)]).status_code == 201
+    pages = []; cursor = ''
+    while True:
+        page = client.get(f'/api/expenses_timeline?mode=cursor&per_page=5&cursor={cursor}').get_json()
+        pages.append([(e["date"], e["id"]) for e in page["expenses"]])
+        if not page["has_next"]: break
+        cursor = page["next_cursor"]
+    seen = [key for page in pages for key in page]
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert len(set(seen)) == 23 and seen == sorted(seen, reverse=True)
+
+    # Walking back from the last page returns the same pages in reverse
+    back = client.get(f'/api/expenses_timeline?per_page=5&cursor={page["prev_cursor"]}&direction=prev').get_json()
+    assert [(e["date"], e["id"]) for e in back["expenses"]] == pages[-2]
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get('/api/expenses_timeline?cursor=not-a-cursor').status_code == 400
@@ -0,0 +1,101 @@
+import argparse
+import json
+import math
+import sys
+from collections import defaultdict
+
+from sqlalchemy import text
+
+# Checks the float -> integer paise migration (d6f1a8b3e247) against the old data.
+#
+#   python verify_money_migration.py snapshot money_before.json   # before `flask db upgrade`
+#   flask db upgrade
+#   python verify_money_migration.py check money_before.json      # after
+#
+# Reads raw column values with plain SQL so it works on either side of the
+# migration. Exits 1 if any amount or total does not match.
+
+MONEY_COLUMNS = (('expense', 'amount'), ('budget', 'amount'), ('goal', 'target_amount'),
+                 ('goal', 'current_amount'), ('monthly_spend', 'total'))
+# Rollup totals are recomputed from the converted expenses rather than rounded,
+# so they are checked per user (and exactly against expenses) instead of per row
+ROW_CHECKED = {'expense.amount', 'budget.amount', 'goal.target_amount', 'goal.current_amount'}
+# table -> expression counting the expenses behind each row, for the rounding tolerance
+USER_TOTAL_TABLES = {'expense': '1', 'monthly_spend': 'count'}
+
+
+def read_columns(connection):
+    return {f"{table}.{column}": {str(row_id): value for row_id, value in
+                                  connection.execute(text(f'SELECT id, {column} FROM "{table}"'))}
+            for table, column in MONEY_COLUMNS}
+
+def read_user_totals(connection):
+    """{table.column: {user_id: [SUM() as the database computes it, exact sum of the rows, expense count]}}"""
+    totals = {}
+    for table, column in MONEY_COLUMNS:
+        if table not in USER_TOTAL_TABLES: continue
+        sums = {user_id: float(total or 0) for user_id, total in
+                connection.execute(text(f'SELECT user_id, SUM({column}) FROM "{table}" GROUP BY user_id'))}
+        values = defaultdict(list); counts = defaultdict(int)
+        for user_id, value, count in connection.execute(text(f'SELECT user_id, {column}, {USER_TOTAL_TABLES[table]} FROM "{table}"')):
+            values[user_id].append(value); counts[user_id] += count
+        totals[f"{table}.{column}"] = {str(user_id): [sums[user_id], math.fsum(rows), counts[user_id]] for user_id, rows in values.items()}
+    return totals
+
+def snapshot(connection):
+    return {"columns": read_columns(connection), "user_totals": read_user_totals(connection)}
+
+
+def check(connection, before, out=print):
+    failures = 0
+    after_columns = read_columns(connection)
+    for name, old_values in before["columns"].items():
+        if name not in ROW_CHECKED: continue
+        new_values = after_columns[name]; mismatched = 0; missing = 0
+        for row_id, old in old_values.items():
+            if row_id not in new_values: missing += 1; continue
+            new = new_values[row_id]
+            if old is None or new is None:
+                if old != new: mismatched += 1
+            elif not isinstance(new, int) or abs(new - old * 100) > 0.5 + 1e-6: mismatched += 1
+        failures += mismatched + missing
+        out(f"{name:<22} {len(old_values):>8} rows  {mismatched} mismatched  {missing} missing")
+
+    # Old float totals vs new integer totals, per user: the difference should be at most
+    # half a paisa per expense. The old SUM()'s own float drift is shown for reference.
+    after_totals = read_user_totals(connection)
+    for name, old_totals in before["user_totals"].items():
+        worst = 0.0; worst_float_drift = 0.0; bad_users = 0
+        for user_id, (old_sum, old_exact, old_count) in old_totals.items():
+            new_sum, _, new_count = after_totals[name].get(user_id, [0, 0, 0])
+            difference = abs(new_sum - old_exact * 100) / 100
+            worst = max(worst, difference); worst_float_drift = max(worst_float_drift, abs(old_sum - old_exact))
+            if new_count != old_count or difference > 0.005 * old_count + 1e-6: bad_users += 1
+        failures += bad_users
+        out(f"{name:<22} {len(old_totals):>8} users  {bad_users} with totals off by more than rounding  "
+            f"(largest difference ₹{worst:.4f}, old float SUM drift ₹{worst_float_drift:.2e})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify the integer paise money migration.')
+    parser.add_argument('command', choices=('snapshot', 'check'))
+    parser.add_argument('path', help='Snapshot JSON file written by `snapshot` and read by `check`.')
+    options = parser.parse_args()
+    from app import app, db, monthly_spend_drift
+    with app.app_context(), db.engine.connect() as connection:
+        if options.command == 'snapshot':
+            with open(options.path, 'w') as f: json.dump(snapshot(connection), f)
+            print(f"Wrote snapshot of {len(MONEY_COLUMNS)} money columns to {options.path}.")
+            return 0
+        with open(options.path) as f: before = json.load(f)
+        failures = check(connection, before)
+        drift = monthly_spend_drift()
+        print(f"monthly_spend vs expenses: {len(drift)} drifted rollup row(s)")
+        failures += len(drift)
+    print("OK" if not failures else f"FAILED: {failures} problem(s)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())